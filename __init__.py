@@ -1,9 +1,26 @@
-from .arctools import tableToDict, dictToTable, changeFieldOrder, create_filled_contours, renameFields, zonal_statistics_as_dict, arcpy
+from .arctools import tableToDict, join_dict, LazyGeometry, TableCache, refresh_table_dict, iter_groups, aggregate, dictToTable, changeFieldOrder, create_filled_contours, create_filled_contours_batch, create_filled_contours_tiled, renameFields, TablePipeline, export_snapshot, load_snapshot, Snapshot, zonal_statistics_as_dict, ZonalArrays, use_backend, TimingReport, profile, Profile, arcpy
 
 __all__ = ['tableToDict',
+           'join_dict',
+           'LazyGeometry',
+           'TableCache',
+           'refresh_table_dict',
+           'iter_groups',
+           'aggregate',
            'dictToTable',
            'changeFieldOrder',
            'create_filled_contours',
+           'create_filled_contours_batch',
+           'create_filled_contours_tiled',
            'renameFields',
+           'TablePipeline',
+           'export_snapshot',
+           'load_snapshot',
+           'Snapshot',
            'zonal_statistics_as_dict',
+           'ZonalArrays',
+           'use_backend',
+           'TimingReport',
+           'profile',
+           'Profile',
            'arcpy']
@@ -14,6 +14,82 @@ Copyright:  (c) Tobias Litherland 2014, 2015
 -------------------------------------------------------------------------------
 
  Milestones:
+    18.10.2026  TL  TableCache deletes stale files in its directory, and keeps
+                    it within max_disk_bytes and max_age. Generators of keys
+                    are read into the cache key, so they hit the cache.
+    18.10.2026  TL  create_filled_contours returns the output for every kind of
+                    output. The TimingReport is returned with return_report.
+    18.10.2026  TL  export_snapshot writes the columns one batch of rows at a
+                    time. Snapshot keeps the decoders of its columns.
+    18.10.2026  TL  refresh_table_dict writes date watermarks in the date
+                    syntax of the workspace of the table.
+    18.10.2026  TL  profile() no longer swaps the arcpy backend. Calls are
+                    counted per thread and asyncio task, so profiles in
+                    concurrent threads do not mix.
+    18.10.2026  TL  Added output='arrays' to zonal_statistics_as_dict, which
+                    returns ZonalArrays: the sorted zone ids and an array per
+                    statistic. Whole number zone ids are integers in the
+                    arrays, while the dictionaries keep the key type of the
+                    zone data.
+    18.10.2026  TL  zonal_statistics_as_dict intersects polygon zones in
+                    spatially compact batches, each against the value
+                    features within its envelope, optionally in parallel.
+                    Fixed min, which was written to max.
+    18.10.2026  TL  Added property memoryBudget, off by default. dictToTable
+                    and zonal_statistics_as_dict estimate their memory
+                    footprint, and switch to chunked or tiled execution when
+                    it exceeds the budget. tableToDict warns.
+    18.10.2026  TL  Added join_dict, which adds the fields of a keyed
+                    dictionary to a table and fills them in one pass.
+    18.10.2026  TL  Added export_snapshot and load_snapshot, which store a
+                    table or a tableToDict result as one numpy file per
+                    column, and load it back memory-mapped. Snapshots can be
+                    written to tables with dictToTable.
+    18.10.2026  TL  Added geometry to tableToDict, which reads the shape as
+                    coordinates, centroid, area, length, extent, WKB or a
+                    LazyGeometry instead of a full geometry object.
+    18.10.2026  TL  Added refresh_table_dict, which patches a keyed result of
+                    tableToDict with the rows edited since a watermark, and
+                    removes deleted rows.
+    18.10.2026  TL  Added TableCache, an opt-in cache of tableToDict results,
+                    validated against a change token of the table, with LRU
+                    eviction by size and an optional directory shared
+                    between processes.
+    18.10.2026  TL  dictToTable update and delete only read the rows with
+                    matching keys, through chunked IN where clauses, and
+                    look the rows up in an index of the dictionary.
+    18.10.2026  TL  Added keys to tableToDict, which reads only the rows with
+                    the given keyField values through chunked IN clauses,
+                    optionally in concurrent threads.
+    18.10.2026  TL  Added aggregate, which calculates count, sum, mean, min
+                    and max per group with Statistics_analysis, or with
+                    numpy when the statistics tool is not available.
+    18.10.2026  TL  Added sortField to tableToDict, sorting the rows in the
+                    database with ORDER BY, and iter_groups, which streams
+                    the groups of a table one at a time.
+    18.10.2026  TL  Added TablePipeline, which streams rows as tuples from a
+                    table through filter, map, rename and select stages into
+                    another table, with throughput reported per stage.
+    18.10.2026  TL  Completed changeFieldOrder and rewrote renameFields as
+                    streaming copies between cursors. renameFields renames in
+                    place with AlterField when newTable is table.
+    18.10.2026  TL  Added profile, an opt-in context manager collecting phase
+                    timings, row throughput, arcpy call counts and peak
+                    memory from tableToDict, dictToTable,
+                    zonal_statistics_as_dict and create_filled_contours.
+    18.10.2026  TL  Added create_filled_contours_batch and
+                    create_filled_contours_tiled, which run many rasters, or
+                    tiles of one raster, in a pool of processes.
+    18.10.2026  TL  Replaced the print statements and time.clock timing in
+                    create_filled_contours with TimingReport, which records
+                    wall time, cpu time and feature counts per stage.
+    18.10.2026  TL  Added zonal_engine='numpy' to create_filled_contours, which
+                    calculates the polygon means in memory.
+    18.10.2026  TL  Vectorized the contour reclassification in
+                    create_filled_contours.
+    18.10.2026  TL  Added the sqlite_arcpy backend, which is used in place of
+                    arcpy when ArcGIS is not installed, and use_backend for
+                    switching between backends.
     02.06.2015  TL  Added method create_filled_contours, which creates filled
                     contours for a specified set of contour levels.
     01.06.2015  TL  Added handling of grouped dictionaries in dictToTable.
@@ -32,18 +108,42 @@ Copyright:  (c) Tobias Litherland 2014, 2015
 
  Future improvements:
     - Rewrite functions to agree with PEP8.
-    - Add "sortField" argument to tableToDict to allow sorted output based on a
-        field.
     - Objectify module so it accepts a pre-loaded arcpy instance.
 
 -------------------------------------------------------------------------------
 '''
 
 import re
+import sys
 import datetime
-import arcpy
 import time
 import os
+import logging
+import shutil
+import tempfile
+import operator
+import itertools
+import multiprocessing
+import tracemalloc
+import pickle
+import hashlib
+import threading
+import contextvars
+import functools
+import struct
+import json
+from contextlib import contextmanager, closing
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import arcpy
+except ImportError:
+    # No ArcGIS installation. Fall back to the pure-python SQLite backend,
+    # which covers the table methods (tableToDict, dictToTable, ...).
+    try:
+        from . import sqlite_arcpy as arcpy
+    except (ImportError, ValueError):
+        import sqlite_arcpy as arcpy
 
 import numpy
 from scipy import ndimage
@@ -51,6 +151,21 @@ from collections import OrderedDict,Counter
 
 # Properties
 overwriteExistingOutput = False #True allows methods to overwrite existing output.
+maxKeysPerQuery = 1000 #Largest number of values in the IN lists of generated where clauses (Oracle allows 1000).
+memoryBudget = None #Bytes a call may hold in memory before switching to chunked or tiled execution, e.g. 1024 ** 3. None disables the estimates.
+
+logger = logging.getLogger('arctools')
+
+# ListFields field types and the corresponding AddField_management types:
+_add_field_types = {'String': 'TEXT',
+                    'SmallInteger': 'SHORT',
+                    'Integer': 'LONG',
+                    'Single': 'FLOAT',
+                    'Double': 'DOUBLE',
+                    'Date': 'DATE',
+                    'Guid': 'GUID',
+                    'Blob': 'BLOB',
+                    'Raster': 'RASTER'}
 
 # Regex:
 shapeIdentification = '(?i)^(shape)(@\w*)?$'
@@ -87,6 +202,345 @@ class FieldException(Exception):
         super(FieldException, self).__init__(message)
 
 
+def use_backend(backend):
+    """
+    Set the arcpy implementation used by all methods in the module. Accepts
+    arcpy itself or any module implementing the same surface, e.g.
+    sqlite_arcpy for tables in SQLite databases and GeoPackages.
+
+    Returns the previous backend, so it can be restored.
+    """
+
+    previous = arcpy._backend
+    arcpy._backend = getattr(backend, '_backend', backend)
+    return previous
+
+
+class TimingReport(object):
+    """
+    Wall time, CPU time and feature counts for the stages of an operation.
+
+    Each stage is recorded as a dictionary with the keys stage, wall, cpu
+    and count, and passed to callback(report, stage) as soon as it finishes.
+    The default callback logs the stage to the arctools logger.
+    """
+
+    def __init__(self, name, callback=None):
+        self.name = name
+        self.stages = []
+        self.callback = callback if callback else _log_stage
+
+    @property
+    def wall(self):
+        return sum(s['wall'] for s in self.stages)
+
+    @property
+    def cpu(self):
+        return sum(s['cpu'] for s in self.stages)
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block. Set the count key of the yielded
+        dictionary to record the number of features produced."""
+
+        record = {'stage': name, 'wall': 0.0, 'cpu': 0.0, 'count': None}
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield record
+        finally:
+            record['wall'] = time.perf_counter() - wall
+            record['cpu'] = time.process_time() - cpu
+            self.add(record)
+
+    def add(self, record):
+        """Record a stage timed elsewhere, given as a dictionary with the keys
+        stage, wall, cpu and count."""
+        self.stages += [record]
+        self.callback(self, record)
+        _record_phase(self.name, record['stage'], record['wall'], record['cpu'], record['count'])
+
+    def as_dict(self):
+        return {'name': self.name,
+                'wall': self.wall,
+                'cpu': self.cpu,
+                'stages': [dict(s) for s in self.stages]}
+
+    def __str__(self):
+        lines = ['%s: %0.2f s wall, %0.2f s cpu' % (self.name, self.wall, self.cpu)]
+        for s in self.stages:
+            lines += ['    %-20s %10.2f s wall %10.2f s cpu %10s features' % (s['stage'], s['wall'], s['cpu'], '' if s['count'] is None else s['count'])]
+        return '\n'.join(lines)
+
+
+class Profile(object):
+    """
+    Timings collected by profile() across all arctools methods called within
+    it, including nested calls.
+
+    phases      Per (method, phase): number of calls, wall time, cpu time and
+                rows processed.
+    tool_calls  Number of calls per arcpy function, cursor or tool.
+    peak_memory Peak traced memory in bytes, if trace_memory was set.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.phases = OrderedDict()
+        self.tool_calls = Counter()
+        self.trace_memory = trace_memory
+        self.peak_memory = None
+        self._lock = threading.Lock()
+
+    def add(self, method, phase, wall, cpu, rows=None):
+        key = (method, phase)
+        with self._lock:
+            if key not in self.phases:
+                self.phases[key] = {'method': method, 'phase': phase, 'calls': 0, 'wall': 0.0, 'cpu': 0.0, 'rows': 0}
+            record = self.phases[key]
+            record['calls'] += 1
+            record['wall'] += wall
+            record['cpu'] += cpu
+            record['rows'] += rows or 0
+
+    def count_call(self, name):
+        with self._lock:
+            self.tool_calls[name] += 1
+
+    def as_dict(self):
+        phases = []
+        for record in self.phases.values():
+            record = dict(record)
+            record['rows_per_second'] = record['rows'] / record['wall'] if record['rows'] and record['wall'] else None
+            phases += [record]
+        return {'phases': phases,
+                'tool_calls': dict(self.tool_calls),
+                'peak_memory': self.peak_memory}
+
+    def __str__(self):
+        lines = ['%-24s %-20s %8s %10s %10s %10s %12s' % ('method', 'phase', 'calls', 'wall', 'cpu', 'rows', 'rows/s')]
+        for record in self.as_dict()['phases']:
+            lines += ['%-24s %-20s %8d %10.3f %10.3f %10d %12s' % (record['method'], record['phase'], record['calls'], record['wall'], record['cpu'], record['rows'],
+                                                                '' if record['rows_per_second'] is None else '%0.0f' % record['rows_per_second'])]
+        if self.tool_calls:
+            lines += ['arcpy calls: ' + ', '.join('%s=%d' % item for item in self.tool_calls.most_common())]
+        if self.peak_memory is not None:
+            lines += ['peak memory: %0.1f MB' % (self.peak_memory / 1e6)]
+        return '\n'.join(lines)
+
+
+# Profiles collecting timings in the current thread or asyncio task. See
+# profile(). Threads started by arctools run in a copy of the context of
+# the caller, see _in_context().
+_profiles = contextvars.ContextVar('arctools_profiles', default=())
+
+
+def _in_context(function):
+    """function bound to a copy of the current context, to be run in another
+    thread while still reporting to the active profiles."""
+    return functools.partial(contextvars.copy_context().run, function)
+
+
+class _CountingBackend(object):
+    """Wraps an arcpy backend and counts the calls to its functions, tools and
+    cursors in the profiles active in the calling thread or task. Outside
+    of profile() the attributes of the backend are returned as they are.
+    Classes (Geometry, ExecuteError, ...) and settings (env) are always
+    passed through untouched."""
+
+    _namespaces = ('da', 'sa', 'gp', 'management', 'analysis', 'conversion')
+
+    def __init__(self, backend, prefix=''):
+        self._backend = backend
+        self._prefix = prefix
+
+    def __getattr__(self, name):
+        attribute = getattr(self._backend, name)
+        if not _profiles.get():
+            return attribute
+        if name in self._namespaces:
+            return _CountingBackend(attribute, self._prefix + name + '.')
+        if not callable(attribute) or (isinstance(attribute, type) and not self._prefix):
+            return attribute
+
+        key = self._prefix + name
+
+        def counted(*args, **kwargs):
+            for report in _profiles.get():
+                report.count_call(key)
+            return attribute(*args, **kwargs)
+        return counted
+
+
+# All arcpy calls go through the counting wrapper, which is inactive
+# outside of profile(). See use_backend().
+arcpy = _CountingBackend(arcpy)
+
+
+@contextmanager
+def profile(callback=None, trace_memory=False):
+    """
+    Collect timings from the arctools methods called within the block.
+
+    Yields a Profile, which is filled with the wall time, cpu time and rows
+    of each phase of tableToDict, dictToTable, zonal_statistics_as_dict and
+    the stages of create_filled_contours, together with a count of the
+    arcpy calls made. Profiles can be nested; every active profile
+    collects the phases of the calls made within it. Only the calls made
+    in the current thread or asyncio task are collected, including the
+    threads arctools starts for them, so concurrent profiles do not mix.
+
+    Input
+          callback        func    Called with the Profile when the block
+                                  exits.
+          trace_memory    bool    Record the peak memory use with
+                                  tracemalloc. Slows down execution.
+
+    Example:
+        with arctools.profile() as report:
+            arctools.tableToDict(table, keyField='id')
+        print(report)
+    """
+
+    report = Profile(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+
+    token = _profiles.set(_profiles.get() + (report,))
+    try:
+        yield report
+    finally:
+        _profiles.reset(token)
+        if trace_memory:
+            report.peak_memory = tracemalloc.get_traced_memory()[1]
+        if started_tracing:
+            tracemalloc.stop()
+        if callback:
+            callback(report)
+
+
+def _record_phase(method, phase, wall, cpu, rows=None):
+    for report in _profiles.get():
+        report.add(method, phase, wall, cpu, rows)
+
+
+@contextmanager
+def _phase(method, phase):
+    """
+    Time a phase of a method for the active profiles. Set the rows key of
+    the yielded dictionary to record the number of rows processed. Time
+    added to the exclude key is left out, e.g. time spent in a nested
+    phase.
+    """
+
+    record = {'rows': None, 'exclude': (0.0, 0.0)}
+    if not _profiles.get():
+        yield record
+        return
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield record
+    finally:
+        exclude_wall, exclude_cpu = record['exclude']
+        _record_phase(method, phase, time.perf_counter() - wall - exclude_wall, time.process_time() - cpu - exclude_cpu, record['rows'])
+
+
+def _profiled_rows(method, rows, enclosing):
+    """
+    Iterate over a cursor, recording the time spent fetching rows as the
+    fetch phase of method, separate from the enclosing phase processing the
+    rows. Returns the cursor untouched when no profile is active.
+    """
+
+    if not _profiles.get():
+        return rows
+    return _timed_rows(method, rows, enclosing)
+
+
+def _timed_rows(method, rows, enclosing):
+    wall = cpu = 0.0
+    count = 0
+    rows = iter(rows)
+    while True:
+        start_wall, start_cpu = time.perf_counter(), time.process_time()
+        try:
+            row = next(rows)
+        except StopIteration:
+            break
+        finally:
+            wall += time.perf_counter() - start_wall
+            cpu += time.process_time() - start_cpu
+        count += 1
+        yield row
+
+    exclude_wall, exclude_cpu = enclosing['exclude']
+    enclosing['exclude'] = (exclude_wall + wall, exclude_cpu + cpu)
+    _record_phase(method, 'fetch', wall, cpu, count)
+
+
+def _log_stage(report, record):
+    logger.info('%s: %s %0.2f s wall, %0.2f s cpu, %s features',
+                report.name, record['stage'], record['wall'], record['cpu'], record['count'])
+
+
+def _count(dataset):
+    """Number of rows in a table or feature class."""
+    return int(arcpy.GetCount_management(dataset).getOutput(0))
+
+
+# Estimated bytes of a value read from a field, by ListFields type,
+# including the python object and its slot in the row dictionary.
+_field_bytes = {'OID': 36,
+                'Integer': 36,
+                'SmallInteger': 36,
+                'Single': 32,
+                'Double': 32,
+                'Date': 56,
+                'Guid': 95,
+                'Geometry': 1024,
+                'Blob': 1024,
+                'Raster': 1024}
+_row_bytes = 232  # Row dictionary, without its values.
+
+
+def _estimate_table_bytes(table, fields, rows=None):
+    """Estimated bytes of the rows of table read as dictionaries of fields,
+    from the row count and the field widths. Returns (rows, bytes)."""
+
+    if rows is None:
+        rows = _count(table)
+    types = dict((f.name.lower(), f) for f in arcpy.ListFields(table))
+    width = _row_bytes
+    for field in fields:
+        name, token = field.lower().partition('@')[::2]
+        if field.endswith('@') or (name in types and types[name].type == 'Geometry' and not token):
+            width += _field_bytes['Geometry']
+        elif name in types and types[name].type == 'String':
+            width += 57 + min(types[name].length or 0, 1024)
+        elif name in types and not token:
+            width += _field_bytes.get(types[name].type, 64)
+        else:
+            width += 64  # Tokens like OID@ and SHAPE@XY.
+    return rows, rows * width
+
+
+def _estimate_dictionary_bytes(dictionary):
+    """Estimated bytes of a list of row dictionaries, from the number of
+    rows and the sizes of the values of the first row."""
+
+    width = _row_bytes + sum(sys.getsizeof(v) + 8 for v in dictionary[0].values())
+    return len(dictionary) * width
+
+
+def _execution_plan(method, estimate, plan):
+    """Execution plan of method: 'memory' when estimate fits in
+    memoryBudget, otherwise plan. The choice is logged with the estimate."""
+
+    chosen = 'memory' if estimate <= memoryBudget else plan
+    logger.info('%s: estimated %0.1f MB, budget %0.1f MB, %s execution.', method, estimate / 1e6, memoryBudget / 1e6, chosen)
+    return chosen
+
+
 def _check_out_arcgis_license(lic='Spatial'):
     """Check if any Spatial Analyst Licenses are available. If so, check one out."""
 
@@ -105,6 +559,91 @@ def _check_in_arcgis_licence(lic='Spatial'):
     arcpy.CheckInExtension(lic)
 
 
+def _shape_field_parts(fields):
+    """Name and token suffix of the first shape field among field names, e.g.
+    ('SHAPE', '@XY') for 'SHAPE@XY'. Empty strings if there is none."""
+    for field in fields:
+        match = re.findall(shapeIdentification, field)
+        if match:
+            return match[0]
+    return '', ''
+
+
+def _map_table_fields(fields, describe, featureClass, orig_shape_name='', orig_shape_suffix=''):
+    """
+    Map field names to their counterpart in the described table. The shape
+    field, and fields named after it (e.g. SHAPE_Length), follow the shape
+    field name of the table. OBJECTID follows the object id field name.
+
+    Returns a dictionary of field name: table field name.
+    """
+
+    mappings = OrderedDict((field, field) for field in fields)
+
+    new_shape_name = ''
+    new_shape_field = ''
+    if featureClass and hasattr(describe,'shapeFieldName'):
+        new_shape_name = describe.shapeFieldName
+        new_shape_field = new_shape_name + orig_shape_suffix
+
+    for field in mappings:
+        if re.findall(shapeIdentification,field):
+            mappings[field] = new_shape_field
+
+        elif re.findall('^' + orig_shape_name, field):
+                new_field = re.sub('^' + orig_shape_name, new_shape_name, field)
+                mappings[field] = new_field
+
+        elif re.findall(oidIdentification,field):
+            if hasattr(describe,'hasOID') and describe.hasOID:
+                mappings[field] = describe.OIDFieldName
+
+        # Add more mapping if applicable.
+
+    return mappings
+
+
+def _field_type_for_value(name, value):
+    """Field type and length for a new field, from an example value. Default
+    field type is text if nothing else is found."""
+
+    fieldType = 'TEXT'
+    length = max([50,len(str(value))])
+
+    if name == 'GLOBALID':
+        fieldType = 'GUID'
+    elif isinstance(value,int):
+        fieldType = 'LONG'
+    elif isinstance(value,float):
+        fieldType = 'DOUBLE'
+    elif isinstance(value,datetime.datetime):
+        fieldType = 'DATE'
+
+    return fieldType, length
+
+
+def _unpack_dictionary(dictionary):
+    """
+    Rows of a list of dictionaries, a dictionary of dictionaries or a
+    dictionary of grouped dictionaries (dictionary of lists of dictionaries
+    that have a common attribute), as a list of dictionaries.
+    """
+
+    # Straight list of dictionaries:
+    if (isinstance(dictionary,list) or isinstance(dictionary,tuple)) and isinstance(dictionary[0],dict):
+        return dictionary
+
+    # Dictionary of dictionaries:
+    elif (isinstance(dictionary,dict) or isinstance(dictionary,OrderedDict)) and (isinstance(list(dictionary.values())[0],dict) or isinstance(list(dictionary.values())[0],OrderedDict)):
+        return [row for row in dictionary.values()]
+
+    # Dictionary of grouped dictionaries:
+    elif (isinstance(dictionary,dict) or isinstance(dictionary,OrderedDict)) and (isinstance(list(dictionary.values())[0],list) or isinstance(list(dictionary.values())[0],tuple)) and (isinstance(list(dictionary.values())[0][0],dict) or isinstance(list(dictionary.values())[0][0],OrderedDict)):
+        return [item for sublist in dictionary.values() for item in sublist]
+
+    raise InputTypeException('Unknown structure for input argument [dictionary].')
+
+
 def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='', fields=[], makeTable=True, featureClass=None, featureClassType='', spatialReference=''):
     '''
     Method for taking a dictionary and writing the values to a given table
@@ -120,6 +659,7 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
         dictionary      dict/list Dictionary of dictionaries or list of
                                 dictionaries which is inserted into table.
                                 Assumes that key names and value types match table schema.
+                                Can also be a Snapshot, see load_snapshot.
         table           str     Path to output table.
         method          str     String defining operation performed on
                                 table.
@@ -153,10 +693,21 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
     Output
         count           int     Report the numbers of rows written to the
                                 table.
+
+    When the estimated size of the dictionary exceeds memoryBudget, the rows
+    are remapped to the table fields while they are written, instead of
+    copied first, and update and delete match the rows a chunk at a time.
     '''
 
     arcpy.env.overwriteOutput = overwriteExistingOutput
 
+    if isinstance(dictionary, Snapshot):
+        if not featureClassType:
+            featureClassType = dictionary.manifest['shapeType'] or ''
+        if not spatialReference and dictionary.manifest['spatialReference']:
+            spatialReference = arcpy.SpatialReference(dictionary.manifest['spatialReference'])
+        dictionary = dictionary.to_dicts(geometry='wkb')
+
     output_table = table
 
     assert isinstance(tableKey, str)
@@ -187,33 +738,19 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
     if not makeTable:
         modifyTable = output_table
 
-    # Get the field names from the first list in the
-    islist = False
-    isdict = False
-    isgroupeddict = False
+    dictionary = _unpack_dictionary(dictionary)
+    dictionaryFrame = dictionary[0]
 
-    # Straight list of dictionaries:
-    if (isinstance(dictionary,list) or isinstance(dictionary,tuple)) and isinstance(dictionary[0],dict):
-        islist = True
-        dictionaryFrame = dictionary[0]
-
-    # Dictionary of dictionaries:
-    elif (isinstance(dictionary,dict) or isinstance(dictionary,OrderedDict)) and (isinstance(list(dictionary.values())[0],dict) or isinstance(list(dictionary.values())[0],OrderedDict)):
-        isdict = True
-        dictionaryFrame = list(dictionary.values())[0]
-
-    # Dictionary of grouped dictionaries (dictionary of lists of dictionaries that have a common attribute):
-    elif (isinstance(dictionary,dict) or isinstance(dictionary,OrderedDict)) and (isinstance(list(dictionary.values())[0],list) or isinstance(list(dictionary.values())[0],tuple)) and (isinstance(list(dictionary.values())[0][0],dict) or isinstance(list(dictionary.values())[0][0],OrderedDict)):
-        isgroupeddict = True
-        dictionaryFrame = list(dictionary.values())[0][0]
-    else:
-        raise InputTypeException('Unknown structure for input argument [dictionary].')
-
-    # Unpack dictionaries and grouped dictionaries to lists for entry as table rows:
-    if isdict:
-        dictionary = [row for row in dictionary.values()]
-    if isgroupeddict:
-        dictionary = [item for sublist in dictionary.values() for item in sublist]
+    # Chunked execution remaps the rows while they are written, and matches
+    # update and delete rows against the table a chunk of rows at a time.
+    plan = 'memory'
+    chunk_rows = len(dictionary)
+    if memoryBudget is not None:
+        with _phase('dictToTable', 'estimate'):
+            estimate = _estimate_dictionary_bytes(dictionary)
+            plan = _execution_plan('dictToTable', estimate, 'chunked')
+        if plan == 'chunked':
+            chunk_rows = max(maxKeysPerQuery, int(len(dictionary) * memoryBudget / estimate))
 
     # Check integrity of fields, and create new dictionary containing only the selected fields or all fields if none are selected.
     if fields:
@@ -233,15 +770,9 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
     orig_shape_field = ''
     orig_shape_suffix = ''
     if featureClass == None:
-        featureClass = False
-        for field in dictionaryFieldMappings:
-            if re.findall(shapeIdentification,field):
-                featureClass = True
-                match = re.findall(shapeIdentification,field)[0]
-                orig_shape_name = match[0]
-                orig_shape_suffix = match[1]
-                orig_shape_field = orig_shape_name + orig_shape_suffix
-                break
+        orig_shape_name, orig_shape_suffix = _shape_field_parts(dictionaryFieldMappings)
+        orig_shape_field = orig_shape_name + orig_shape_suffix
+        featureClass = bool(orig_shape_name)
 
     # Verify feature class:
     if featureClass:
@@ -259,38 +790,22 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
 
     if makeTable:
         # Create modifiable table. (Do not write to actual output until end of method).
-        if featureClass:
-            result = arcpy.CreateFeatureclass_management(os.path.split(modifyTable)[0],os.path.split(modifyTable)[1],geometry_type = featureClassType, spatial_reference = spatialReference)
-        else:
-            result = arcpy.CreateTable_management(os.path.split(modifyTable)[0],os.path.split(modifyTable)[1])
+        with _phase('dictToTable', 'create table'):
+            if featureClass:
+                result = arcpy.CreateFeatureclass_management(os.path.split(modifyTable)[0],os.path.split(modifyTable)[1],geometry_type = featureClassType, spatial_reference = spatialReference)
+            else:
+                result = arcpy.CreateTable_management(os.path.split(modifyTable)[0],os.path.split(modifyTable)[1])
 
         modifyTable = str(result) # Get the actual path to the output, as the in_memory output might change depending on environment.
 
     # Get describe object for output table.
-    describe = arcpy.Describe(modifyTable)
+    with _phase('dictToTable', 'describe'):
+        describe = arcpy.Describe(modifyTable)
 
-    unwritable_fields = list_unwritable_fields(output_table, describe_object = describe)
+        unwritable_fields = list_unwritable_fields(output_table, describe_object = describe)
 
     # Map fields to their output counterpart:
-    new_shape_name = ''
-    new_shape_field = ''
-    if featureClass and hasattr(describe,'shapeFieldName'):
-        new_shape_name = describe.shapeFieldName
-        new_shape_field = new_shape_name + orig_shape_suffix
-
-    for field in dictionaryFieldMappings:
-        if re.findall(shapeIdentification,field):
-            dictionaryFieldMappings[field] = new_shape_field
-
-        elif re.findall('^' + orig_shape_name, field):
-                new_field = re.sub('^' + orig_shape_name, new_shape_name, field)
-                dictionaryFieldMappings[field] = new_field
-
-        elif re.findall(oidIdentification,field):
-            if hasattr(describe,'hasOID') and describe.hasOID:
-                dictionaryFieldMappings[field] = describe.OIDFieldName
-
-        # Add more mapping if applicable.
+    dictionaryFieldMappings = _map_table_fields(dictionaryFieldMappings, describe, featureClass, orig_shape_name, orig_shape_suffix)
 
     # Rename fields in dictionary and dictionaryFrame to match output table convensions:
     dictionaryFrame = {dictionaryFieldMappings[k]:v for k,v in dictionaryFrame.items() if k in dictionaryFieldMappings}
@@ -306,30 +821,22 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
         # Loop through key/value pairs and create fields according to the contents
         # of the first item in the dictionary. Default field type is text if
         # nothing else is found.
-        for k,v in dictionaryFrame.items():
-            fieldType = 'TEXT'
-            length = max([50,len(str(v))])
-
-            if re.findall(shapeIdentification,k):
-                continue #Skip create field if shape.
-            elif re.findall(oidIdentification,k):
-                continue #Skip create field if objectid.
-            elif k == 'GLOBALID':
-                fieldType = 'GUID'
-            elif isinstance(v,int):
-                fieldType = 'LONG'
-            elif isinstance(v,float):
-                fieldType = 'DOUBLE'
-            elif isinstance(v,datetime.datetime):
-                fieldType = 'DATE'
-
-            try:
-                arcpy.AddField_management(modifyTable,k,fieldType,field_length = length)
-            except arcpy.ExecuteError:
-                raise FieldException('Failed to create field %s of type %s in table %s' % (k,fieldType,table))
+        with _phase('dictToTable', 'add fields'):
+            for k,v in dictionaryFrame.items():
+                if re.findall(shapeIdentification,k):
+                    continue #Skip create field if shape.
+                elif re.findall(oidIdentification,k):
+                    continue #Skip create field if objectid.
+
+                fieldType, length = _field_type_for_value(k, v)
+                try:
+                    arcpy.AddField_management(modifyTable,k,fieldType,field_length = length)
+                except arcpy.ExecuteError:
+                    raise FieldException('Failed to create field %s of type %s in table %s' % (k,fieldType,table))
 
     # Double check output fields with dictionary keys:
-    tableFieldNames = [field.name for field in arcpy.ListFields(modifyTable)]
+    with _phase('dictToTable', 'describe'):
+        tableFieldNames = [field.name for field in arcpy.ListFields(modifyTable)]
 
     for field in dictionaryFieldMappings.values():
         if not field in tableFieldNames:
@@ -337,10 +844,13 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
                 raise MissingFieldException('Dictionary field %s is not present in table %s.' % (field,output_table))
 
     # Remap fields in dictionary:
-    dict2 = []
-    for d in dictionary:
-        dict2 += [{dictionaryFieldMappings[k]:v for k,v in d.items() if k in dictionaryFieldMappings}]
-    dictionary = dict2
+    with _phase('dictToTable', 'remap') as phase:
+        dict2 = ({dictionaryFieldMappings[k]:v for k,v in d.items() if k in dictionaryFieldMappings} for d in dictionary)
+        if plan == 'chunked':
+            dictionary = dict2
+        else:
+            dictionary = list(dict2)
+            phase['rows'] = len(dictionary)
 
     if method in ['update', 'delete']:
         # Reset dictionaryKey as it may have recieved a new valuewhen dictionary keys were remapped to match output table.
@@ -357,51 +867,159 @@ def dictToTable(dictionary, table, method='insert', dictionaryKey='', tableKey='
     ### Perform table operations ###
     operationCount = 0
 
-    with arcpy.da.Editor(workspace) as edit:
-        # Modify table:
-        if method == 'insert':
-            with arcpy.da.InsertCursor(modifyTable,dictionaryFields) as cursor:
-                for d in dictionary:
-                    values = [d[key] for key in cursor.fields]
-                    operationCount += 1
-                    cursor.insertRow(values)
-
-        elif method == 'update':
-            with arcpy.da.UpdateCursor(modifyTable,dictionaryFields) as cursor:
-                for row in cursor:
-                    t = dict(zip(dictionaryFields,row))
+    with _phase('dictToTable', 'write') as phase:
+        with arcpy.da.Editor(workspace) as edit:
+            # Modify table:
+            if method == 'insert':
+                with arcpy.da.InsertCursor(modifyTable,dictionaryFields) as cursor:
                     for d in dictionary:
-                        if t[tableKey] == d[dictionaryKey]:
-                            operationCount += 1
-                            cursor.updateRow([d[key] for key in cursor.fields])
+                        values = [d[key] for key in cursor.fields]
+                        operationCount += 1
+                        cursor.insertRow(values)
 
-        elif method == 'delete':
-            with arcpy.da.UpdateCursor(modifyTable,dictionaryFields) as cursor:
-                for row in cursor:
-                    t = dict(zip(dictionaryFields,row))
-                    for d in dictionary:
-                        if t[tableKey] == d[dictionaryKey]:
-                            operationCount += 1
-                            cursor.deleteRow()
+            else:
+                key_index = dictionaryFields.index(tableKey)
+                rows = iter(dictionary)
+                while True:
+                    chunk = list(itertools.islice(rows, chunk_rows))
+                    if not chunk:
+                        break
+
+                    # Index the dictionary by key, and only read the candidate rows from the table:
+                    index = OrderedDict()
+                    for d in chunk:
+                        index.setdefault(d[dictionaryKey], []).append(d)
+                    try:
+                        where_clauses = _key_where_clauses(modifyTable, tableKey, index.keys())
+                    except FieldException:
+                        where_clauses = [None]  # Key type can not be selected on. Scan the entire table.
+
+                    for where_clause in where_clauses:
+                        with arcpy.da.UpdateCursor(modifyTable,dictionaryFields,where_clause=where_clause) as cursor:
+                            for row in cursor:
+                                matches = index.get(row[key_index], [])
+                                for d in matches:
+                                    operationCount += 1
+                                    if method == 'update':
+                                        cursor.updateRow([d[key] for key in cursor.fields])
+                                if matches and method == 'delete':
+                                    cursor.deleteRow()
+        phase['rows'] = operationCount
     ### Done performing table operations ###
 
     # Check existence of output:
     if makeTable:
-        if arcpy.Exists(output_table) and overwriteExistingOutput:
-            arcpy.Delete_management(output_table)
+        with _phase('dictToTable', 'copy'):
+            if arcpy.Exists(output_table) and overwriteExistingOutput:
+                arcpy.Delete_management(output_table)
 
-        # Copy temp to final location:
-        if featureClass:
-            arcpy.CopyFeatures_management(modifyTable,output_table)
-        else:
-            arcpy.CopyRows_management(modifyTable,output_table)
+            # Copy temp to final location:
+            if featureClass:
+                arcpy.CopyFeatures_management(modifyTable,output_table)
+            else:
+                arcpy.CopyRows_management(modifyTable,output_table)
 
-        arcpy.Delete_management(modifyTable)
+            arcpy.Delete_management(modifyTable)
 
     return operationCount
 
 
-def tableToDict(table, sqlQuery='', keyField=None, groupBy=None, fields=[], field_case='', ordered=False):
+def join_dict(table, tableKey, dictionary, fields=[], dictionaryKey='', null_value=None):
+    """
+    Join the values of a dictionary onto an existing table or feature class,
+    e.g. the output of zonal_statistics_as_dict. Fields missing from the
+    table are added in one operation (AddFields_management, where
+    available), and all fields are filled in a single UpdateCursor pass,
+    looking each row up in the dictionary by key.
+
+    Input
+        table           str     Path to the table to update.
+        tableKey        str     Field of table with the keys of dictionary.
+        dictionary      dict/list Dictionary of dictionaries with the key
+                                values as keys, or list of dictionaries
+                                with the key in dictionaryKey. Can also be
+                                ZonalArrays.
+        fields          list    Fields of the dictionaries to join. Default is
+                                all fields except the key fields.
+        dictionaryKey   str     Key field of a list of dictionaries.
+        null_value      value   Value written to the fields of rows without a
+                                match in dictionary.
+
+    Output
+        count           int     Number of rows that matched a key in
+                                dictionary.
+
+    Example:
+        stats = zonal_statistics_as_dict(raster, polygons, method=['mean', 'max'], zone_key_field='id')
+        join_dict(polygons, 'id', stats)
+    """
+
+    if isinstance(dictionary, ZonalArrays):
+        dictionary = dictionary.to_dict()
+    if isinstance(dictionary, (list, tuple)):
+        if not dictionaryKey:
+            raise MethodException('dictionaryKey is required when dictionary is a list.')
+        dictionary = OrderedDict((row[dictionaryKey], row) for row in dictionary)
+    if not dictionary:
+        raise InputTypeException('dictionary is empty.')
+
+    if not fields:
+        fields = [f for f in list(dictionary.values())[0] if f not in (tableKey, dictionaryKey)]
+    elif isinstance(fields, str):
+        fields = [fields]
+    fields = list(fields)
+
+    with _phase('join_dict', 'add fields'):
+        table_fields = [f.name.lower() for f in arcpy.ListFields(table)]
+        if tableKey.lower() not in table_fields:
+            raise MissingFieldException('Field [%s] not found in %s' % (tableKey, table))
+
+        new_fields = []
+        for field in fields:
+            if field.lower() in table_fields:
+                continue
+            sample = next((row[field] for row in dictionary.values() if row.get(field) is not None), None)
+            if sample is None:
+                raise FieldException('Field %s has no values to derive a field type from.' % field)
+            fieldType, length = _field_type_for_value(field, _python_value(sample))
+            new_fields += [[field, fieldType, '', length]]
+
+        if new_fields:
+            try:
+                if hasattr(arcpy, 'AddFields_management'):
+                    arcpy.AddFields_management(table, new_fields)
+                else:
+                    for field, fieldType, _, length in new_fields:
+                        arcpy.AddField_management(table, field, fieldType, field_length=length)
+            except arcpy.ExecuteError:
+                raise FieldException('Failed to create fields %s in table %s' % (', '.join(f[0] for f in new_fields), table))
+
+    count = 0
+    empty = [null_value] * len(fields)
+    with _phase('join_dict', 'update') as phase:
+        with arcpy.da.Editor(os.path.dirname(table)):
+            with arcpy.da.UpdateCursor(table, [tableKey] + fields) as cursor:
+                for row in cursor:
+                    match = dictionary.get(row[0])
+                    if match is None:
+                        values = empty
+                    else:
+                        count += 1
+                        values = [_python_value(match.get(field, null_value)) for field in fields]
+                    cursor.updateRow([row[0]] + values)
+                    phase['rows'] = (phase['rows'] or 0) + 1
+
+    return count
+
+
+def _python_value(value):
+    """Python scalar of a numpy scalar, as cursors do not accept numpy types."""
+    if isinstance(value, numpy.generic):
+        return value.item()
+    return value
+
+
+def tableToDict(table, sqlQuery='', keyField=None, groupBy=None, fields=[], field_case='', ordered=False, sortField=None, keys=None, workers=1, cache=None, geometry='full'):
     '''
     Method for creating a dictionary or a list from a table.
 
@@ -426,6 +1044,47 @@ def tableToDict(table, sqlQuery='', keyField=None, groupBy=None, fields=[], fiel
           ordered         bool    Specifies if output is dict (False) or
                                   OrderedDict (True) with the same row order and
                                   field order as in the table.
+          sortField       str/list Name of field, or list of fields, to sort
+                                  the rows by. Append " DESC" to a field name
+                                  for descending order. Sorted by the database
+                                  with ORDER BY. With groupBy, the groups are
+                                  sorted by groupBy first.
+          keys            list    Values of keyField to read. Only the rows
+                                  with these values are read, through where
+                                  clauses with IN lists of at most
+                                  maxKeysPerQuery values, combined with
+                                  sqlQuery. Requires keyField. With more
+                                  keys than maxKeysPerQuery, sortField sorts
+                                  the rows of each chunk of keys, not the
+                                  output as a whole.
+          workers         int     Number of threads reading the chunks of
+                                  keys concurrently.
+          cache           TableCache Cache to return the result from, if the
+                                  same call has been made before and the
+                                  table has not changed since. See TableCache.
+          geometry        str     How the shape field (SHAPE@) is read:
+                                    full     = Geometry object.
+                                    xy       = (x, y) of the centroid (SHAPE@XY).
+                                    centroid = (x, y) of the true centroid
+                                               (SHAPE@TRUECENTROID).
+                                    area     = Area (SHAPE@AREA).
+                                    length   = Length or perimeter
+                                               (SHAPE@LENGTH).
+                                    extent   = (XMin, YMin, XMax, YMax),
+                                               computed from the WKB, in
+                                               the field [shape]@EXTENT.
+                                    wkb      = WKB bytes (SHAPE@WKB).
+                                    lazy     = LazyGeometry holding the WKB,
+                                               which builds the geometry on
+                                               first use.
+                                  All but full and lazy rename the field to
+                                  the token read, e.g. SHAPE@XY.
+
+    When memoryBudget is set, the size of the output is estimated from the
+    row count, or the number of keys, unless sqlQuery selects an unknown
+    share of the rows. The output can not be split, so a warning is logged
+    when it exceeds the budget; iter_groups and TablePipeline read large
+    tables with bounded memory.
 
     Output
           output          Default:          [{},{},...]
@@ -449,7 +1108,29 @@ def tableToDict(table, sqlQuery='', keyField=None, groupBy=None, fields=[], fiel
 
     arcpy.env.overwriteOutput = overwriteExistingOutput
 
-    table_desc = arcpy.Describe(table)
+    if cache is not None:
+        if keys is not None and not isinstance(keys, (list, tuple, set, frozenset, dict)):
+            keys = list(keys)  # Read generators once, for both the cache key and the query.
+        key = (str(table), sqlQuery, keyField, groupBy, _hashable(fields), field_case, ordered, _hashable(sortField), _hashable(keys), geometry)
+        with _phase('tableToDict', 'cache'):
+            token = _change_token(table, cache.edit_field)
+            output = cache.get(key, token)
+        if output is None:
+            output = tableToDict(table, sqlQuery, keyField, groupBy, fields, field_case, ordered, sortField, keys, workers, geometry=geometry)
+            cache.put(key, token, output)
+        return output
+
+    with _phase('tableToDict', 'describe'):
+        fields = _cursor_fields(table, fields)
+        fields, output_fields, converters = _geometry_fields(table, fields, geometry)
+
+    counted_keys = isinstance(keys, (list, tuple, set, dict))
+    if memoryBudget is not None and (counted_keys or (keys is None and not sqlQuery)):
+        with _phase('tableToDict', 'estimate'):
+            rows, estimate = _estimate_table_bytes(table, fields, len(keys) if counted_keys else None)
+        logger.info('tableToDict: estimated %0.1f MB, budget %0.1f MB.', estimate / 1e6, memoryBudget / 1e6)
+        if estimate > memoryBudget:
+            logger.warning('tableToDict: the %d rows of %s are estimated to %0.1f MB, more than memoryBudget.', rows, table, estimate / 1e6)
 
     output = list()
 
@@ -464,13 +1145,24 @@ def tableToDict(table, sqlQuery='', keyField=None, groupBy=None, fields=[], fiel
     if keyField or groupBy:
         output = dict_func()
 
-    if keyField:
+    if keys is not None:
+        if not keyField:
+            raise MethodException('keys can only be used together with keyField.')
+        where_clauses = _key_where_clauses(table, keyField, keys, sqlQuery)
+        if not where_clauses:
+            return output
+
+    elif keyField:
         # Check if contents of field is unique:
-        unique_list = []
-        with arcpy.da.SearchCursor(table, keyField, where_clause=sqlQuery) as cursor:
-            for row in cursor:
-                unique_list += row
-        if not len(set(unique_list)) == len(unique_list):
+        unique_set = set()
+        count = 0
+        with _phase('tableToDict', 'key check') as phase:
+            with arcpy.da.SearchCursor(table, keyField, where_clause=sqlQuery) as cursor:
+                for row in cursor:
+                    unique_set.add(row[0])
+                    count += 1
+            phase['rows'] = count
+        if not len(unique_set) == count:
             Exception('When keyField is used as input, the column needs to have unique values. To group rows by the contents of a column, use groupBy.')
 
     if keyField and field_case:
@@ -485,194 +1177,1236 @@ def tableToDict(table, sqlQuery='', keyField=None, groupBy=None, fields=[], fiel
         elif field_case == 'lower':
             groupBy = groupBy.lower()
 
+    if keyField not in fields:
+        Exception('keyField must be part of fields.')
+
+    case_fields = _case_fields(output_fields, field_case)
+
+    sql_clause = (None, None)
+    if sortField or (groupBy and ordered):
+        sql_clause = (None, _order_by(table, [groupBy] if groupBy else [], sortField))
+
+    with _phase('tableToDict', 'cursor open'):
+        if keys is None:
+            cursor = arcpy.da.SearchCursor(table, fields, where_clause=sqlQuery, sql_clause=sql_clause)
+        else:
+            cursor = closing(_search_rows(table, fields, where_clauses, sql_clause, workers))
+
+    with _phase('tableToDict', 'build') as phase:
+        with cursor as rows:
+            for row in _profiled_rows('tableToDict', rows, phase):
+                if converters:
+                    row = list(row)
+                    for i, converter in converters:
+                        row[i] = converter(row[i])
+
+                dict_row = dict_func(zip(case_fields, row))
+
+                if keyField:
+                    output[dict_row[keyField]] = dict_row
+                elif groupBy:
+                    if not dict_row[groupBy] in output:
+                        output[dict_row[groupBy]] = []
+                    output[dict_row[groupBy]] += [dict_row]
+                else:
+                    output += [dict_row]
+
+        if _profiles.get():
+            phase['rows'] = sum(len(group) for group in output.values()) if groupBy else len(output)
+
+    return output
+
+
+def _cursor_fields(table, fields):
+    """
+    Check that fields exist in table, and return them as a list. If fields
+    is empty, all fields of table are returned, with '@' appended to the
+    shape field so as to include the entire geometry.
+    """
+
+    table_desc = arcpy.Describe(table)
     table_fields = [f.name for f in arcpy.ListFields(table)]
+
     if fields:
         if isinstance(fields, str):
             fields = [fields]
         for field in fields:
             if field not in table_fields:
-                if table_desc.datasetType == 'FeatureClass' and not (table_desc.shapeFieldName in field or table_desc.shapeFieldName.upper() in field.upper()):
+                if table_desc.datasetType == 'FeatureClass' and not (table_desc.shapeFieldName in field or table_desc.shapeFieldName.upper() in field.upper() or re.findall(shapeIdentification, field)):
                     raise MissingFieldException('Field [%s] not found in %s' % (field, table))
-    else:
-        fields = [field.name for field in arcpy.ListFields(table)]
-        if table_desc.datasetType == 'FeatureClass':
-            for i in range(len(fields)):
-                if fields[i] == table_desc.shapeFieldName:
-                    fields[i] += '@'  # Add @ to extract entire shape, not just simplyfied.
-                    break
+        return list(fields)
 
-    if keyField not in fields:
-        Exception('keyField must be part of fields.')
+    fields = list(table_fields)
+    if table_desc.datasetType == 'FeatureClass':
+        for i in range(len(fields)):
+            if fields[i] == table_desc.shapeFieldName:
+                fields[i] += '@'  # Add @ to extract entire shape, not just simplyfied.
+                break
+    return fields
 
-    with arcpy.da.SearchCursor(table, fields, where_clause=sqlQuery) as cursor:
-        for row in cursor:
 
-            case_fields = fields
+# Shape tokens read by the geometry modes of tableToDict:
+_geometry_tokens = {'full': '@',
+                    'xy': '@XY',
+                    'centroid': '@TRUECENTROID',
+                    'area': '@AREA',
+                    'length': '@LENGTH',
+                    'extent': '@WKB',
+                    'wkb': '@WKB',
+                    'lazy': '@WKB'}
 
-            if field_case == 'upper':
-                case_fields = [f.upper() for f in fields]
-            elif field_case == 'lower':
-                case_fields = [f.lower() for f in fields]
 
-            dict_row = dict_func(zip(case_fields, row))
+def _geometry_fields(table, fields, geometry='full'):
+    """
+    Replace the shape token (SHAPE@) in fields according to the geometry
+    mode of tableToDict. Returns the cursor fields, the output field names
+    and a list of (index, function) converting the cursor values.
+    """
 
-            if keyField:
-                output[dict_row[keyField]] = dict_row
-            elif groupBy:
-                if not dict_row[groupBy] in output:
-                    output[dict_row[groupBy]] = []
-                output[dict_row[groupBy]] += [dict_row]
-            else:
-                output += [dict_row]
+    if geometry not in _geometry_tokens:
+        raise MethodException('Geometry %s not valid. Valid options are %s.' % (geometry, ', '.join(sorted(_geometry_tokens))))
+    if geometry == 'full':
+        return fields, fields, []
 
-    return output
+    desc = arcpy.Describe(table)
+    if desc.datasetType != 'FeatureClass':
+        return fields, fields, []
+
+    shape_tokens = ('shape@', desc.shapeFieldName.lower() + '@')
+    cursor_fields = list(fields)
+    output_fields = list(fields)
+    converters = []
+    for i, field in enumerate(fields):
+        if field.lower() not in shape_tokens:
+            continue
+        name = field[:-1]
+        cursor_fields[i] = name + _geometry_tokens[geometry]
+        if geometry == 'extent':
+            output_fields[i] = name + '@EXTENT'
+            converters += [(i, _wkb_extent)]
+        elif geometry == 'lazy':
+            output_fields[i] = field
+            spatial_reference = getattr(desc, 'spatialReference', None)
+            converters += [(i, lambda wkb: None if wkb is None else LazyGeometry(bytes(wkb), spatial_reference))]
+        else:
+            output_fields[i] = cursor_fields[i]
+            if geometry == 'wkb':
+                converters += [(i, lambda wkb: None if wkb is None else bytes(wkb))]
+    return cursor_fields, output_fields, converters
 
 
-def zonal_statistics_as_dict(value_data, zone_data, method='mean', value_key_field='', zone_key_field=''):
-    """Calculate the zonal statistics between to seperate datasets. Accepts zone data as both raster and polygon data.
+class LazyGeometry(object):
+    """
+    Geometry held as WKB. The arcpy geometry is built with arcpy.FromWKB the
+    first time any other attribute is used, e.g. proxy.area, and kept.
+    Use proxy.geometry to get the geometry object itself.
+    """
 
-    RETURNS: dictionary containing the values calculated by metod, with unique zone_data values as keys.
+    __slots__ = ('wkb', 'spatialReference', '_geometry')
 
-    The Zonal data is the most important in terms of geographical extent, therefore we always assume that this is ground
-    proof. Any spatial adjustments are therefore done to the value data, in terms of extent. This means that if zone
-    data is polygonal of origin, we convert the value data to polygon, and perform an intersect. If the zone data is
-    raster, we convert both to matching extent raster datasets.
-    """
+    def __init__(self, wkb, spatialReference=None):
+        self.wkb = wkb
+        self.spatialReference = spatialReference
+        self._geometry = None
 
-    raster_precision = 1000
+    @property
+    def geometry(self):
+        if self._geometry is None:
+            self._geometry = arcpy.FromWKB(self.wkb, self.spatialReference)
+        return self._geometry
 
-    accepted_types = ['FeatureClass', 'RasterDataset', 'MosaicDataset']
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_geometry', 'geometry'):
+            raise AttributeError(name)
+        return getattr(self.geometry, name)
 
-    zone_data_desc = arcpy.Describe(zone_data)
-    value_data_desc = arcpy.Describe(value_data)
+    def __getstate__(self):
+        return (self.wkb, self.spatialReference)
 
-    # Input check:
-    if value_data_desc.datasetType not in accepted_types:
-        raise InputTypeException('value_data of type %s is not an accepted data type' % value_data_desc.datasetType)
-    if zone_data_desc.datasetType not in accepted_types:
-        raise InputTypeException('zone_data of type %s is not an accepted data type' % zone_data_desc.datasetType)
-    if value_data_desc.datasetType == 'FeatureClass' and not value_key_field:
-        raise InputTypeException('value_data is type FeatureClass, but value_key_field is empty.')
-    if zone_data_desc.datasetType == 'FeatureClass' and not zone_key_field:
-        raise InputTypeException('zone_data is type FeatureClass, but zone_key_field is empty.')
-#    if not (value_data_desc.datasetType == 'RasterDataset' or zone_data_desc.datasetType == 'RasterDataset'):
-#        raise InputTypeException('One of input types must be a raster')
-    if not (value_data_desc.spatialReference.PCSCode == zone_data_desc.spatialReference.PCSCode and value_data_desc.spatialReference.GCSCode == zone_data_desc.spatialReference.GCSCode):
-        raise InputTypeException('Non matching coordinate systems between inputs.')
+    def __setstate__(self, state):
+        self.wkb, self.spatialReference = state
+        self._geometry = None
 
-    # If zone data is feature class, perform intersect instead of zonal statistics:
-    if zone_data_desc.datasetType == 'FeatureClass':
-        if value_data_desc.dataType == 'RasterDataset':
+    def __repr__(self):
+        return '<LazyGeometry %d bytes>' % len(self.wkb)
 
-            _check_out_arcgis_license()
-            scaled_value = arcpy.sa.Times(value_data, raster_precision)
-            int_scaled_value = arcpy.sa.Int(scaled_value)
-            if arcpy.Exists(r'in_memory\raster_conversion'):
-                arcpy.Delete_management(r'in_memory\raster_conversion')
-            arcpy.env.extent = zone_data
-            arcpy.RasterToPolygon_conversion(int_scaled_value, r'in_memory\raster_conversion', 'NO_SIMPLIFY')
-            arcpy.env.extent = "MAXOF"
-            _check_in_arcgis_licence()
-            arcpy.AddField_management(r'in_memory\raster_conversion', 'value', 'DOUBLE')
-
-            with arcpy.da.UpdateCursor(r'in_memory\raster_conversion', ['gridcode', 'value']) as cursor:
-                for row in cursor:
-                    row[1] = row[0]/raster_precision
-                    cursor.updateRow(row)
 
-            value_data_path = r'in_memory\raster_conversion'
+def _wkb_extent(wkb):
+    """
+    (XMin, YMin, XMax, YMax) of a WKB geometry, read from the coordinates
+    without building the geometry. Handles ISO and extended WKB with Z and M
+    values. None for empty geometries.
+    """
 
-        else:
-            value_data_path = value_data
+    if wkb is None:
+        return None
+    wkb = bytes(wkb)
+    coordinates = []
+
+    def read(offset):
+        order = '<' if wkb[offset] == 1 else '>'
+        geometry_type = struct.unpack_from(order + 'I', wkb, offset + 1)[0]
+        offset += 5
+
+        dimensions = 2 + bool(geometry_type & 0x80000000) + bool(geometry_type & 0x40000000)
+        if geometry_type & 0x20000000:
+            offset += 4  # SRID of extended WKB.
+        geometry_type &= 0x0FFFFFFF
+        dimensions += {0: 0, 1: 1, 2: 1, 3: 2}[geometry_type // 1000]
+        geometry_type %= 1000
+
+        def points(offset, count):
+            coordinates.append(numpy.frombuffer(wkb, dtype=order + 'f8', count=count * dimensions, offset=offset).reshape(count, dimensions)[:, :2])
+            return offset + 8 * count * dimensions
+
+        if geometry_type == 1:
+            return points(offset, 1)
+        count = struct.unpack_from(order + 'I', wkb, offset)[0]
+        offset += 4
+        if geometry_type == 2:
+            return points(offset, count)
+        for _ in range(count):
+            if geometry_type == 3:
+                ring = struct.unpack_from(order + 'I', wkb, offset)[0]
+                offset = points(offset + 4, ring)
+            else:
+                offset = read(offset)
+        return offset
 
-        if arcpy.Exists(r'in_memory\intersect'):
-            arcpy.Delete_management(r'in_memory\intersect')
-        arcpy.Intersect_analysis([zone_data, value_data_path], r'in_memory\intersect')
+    read(0)
+    coordinates = numpy.concatenate(coordinates) if coordinates else numpy.empty((0, 2))
+    coordinates = coordinates[~numpy.isnan(coordinates).any(axis=1)]
+    if not len(coordinates):
+        return None
+    xmin, ymin = coordinates.min(axis=0)
+    xmax, ymax = coordinates.max(axis=0)
+    return (float(xmin), float(ymin), float(xmax), float(ymax))
 
-        if not value_key_field:
-            value_key_field = 'value'
-        if not zone_key_field:
-            zone_key_field = 'id'  # For calculation results we need some kind of name for the zone ids.
 
-        value_shape = arcpy.Describe(r'in_memory\intersect').shapeFieldName + '@'
+def _case_fields(fields, field_case):
+    if field_case == 'upper':
+        return [f.upper() for f in fields]
+    elif field_case == 'lower':
+        return [f.lower() for f in fields]
+    return fields
 
-        split_results = tableToDict(r'in_memory\intersect', fields=[value_key_field, value_shape, zone_key_field], groupBy=zone_key_field)
 
-        results = {k: {zone_key_field: k} for k in split_results}
-        for k, v in split_results.items():
-            if 'mean' in method:
-                results[k]['mean'] = sum([part[value_key_field]*part[value_shape].area for part in v])/sum([part[value_shape].area for part in v])
-            if 'sum' in method:
-                results[k]['sum'] = sum([part[value_key_field] for part in v])
-            if 'max' in method:
-                results[k]['max'] = max([part[value_key_field] for part in v])
-            if 'max' in method:
-                results[k]['max'] = min([part[value_key_field] for part in v])
+def _order_by(table, leading_fields, sortField):
+    """
+    ORDER BY postfix for the sql_clause of a cursor, sorting by
+    leading_fields and then sortField. Fields in sortField may end with
+    " ASC" or " DESC".
+    """
+
+    if not sortField:
+        sortField = []
+    elif isinstance(sortField, str):
+        sortField = [sortField]
+
+    terms = []
+    for field in list(leading_fields) + list(sortField):
+        parts = field.split()
+        if len(parts) > 2 or (len(parts) == 2 and parts[1].upper() not in ('ASC', 'DESC')):
+            raise FieldException('Invalid sort field %s. Use "field", "field ASC" or "field DESC".' % field)
+        terms += [' '.join([arcpy.AddFieldDelimiters(table, parts[0])] + [p.upper() for p in parts[1:]])]
+    return 'ORDER BY ' + ', '.join(terms)
 
-        return results
 
+def _key_where_clauses(table, field, keys, sqlQuery=''):
+    """
+    Where clauses selecting the rows of table where field has one of the
+    values in keys, with at most maxKeysPerQuery values in each IN list.
+    Values are quoted according to the field type. Each clause is combined
+    with sqlQuery.
+    """
+
+    table_fields = [f for f in arcpy.ListFields(table) if f.name.lower() == field.lower()]
+    if not table_fields:
+        raise MissingFieldException('Field [%s] not found in %s' % (field, table))
+    field_type = table_fields[0].type
+
+    if field_type in ('OID', 'Integer', 'SmallInteger'):
+        literal = _integer_literal
+    elif field_type in ('Double', 'Single'):
+        literal = lambda value: repr(float(value))
+    elif field_type in ('String', 'Guid'):
+        literal = lambda value: "'%s'" % str(value).replace("'", "''")
     else:
-        # Set the loaded raster as snapRaster:
-        if zone_data_desc.datasetType == 'RasterDataset':
-            frame_raster = zone_data
-            frame_desc = zone_data_desc
-        elif value_data_desc.datasetType == 'RasterDataset':
-            frame_raster = value_data
-            frame_desc = value_data_desc
+        raise FieldException('Selecting rows by keys is not supported for field %s of type %s.' % (field, field_type))
+
+    keys = list(OrderedDict.fromkeys(keys))
+    delimited = arcpy.AddFieldDelimiters(table, field)
+
+    clauses = []
+    if None in keys:
+        keys.remove(None)
+        clauses += ['%s IS NULL' % delimited]
+    try:
+        for i in range(0, len(keys), maxKeysPerQuery):
+            clauses += ['%s IN (%s)' % (delimited, ', '.join(literal(key) for key in keys[i:i + maxKeysPerQuery]))]
+    except (TypeError, ValueError):
+        raise FieldException('Keys do not match the type %s of field %s.' % (field_type, field))
+
+    if sqlQuery:
+        clauses = ['(%s) AND (%s)' % (sqlQuery, clause) for clause in clauses]
+    return clauses
+
+
+def _integer_literal(value):
+    """SQL literal of a key of an integer field. Raises ValueError for keys
+    that are not whole numbers, instead of truncating them."""
+    integer = int(value)
+    if isinstance(value, bool) or float(value) != integer:
+        raise ValueError('%r is not an integer.' % (value,))
+    return str(integer)
+
+
+def _date_literal(table, value):
+    """SQL literal of a datetime in where clauses against table, in the
+    syntax of its workspace. Enterprise geodatabases take the standard
+    TIMESTAMP literal, except SQL Server, which converts strings. SQLite
+    and GeoPackages store dates as ISO text. Everything else takes the
+    file geodatabase syntax."""
+
+    text = value.strftime('%Y-%m-%d %H:%M:%S')
+    workspace = arcpy.Describe(arcpy.Describe(table).path)
+    if getattr(workspace, 'dataType', '') == 'FeatureDataset':
+        workspace = arcpy.Describe(workspace.path)
+    factory = getattr(workspace, 'workspaceFactoryProgID', '')
+
+    if 'Sde' in factory:
+        client = getattr(getattr(workspace, 'connectionProperties', None), 'dbclient', '') or ''
+        return ("'%s'" if 'sqlserver' in client.lower() else "TIMESTAMP '%s'") % text
+    if 'Sqlite' in factory:
+        return "'%s'" % text
+    if 'Shapefile' in factory:
+        return "date '%s'" % text[:10]
+    return "date '%s'" % text
+
+
+def _search_rows(table, fields, where_clauses, sql_clause=(None, None), workers=1):
+    """
+    Rows of table matching each of where_clauses in turn, one cursor per
+    clause. With several workers, the cursors are read concurrently in
+    threads, and the rows are returned in the order of the clauses.
+    """
 
-        if zone_data_desc.datasetType == 'FeatureClass' and frame_desc.meanCellHeight > 10:
-            raise InputTypeException('Raster resolution is too poor. Zone precision will be hampered.')
+    def read(where_clause):
+        with arcpy.da.SearchCursor(table, fields, where_clause=where_clause, sql_clause=sql_clause) as cursor:
+            return list(cursor)
 
-        arcpy.env.snapRaster = str(frame_raster)
-        arcpy.env.extent = arcpy.Describe(frame_raster).extent
+    if workers > 1 and len(where_clauses) > 1:
+        with ThreadPoolExecutor(workers) as executor:
+            futures = [executor.submit(_in_context(read), where_clause) for where_clause in where_clauses]
+            for future in futures:
+                for row in future.result():
+                    yield row
+    else:
+        for where_clause in where_clauses:
+            with arcpy.da.SearchCursor(table, fields, where_clause=where_clause, sql_clause=sql_clause) as cursor:
+                for row in cursor:
+                    yield row
 
-        # Convert to raster if value is polygon:
-        if value_data_desc.datasetType == 'RasterDataset':
-            value_raster = value_data
-        elif value_data_desc.datasetType == 'FeatureClass':
-            value_raster = arcpy.PolygonToRaster_conversion(value_data, value_field=value_key_field, cellsize=frame_desc.meanCellHeight)
-        else:
-            raise InputTypeException('The provided zone_data is not a supported data format.')
 
-        # Convert to raster if zone is polygon:
-        if zone_data_desc.datasetType == 'RasterDataset':
-            zone_raster = zone_data
-        elif zone_data_desc.datasetType == 'FeatureClass':
-            zone_raster = arcpy.PolygonToRaster_conversion(zone_data, value_field=zone_key_field, cellsize=frame_desc.meanCellHeight)
-        else:
-            raise InputTypeException('The provided zone_data is not a supported data format.')
+class TableCache(object):
+    """
+    Cache of tableToDict results, passed to tableToDict with cache=.
 
-        zone_desc = arcpy.Describe(zone_raster)
-        value_desc = arcpy.Describe(value_raster)
+    Results are held as pickles, so every hit returns a fresh copy that the
+    caller may modify. Each result is stored with a change token of the
+    table, and is only returned while the token is unchanged. The token is
+    made from the row count and largest object id of the table, the
+    modification time of the file holding it, if any, and the latest value
+    of the editor tracking field. Edits to existing rows are therefore only
+    detected through the file time or the edit field.
 
-        # Assert that resulting rasters align:
-        assert value_desc.spatialReference.PCSCode == zone_desc.spatialReference.PCSCode
-        assert value_desc.spatialReference.GCSCode == zone_desc.spatialReference.GCSCode
-        assert value_desc.extent.lowerLeft.Y == zone_desc.extent.lowerLeft.Y
-        assert value_desc.extent.lowerLeft.X == zone_desc.extent.lowerLeft.X
-        assert value_desc.meanCellHeight == zone_desc.meanCellHeight
-        assert value_desc.meanCellWidth == zone_desc.meanCellWidth
+    Input
+          max_bytes       int     Size of the pickles held in memory. The
+                                  least recently used results are evicted
+                                  beyond it.
+          directory       str     Optional directory where results are also
+                                  stored as pickle files, e.g. to share them
+                                  between worker processes. Files of results
+                                  found stale are deleted.
+          max_disk_bytes  int     Size of the pickle files in directory. The
+                                  least recently used files are deleted
+                                  beyond it.
+          max_age         float   Optional age in seconds after which files
+                                  in directory that have not been used are
+                                  deleted.
+          edit_field      str     Field with the last edited date of each row.
+                                  Default is the editor tracking field of
+                                  the table, if enabled.
+
+    Example:
+        cache = TableCache(max_bytes=64 * 2**20)
+        lookup = tableToDict(table, keyField='id', cache=cache)
+    """
+
+    def __init__(self, max_bytes=256 * 2**20, directory=None, edit_field=None, max_disk_bytes=2**30, max_age=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.max_disk_bytes = max_disk_bytes
+        self.max_age = max_age
+        self.edit_field = edit_field
+        self.hits = 0
+        self.misses = 0
+        self.bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(repr(key).encode('utf-8')).hexdigest() + '.pickle')
+
+    def get(self, key, token):
+        """Cached result for key, or None if missing or made with another
+        token."""
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return pickle.loads(entry[1])
+
+        if self.directory and os.path.isfile(self._path(key)):
+            try:
+                with open(self._path(key), 'rb') as f:
+                    disk_token, data = pickle.load(f)
+            except (IOError, EOFError, pickle.UnpicklingError):
+                disk_token = None
+            if disk_token == token:
+                self._touch(self._path(key))
+                self._store(key, token, data)
+                with self._lock:
+                    self.hits += 1
+                return pickle.loads(data)
+            self._remove(self._path(key))
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, token, value):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        self._store(key, token, data)
+        if self.directory:
+            # Write to a temporary file and move it in place, so other processes never read a partial file.
+            handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump((token, data), f, pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self._path(key))
+            self._prune()
+
+    def _prune(self):
+        """Delete the files in directory older than max_age, and the least
+        recently used files beyond max_disk_bytes."""
+
+        files = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pickle'):
+                path = os.path.join(self.directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue  # Deleted by another process.
+                files += [(stat.st_mtime, stat.st_size, path)]
+
+        files.sort(reverse=True)
+        now = time.time()
+        total = 0
+        for modified, size, path in files:
+            total += size
+            if total > self.max_disk_bytes or (self.max_age is not None and now - modified > self.max_age):
+                self._remove(path)
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass  # Already deleted by another process.
+
+    def _store(self, key, token, data):
+        with self._lock:
+            if key in self._entries:
+                self.bytes -= len(self._entries.pop(key)[1])
+            if len(data) > self.max_bytes:
+                return
+            self._entries[key] = (token, data)
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                self.bytes -= len(self._entries.popitem(last=False)[1][1])
+
+    def clear(self):
+        """Remove all results, including those in directory."""
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if name.endswith('.pickle'):
+                    os.remove(os.path.join(self.directory, name))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _hashable(value):
+    """value as part of a cache key. Iterables become tuples, and sets are
+    sorted, so equal arguments give equal keys."""
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value, key=repr))
+    if value is None or isinstance(value, str):
+        return value
+    if hasattr(value, '__iter__'):
+        return tuple(value)
+    return value
+
+
+def _max_value(table, field):
+    """Largest non-null value of field in table, or None if there is none."""
+    delimited = arcpy.AddFieldDelimiters(table, field)
+    with arcpy.da.SearchCursor(table, [field], where_clause='%s IS NOT NULL' % delimited, sql_clause=(None, 'ORDER BY %s DESC' % delimited)) as cursor:
+        for row in cursor:
+            return row[0]
+    return None
+
+
+def _change_token(table, edit_field=None):
+    """
+    Cheap value that changes when table is edited: the row count, the
+    largest object id, the modification time and size of the file holding
+    the table, and the latest edit date.
+    """
+
+    desc = arcpy.Describe(table)
+    token = [_count(table)]
+    if desc.hasOID:
+        token += [_max_value(table, desc.OIDFieldName)]
+
+    path = str(table)
+    while path and not os.path.exists(path):
+        path = os.path.dirname(path)
+    if path and os.path.isfile(path):
+        stat = os.stat(path)
+        token += [stat.st_mtime_ns, stat.st_size]
+
+    if not edit_field and getattr(desc, 'editorTrackingEnabled', False):
+        edit_field = desc.editedAtFieldName
+    if edit_field:
+        token += [_max_value(table, edit_field)]
+
+    return tuple(token)
+
+
+def refresh_table_dict(output, table, keyField, watermark=None, watermarkField=None, sqlQuery='', fields=[], field_case='', ordered=False, detectDeletes=True):
+    """
+    Bring a result of tableToDict with keyField up to date, reading only the
+    rows edited or added since the last read. output is patched in place.
+
+    The rows are selected by a watermark: the largest value of watermarkField
+    at the previous read. With an editor tracking date field, edited and new
+    rows are read. With the object id, only new rows are read. Deleted rows
+    are found by reading the keyField column only.
+
+    Date watermarks are written in the date syntax of the workspace, e.g.
+    date 'YYYY-MM-DD HH:MM:SS' in file geodatabases and TIMESTAMP
+    'YYYY-MM-DD HH:MM:SS' in enterprise geodatabases. Rows edited at the
+    watermark itself are read again, so no edits are lost to the one second
+    precision.
+
+    Input
+          output          dict    Result of tableToDict with keyField, or an
+                                  empty dictionary for the first read.
+          table           str     Path to the table.
+          keyField        str     Name of the field with the keys of output.
+          watermark       value   Watermark returned by the previous call.
+                                  None reads the entire table.
+          watermarkField  str     Field the watermark is taken from. Default
+                                  is the editor tracking field of the table if
+                                  enabled, and the object id field otherwise.
+          sqlQuery, fields, field_case, ordered
+                                  As for tableToDict, and must be the same as
+                                  for the original read.
+          detectDeletes   bool    Remove rows from output that are no longer
+                                  in the table.
+
+    Output
+          watermark       value   Watermark to pass to the next call.
+
+    Example:
+        lookup = {}
+        watermark = refresh_table_dict(lookup, table, 'id')
+        ...
+        watermark = refresh_table_dict(lookup, table, 'id', watermark)
+    """
+
+    desc = arcpy.Describe(table)
+    if not watermarkField:
+        if getattr(desc, 'editorTrackingEnabled', False) and desc.editedAtFieldName:
+            watermarkField = desc.editedAtFieldName
+        elif desc.hasOID:
+            watermarkField = desc.OIDFieldName
+        else:
+            raise FieldException('Table %s has no object id or editor tracking field to use as watermark.' % table)
+
+    watermark_fields = [f for f in arcpy.ListFields(table) if f.name.lower() == watermarkField.lower()]
+    if not watermark_fields:
+        raise MissingFieldException('Field [%s] not found in %s' % (watermarkField, table))
+    watermark_type = watermark_fields[0].type
+
+    # Take the new watermark before reading, so edits made during the read are read again next time.
+    with _phase('refresh_table_dict', 'watermark'):
+        new_watermark = _max_value(table, watermarkField)
+
+    where_clause = sqlQuery
+    if watermark is not None:
+        delimited = arcpy.AddFieldDelimiters(table, watermarkField)
+        if watermark_type == 'Date':
+            condition = '%s >= %s' % (delimited, _date_literal(table, watermark))
+        elif watermark_type in ('OID', 'Integer', 'SmallInteger', 'Double', 'Single'):
+            condition = '%s > %r' % (delimited, watermark)
+        else:
+            raise FieldException('Field %s of type %s can not be used as watermark.' % (watermarkField, watermark_type))
+        where_clause = '(%s) AND (%s)' % (sqlQuery, condition) if sqlQuery else condition
+
+    changed = tableToDict(table, where_clause, keyField=keyField, fields=fields, field_case=field_case, ordered=ordered)
+    output.update(changed)
+
+    if detectDeletes and watermark is not None:
+        with _phase('refresh_table_dict', 'key scan') as phase:
+            with arcpy.da.SearchCursor(table, [keyField], where_clause=sqlQuery) as cursor:
+                keys = set(row[0] for row in cursor)
+            phase['rows'] = len(keys)
+        for key in [key for key in output if key not in keys]:
+            del output[key]
+
+    return new_watermark if new_watermark is not None else watermark
+
+
+def iter_groups(table, groupBy, sqlQuery='', fields=[], field_case='', ordered=False, sortField=None):
+    """
+    Iterate over the groups of a table, one group at a time. Same as
+    tableToDict(table, groupBy=groupBy).items(), but only the rows of one
+    group are held in memory, so huge tables can be processed group by
+    group.
+
+    The rows are sorted by groupBy in the database with ORDER BY, and
+    the groups are yielded in that order. Raises MethodException if the
+    workspace returns the rows unsorted.
+
+    Input
+          table           str     Path to the table.
+          groupBy         str     Name of column to group the rows by.
+          sqlQuery        str     SQL query to perform a selection of the data
+                                  within the table.
+          fields          list    List of field names that should be included
+                                  in the rows. Must include groupBy. Default
+                                  gets all fields.
+          field_case      str     Indicate if the dictionary field names
+                                  should be forced "upper" or "lower" case.
+          ordered         bool    Rows are dict (False) or OrderedDict (True)
+                                  with the same field order as in the table.
+          sortField       str/list Field, or list of fields, to sort the rows
+                                  within each group by. Append " DESC" for
+                                  descending order.
+
+    Output
+          (value, rows)   Generator of groupBy values and the list of row
+                          dictionaries in the group.
+    """
+
+    fields = _cursor_fields(table, fields)
+    if groupBy not in fields:
+        raise MissingFieldException('groupBy field %s must be part of fields.' % groupBy)
+    group_index = fields.index(groupBy)
+
+    dict_func = OrderedDict if ordered else dict
+    case_fields = _case_fields(fields, field_case)
+    sql_clause = (None, _order_by(table, [groupBy], sortField))
+
+    seen = set()
+    with arcpy.da.SearchCursor(table, fields, where_clause=sqlQuery, sql_clause=sql_clause) as cursor:
+        for value, rows in itertools.groupby(cursor, operator.itemgetter(group_index)):
+            if value in seen:
+                raise MethodException('Rows of %s are not sorted by %s. The workspace does not support ORDER BY.' % (table, groupBy))
+            seen.add(value)
+            yield value, [dict_func(zip(case_fields, row)) for row in rows]
+
+
+# Statistics supported by aggregate:
+_aggregate_statistics = ('COUNT', 'SUM', 'MEAN', 'MIN', 'MAX')
+
+
+def aggregate(table, groupBy, statistics, sqlQuery='', engine='auto'):
+    """
+    Summary statistics per group of a table, calculated where the data is
+    instead of reading every row into dictionaries.
+
+    The statistics are pushed to the workspace with Statistics_analysis
+    (SQL GROUP BY in the SQLite backend). With a sqlQuery, the selection is
+    made with MakeTableView_management. Backends without these tools fall
+    back to reading the columns once and reducing them with numpy.
+
+    Input
+          table           str     Path to the table.
+          groupBy         str/list Name of field, or list of fields, to group
+                                  the rows by.
+          statistics      list    List of (field, statistic) pairs, where
+                                  statistic is one of COUNT, SUM, MEAN, MIN
+                                  and MAX. Same as the statistics_fields of
+                                  Statistics_analysis.
+          sqlQuery        str     SQL query to perform a selection of the data
+                                  within the table.
+          engine          str     "tool" for Statistics_analysis, "numpy" for
+                                  reading the columns and reducing them in
+                                  memory, "auto" for the tool when available.
+
+    Output
+          output          dict    Dictionary like tableToDict with keyField,
+                                  with the groupBy values as keys (tuples for
+                                  several groupBy fields). Each row holds the
+                                  groupBy fields, FREQUENCY, and the
+                                  statistics named [STATISTIC]_[field] as by
+                                  Statistics_analysis, e.g. SUM_age.
+                                  Statistics of groups without values are
+                                  None, except COUNT which is 0.
+
+    Example:
+        aggregate(table, 'name', [('age', 'MEAN'), ('id', 'COUNT')])
+        => {'name_0': {'name': 'name_0', 'FREQUENCY': 9, 'MEAN_age': 32.5, 'COUNT_id': 9}, ...}
+    """
+
+    if isinstance(groupBy, str):
+        groupBy = [groupBy]
+    groupBy = list(groupBy)
+    statistics = [(field, statistic.upper()) for field, statistic in statistics]
+    for field, statistic in statistics:
+        if statistic not in _aggregate_statistics:
+            raise MethodException('Statistic %s not valid. Valid options are %s.' % (statistic, ', '.join(_aggregate_statistics)))
+
+    if engine == 'auto':
+        engine = 'tool' if hasattr(arcpy, 'Statistics_analysis') and (not sqlQuery or hasattr(arcpy, 'MakeTableView_management')) else 'numpy'
+    if engine not in ('tool', 'numpy'):
+        raise MethodException('Engine %s not valid. Valid options are "auto", "tool" and "numpy".' % engine)
+
+    with _phase('aggregate', 'describe'):
+        _cursor_fields(table, groupBy + [field for field, _ in statistics])
+
+    if engine == 'tool':
+        rows = _aggregate_with_tool(table, groupBy, statistics, sqlQuery)
+    else:
+        rows = _aggregate_with_numpy(table, groupBy, statistics, sqlQuery)
+
+    output = {}
+    for row in rows:
+        key = tuple(row[field] for field in groupBy)
+        output[key[0] if len(key) == 1 else key] = row
+    return output
+
+
+def _aggregate_with_tool(table, groupBy, statistics, sqlQuery):
+    statistics_table = 'in_memory\\arctools_statistics'
+    if arcpy.Exists(statistics_table):
+        arcpy.Delete_management(statistics_table)
+
+    view = None
+    try:
+        with _phase('aggregate', 'statistics'):
+            if sqlQuery:
+                view = str(arcpy.MakeTableView_management(table, 'arctools_statistics_view', sqlQuery))
+            statistics_table = str(arcpy.Statistics_analysis(view or table, statistics_table, [list(s) for s in statistics], groupBy))
+        with _phase('aggregate', 'read') as phase:
+            names = groupBy + ['FREQUENCY'] + ['%s_%s' % (statistic, field) for field, statistic in statistics]
+            with arcpy.da.SearchCursor(statistics_table, names) as cursor:
+                rows = [dict(zip(names, row)) for row in cursor]
+            phase['rows'] = len(rows)
+    finally:
+        for dataset in (view, statistics_table):
+            if dataset and arcpy.Exists(dataset):
+                arcpy.Delete_management(dataset)
+
+    # Counts of groups without values are 0, as with the numpy engine.
+    for row in rows:
+        for field, statistic in statistics:
+            if statistic == 'COUNT' and row['COUNT_' + field] is None:
+                row['COUNT_' + field] = 0
+    return rows
+
+
+def _aggregate_with_numpy(table, groupBy, statistics, sqlQuery):
+    value_fields = []
+    for field, _ in statistics:
+        if field not in value_fields and field not in groupBy:
+            value_fields += [field]
+    fields = groupBy + value_fields
+
+    with _phase('aggregate', 'read') as phase:
+        with arcpy.da.SearchCursor(table, fields, where_clause=sqlQuery) as cursor:
+            columns = list(zip(*cursor))
+        phase['rows'] = len(columns[0]) if columns else 0
+
+    if not columns:
+        return []
+    columns = dict(zip(fields, columns))
+
+    with _phase('aggregate', 'reduce') as phase:
+        group_index = {}
+        groups = numpy.array([group_index.setdefault(key, len(group_index)) for key in zip(*[columns[f] for f in groupBy])], dtype='int64')
+        group_count = len(group_index)
+
+        frequency = numpy.bincount(groups, minlength=group_count)
+        rows = [dict(zip(groupBy, key), FREQUENCY=int(frequency[i])) for key, i in group_index.items()]
+
+        for field, statistic in statistics:
+            values = _grouped_statistic(groups, group_count, columns[field], statistic)
+            for row, value in zip(rows, values):
+                row['%s_%s' % (statistic, field)] = value
+        phase['rows'] = len(groups)
+
+    return rows
+
+
+def _grouped_statistic(groups, group_count, values, statistic):
+    """
+    Reduce values per group with numpy. groups holds the group number of
+    each value. None values are left out. Returns a list with the statistic
+    of each group, None for groups without values except for COUNT.
+    """
+
+    present = numpy.array([v is not None for v in values], dtype='bool')
+    count = numpy.bincount(groups, weights=present, minlength=group_count).astype('int64')
+    if statistic == 'COUNT':
+        return [int(c) for c in count]
+
+    try:
+        array = numpy.array(values, dtype='float64')  # None becomes nan.
+    except (TypeError, ValueError):
+        array = None
+
+    if array is None:
+        # Not numeric, e.g. text or dates. Only ordering is defined.
+        if statistic not in ('MIN', 'MAX'):
+            raise FieldException('Statistic %s requires a numeric field.' % statistic)
+        reduce = min if statistic == 'MIN' else max
+        result = [None] * group_count
+        for group, value in zip(groups, values):
+            if value is not None:
+                result[group] = value if result[group] is None else reduce(result[group], value)
+        return result
+
+    if statistic in ('SUM', 'MEAN'):
+        result = numpy.bincount(groups, weights=numpy.where(present, array, 0.0), minlength=group_count)
+        if statistic == 'MEAN':
+            result = result / numpy.maximum(count, 1)
+    else:
+        result = numpy.full(group_count, numpy.inf if statistic == 'MIN' else -numpy.inf)
+        (numpy.fmin if statistic == 'MIN' else numpy.fmax).at(result, groups, array)
+
+    # Keep integers integers, as in the database.
+    integers = statistic != 'MEAN' and all(isinstance(v, int) and not isinstance(v, bool) for v in values if v is not None)
+    return [None if not c else (int(v) if integers else float(v)) for c, v in zip(count, result)]
+
+
+class ZonalArrays(object):
+    """
+    Zonal statistics as arrays, returned by zonal_statistics_as_dict with
+    output='arrays'.
+
+    zones           array   Sorted zone ids. Whole number ids are integers
+                            in the output of zonal_statistics_as_dict.
+    statistics      dict    Array per method, aligned with zones.
+    zone_key_field  str     Name of the zone field in the dictionaries of
+                            to_dict.
+
+    results['mean'] is the array of a method, and to_dict() gives the
+    dictionary of zonal_statistics_as_dict with output='dict'.
+    """
+
+    def __init__(self, zones, statistics, zone_key_field='id'):
+        self.zones = numpy.asarray(zones)
+        self.statistics = statistics
+        self.zone_key_field = zone_key_field
+
+    def __len__(self):
+        return len(self.zones)
+
+    def __getitem__(self, method):
+        return self.statistics[method]
+
+    def to_dict(self):
+        """Dictionary of dictionaries keyed by zone id, with the zone id in
+        zone_key_field and a value per method."""
+
+        fields = [self.zone_key_field] + list(self.statistics)
+        columns = [self.zones.tolist()] + [array.tolist() for array in self.statistics.values()]
+        return {row[0]: dict(zip(fields, row)) for row in zip(*columns)}
+
+
+def _integer_zones(zones):
+    """Float zone ids as int64 when they are all whole numbers that convert
+    without loss, otherwise unchanged."""
+
+    if zones.dtype.kind != 'f' or not len(zones):
+        return zones
+    if numpy.isfinite(zones).all() and (zones == numpy.round(zones)).all() and numpy.abs(zones).max() < 2 ** 53:
+        return zones.astype('int64')
+    return zones
+
+
+def _zonal_output(results, output):
+    """ZonalArrays with whole number zone ids as integers for output='arrays',
+    otherwise the dictionary of to_dict, keyed as the zone data."""
+
+    if output == 'arrays':
+        results.zones = _integer_zones(results.zones)
+        return results
+    return results.to_dict()
+
+
+def zonal_statistics_as_dict(value_data, zone_data, method='mean', value_key_field='', zone_key_field='', zone_batch_size=None, processes=1, output='dict'):
+    """Calculate the zonal statistics between to seperate datasets. Accepts zone data as both raster and polygon data.
+
+    RETURNS: dictionary containing the values calculated by metod, with unique zone_data values as keys. With
+    output='arrays', returns ZonalArrays instead: the sorted zone ids and an array per method, which is far cheaper
+    for many zones, and where whole number zone ids are integers.
+
+    The Zonal data is the most important in terms of geographical extent, therefore we always assume that this is ground
+    proof. Any spatial adjustments are therefore done to the value data, in terms of extent. This means that if zone
+    data is polygonal of origin, we convert the value data to polygon, and perform an intersect. If the zone data is
+    raster, we convert both to matching extent raster datasets.
+
+    When the rasters are estimated to need more than memoryBudget, they are read in blocks of rows, and the statistics
+    of the blocks are merged.
+
+    Polygon zones are intersected in batches of zone_batch_size zones when it is set, or when the zones and value
+    features are estimated to need more than memoryBudget. The batches are spatially compact groups of zones from a
+    grid over their extents, and each is intersected only with the value features within its envelope. With processes
+    above 1, the batches are intersected in a pool of processes, which requires value data on disk. The statistics of
+    the batches are merged per zone key, so zones split over several features and batches are handled.
+    """
+
+    raster_precision = 1000
+
+    if output not in ('dict', 'arrays'):
+        raise MethodException('Output %s not valid. Valid options are "dict" and "arrays".' % output)
+
+    accepted_types = ['FeatureClass', 'RasterDataset', 'MosaicDataset']
+
+    with _phase('zonal_statistics_as_dict', 'describe'):
+        zone_data_desc = arcpy.Describe(zone_data)
+        value_data_desc = arcpy.Describe(value_data)
+
+    # Input check:
+    if value_data_desc.datasetType not in accepted_types:
+        raise InputTypeException('value_data of type %s is not an accepted data type' % value_data_desc.datasetType)
+    if zone_data_desc.datasetType not in accepted_types:
+        raise InputTypeException('zone_data of type %s is not an accepted data type' % zone_data_desc.datasetType)
+    if value_data_desc.datasetType == 'FeatureClass' and not value_key_field:
+        raise InputTypeException('value_data is type FeatureClass, but value_key_field is empty.')
+    if zone_data_desc.datasetType == 'FeatureClass' and not zone_key_field:
+        raise InputTypeException('zone_data is type FeatureClass, but zone_key_field is empty.')
+#    if not (value_data_desc.datasetType == 'RasterDataset' or zone_data_desc.datasetType == 'RasterDataset'):
+#        raise InputTypeException('One of input types must be a raster')
+    if not (value_data_desc.spatialReference.PCSCode == zone_data_desc.spatialReference.PCSCode and value_data_desc.spatialReference.GCSCode == zone_data_desc.spatialReference.GCSCode):
+        raise InputTypeException('Non matching coordinate systems between inputs.')
+
+    # If zone data is feature class, perform intersect instead of zonal statistics:
+    if zone_data_desc.datasetType == 'FeatureClass':
+        if value_data_desc.dataType == 'RasterDataset':
+
+            with _phase('zonal_statistics_as_dict', 'raster conversion'):
+                _check_out_arcgis_license()
+                scaled_value = arcpy.sa.Times(value_data, raster_precision)
+                int_scaled_value = arcpy.sa.Int(scaled_value)
+                if processes > 1:
+                    # The worker processes can not see the in_memory workspace of this process.
+                    value_data_path = os.path.join(str(arcpy.env.scratchGDB), 'arctools_raster_conversion')
+                else:
+                    value_data_path = r'in_memory\raster_conversion'
+                if arcpy.Exists(value_data_path):
+                    arcpy.Delete_management(value_data_path)
+                arcpy.env.extent = zone_data
+                arcpy.RasterToPolygon_conversion(int_scaled_value, value_data_path, 'NO_SIMPLIFY')
+                arcpy.env.extent = "MAXOF"
+                _check_in_arcgis_licence()
+                arcpy.AddField_management(value_data_path, 'value', 'DOUBLE')
+
+                with arcpy.da.UpdateCursor(value_data_path, ['gridcode', 'value']) as cursor:
+                    for row in cursor:
+                        row[1] = row[0]/raster_precision
+                        cursor.updateRow(row)
 
-        value = arcpy.RasterToNumPyArray(str(value_raster))
-        if value.dtype is arcpy.numpy.dtype('uint8'):
-            value = value.astype('float64')
-            value[value == 255] = None
         else:
-            value = value.astype('float64')
-            value[value == value_desc.noDataValue] = None
+            value_data_path = value_data
+
+        if not value_key_field:
+            value_key_field = 'value'
+        if not zone_key_field:
+            zone_key_field = 'id'  # For calculation results we need some kind of name for the zone ids.
 
-        zone = arcpy.RasterToNumPyArray(str(zone_raster))
-        if zone.dtype is arcpy.numpy.dtype('uint8'):
-            zone = zone.astype('float64')
-            zone[zone == 255] = None
+        if zone_batch_size is None and memoryBudget is not None:
+            # The intersect holds the zones and the value features they overlap.
+            with _phase('zonal_statistics_as_dict', 'estimate'):
+                zone_count, zone_bytes = _estimate_table_bytes(zone_data, ['SHAPE@'])
+                estimate = zone_bytes + _estimate_table_bytes(value_data_path, ['SHAPE@'])[1]
+            if _execution_plan('zonal_statistics_as_dict', estimate, 'chunked') == 'chunked':
+                zone_batch_size = max(1, int(zone_count * memoryBudget / estimate))
+
+        task = {'zone_data': zone_data, 'value_data': value_data_path, 'zone_key_field': zone_key_field,
+                'value_key_field': value_key_field, 'zone_where': None, 'envelope': None, 'batch': 0}
+        if not zone_batch_size:
+            tasks = [task]
+        else:
+            with _phase('zonal_statistics_as_dict', 'index'):
+                tasks = _zonal_intersect_tasks(task, zone_batch_size)
+
+        partials = {}
+        if processes > 1 and len(tasks) > 1:
+            if _is_in_memory(value_data_path):
+                raise InputTypeException('Parallel intersects need value data on disk, not in %s.' % value_data_path)
+            pool = multiprocessing.Pool(processes)
+            try:
+                for batch_partials in pool.imap_unordered(_zonal_intersect_task, tasks):
+                    _merge_intersect_partials(partials, batch_partials)
+            finally:
+                pool.close()
+                pool.join()
         else:
-            zone = zone.astype('float64')
-            zone[zone == zone_desc.noDataValue] = None
+            for task in tasks:
+                _merge_intersect_partials(partials, _zonal_intersect_task(task))
+
+        if value_data_path != value_data:
+            arcpy.Delete_management(value_data_path)
+
+        zones = sorted(partials, key=lambda k: (k is None, k))
+        weighted, area, total, minimum, maximum = numpy.array([partials[k] for k in zones], dtype='float64').reshape(-1, 5).T
+        statistics = OrderedDict()
+        with numpy.errstate(invalid='ignore', divide='ignore'):
+            if 'mean' in method:
+                statistics['mean'] = weighted / area
+            if 'sum' in method:
+                statistics['sum'] = total
+            if 'max' in method:
+                statistics['max'] = maximum
+            if 'min' in method:
+                statistics['min'] = minimum
+        results = ZonalArrays(numpy.array(zones), statistics, zone_key_field)
+
+        return _zonal_output(results, output)
+
+    else:
+        # Set the loaded raster as snapRaster:
+        if zone_data_desc.datasetType == 'RasterDataset':
+            frame_raster = zone_data
+            frame_desc = zone_data_desc
+        elif value_data_desc.datasetType == 'RasterDataset':
+            frame_raster = value_data
+            frame_desc = value_data_desc
+
+        if zone_data_desc.datasetType == 'FeatureClass' and frame_desc.meanCellHeight > 10:
+            raise InputTypeException('Raster resolution is too poor. Zone precision will be hampered.')
+
+        arcpy.env.snapRaster = str(frame_raster)
+        arcpy.env.extent = arcpy.Describe(frame_raster).extent
+
+        with _phase('zonal_statistics_as_dict', 'raster conversion'):
+            # Convert to raster if value is polygon:
+            if value_data_desc.datasetType == 'RasterDataset':
+                value_raster = value_data
+            elif value_data_desc.datasetType == 'FeatureClass':
+                value_raster = arcpy.PolygonToRaster_conversion(value_data, value_field=value_key_field, cellsize=frame_desc.meanCellHeight)
+            else:
+                raise InputTypeException('The provided zone_data is not a supported data format.')
+
+            # Convert to raster if zone is polygon:
+            if zone_data_desc.datasetType == 'RasterDataset':
+                zone_raster = zone_data
+            elif zone_data_desc.datasetType == 'FeatureClass':
+                zone_raster = arcpy.PolygonToRaster_conversion(zone_data, value_field=zone_key_field, cellsize=frame_desc.meanCellHeight)
+            else:
+                raise InputTypeException('The provided zone_data is not a supported data format.')
+
+        zone_desc = arcpy.Describe(zone_raster)
+        value_desc = arcpy.Describe(value_raster)
+
+        # Assert that resulting rasters align:
+        assert value_desc.spatialReference.PCSCode == zone_desc.spatialReference.PCSCode
+        assert value_desc.spatialReference.GCSCode == zone_desc.spatialReference.GCSCode
+        assert value_desc.extent.lowerLeft.Y == zone_desc.extent.lowerLeft.Y
+        assert value_desc.extent.lowerLeft.X == zone_desc.extent.lowerLeft.X
+        assert value_desc.meanCellHeight == zone_desc.meanCellHeight
+        assert value_desc.meanCellWidth == zone_desc.meanCellWidth
 
         if not zone_key_field:
             zone_key_field = 'id'  # For calculation results we need some kind of name for the zone ids.
 
-        return _zonal_statistics_as_dict(value, zone, method, zone_key_field)
+        if memoryBudget is not None:
+            cells = zone_desc.height * zone_desc.width
+            if _execution_plan('zonal_statistics_as_dict', cells * _zonal_cell_bytes, 'tiled') == 'tiled':
+                block_rows = max(1, int(memoryBudget // (zone_desc.width * _zonal_cell_bytes)))
+                results = _zonal_statistics_tiled(value_raster, zone_raster, method, zone_key_field, block_rows)
+                return _zonal_output(results, output)
+
+        with _phase('zonal_statistics_as_dict', 'read') as phase:
+            value = _raster_to_array(value_raster)
+            zone = _raster_to_array(zone_raster)
+            phase['rows'] = value.size
+
+        with _phase('zonal_statistics_as_dict', 'statistics') as phase:
+            results = _zonal_statistics_arrays(value, zone, method, zone_key_field)
+            phase['rows'] = value.size
+
+        with _phase('zonal_statistics_as_dict', 'output'):
+            results = _zonal_output(results, output)
+
+        return results
+
+
+def _is_in_memory(dataset):
+    return str(dataset).replace('/', '\\').lower().startswith('in_memory\\')
+
+
+def _spatial_batches(extents, batch_size):
+    """
+    Split features into spatially compact batches of at most batch_size
+    features. extents is an array of (XMin, YMin, XMax, YMax) rows. The
+    centres of the extents are put in a grid of about batch_size features
+    per cell, which is visited row by row in alternating directions, so
+    consecutive cells are neighbours. Returns arrays of row indexes.
+    """
+
+    extents = numpy.asarray(extents, dtype='float64').reshape(-1, 4)
+    if len(extents) <= batch_size:
+        return [numpy.arange(len(extents))]
+
+    cells = int(numpy.ceil(numpy.sqrt(len(extents) / float(batch_size))))
+    centres = (extents[:, :2] + extents[:, 2:]) / 2
+    low, high = centres.min(axis=0), centres.max(axis=0)
+    size = numpy.where(high > low, high - low, 1.0)
+    col, row = numpy.minimum((cells * (centres - low) / size).astype(int), cells - 1).T
+    col = numpy.where(row % 2, cells - 1 - col, col)
+    order = numpy.argsort(row * cells + col, kind='stable')
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def _zonal_intersect_tasks(task, zone_batch_size):
+    """Split an intersect task of zonal_statistics_as_dict into batches of
+    zones, each with a where clause selecting its zones by object id and
+    the envelope of their extents."""
+
+    oid_field = arcpy.Describe(task['zone_data']).OIDFieldName
+    oids, extents = [], []
+    with arcpy.da.SearchCursor(task['zone_data'], ['OID@', 'SHAPE@WKB']) as cursor:
+        for oid, wkb in cursor:
+            extent = _wkb_extent(wkb)
+            if extent is not None:  # Empty zones intersect nothing.
+                oids += [oid]
+                extents += [extent]
+    extents = numpy.asarray(extents, dtype='float64').reshape(-1, 4)
+
+    tasks = []
+    for i, batch in enumerate(_spatial_batches(extents, zone_batch_size)):
+        where = ' OR '.join('(%s)' % clause for clause in _key_where_clauses(task['zone_data'], oid_field, [oids[j] for j in batch]))
+        envelope = tuple(float(v) for v in numpy.concatenate([extents[batch, :2].min(axis=0), extents[batch, 2:].max(axis=0)]))
+        tasks += [dict(task, zone_where=where, envelope=envelope, batch=i)]
+    return tasks
+
+
+def _zonal_intersect_task(task):
+    """
+    Intersect the zones of a task from _zonal_intersect_tasks with the value
+    features within its envelope, and return the partial statistics per
+    zone key as [area weighted sum, area, sum, min, max]. Also run in
+    worker processes.
+    """
+
+    zone_data, value_data = task['zone_data'], task['value_data']
+    layers = []
+    if task['zone_where'] is not None:
+        zone_data = 'arctools_zones_%d' % task['batch']
+        arcpy.MakeFeatureLayer_management(task['zone_data'], zone_data, task['zone_where'])
+        layers += [zone_data]
+    if task['envelope'] is not None:
+        x_min, y_min, x_max, y_max = task['envelope']
+        corners = [(x_min, y_min), (x_min, y_max), (x_max, y_max), (x_max, y_min), (x_min, y_min)]
+        envelope = arcpy.Polygon(arcpy.Array([arcpy.Point(x, y) for x, y in corners]), arcpy.Describe(task['zone_data']).spatialReference)
+        value_data = 'arctools_values_%d' % task['batch']
+        arcpy.MakeFeatureLayer_management(task['value_data'], value_data)
+        arcpy.SelectLayerByLocation_management(value_data, 'INTERSECT', envelope)
+        layers += [value_data]
+
+    intersect = os.path.join('in_memory', 'arctools_intersect_%d' % task['batch'])
+    try:
+        with _phase('zonal_statistics_as_dict', 'intersect'):
+            if arcpy.Exists(intersect):
+                arcpy.Delete_management(intersect)
+            arcpy.Intersect_analysis([zone_data, value_data], intersect)
+
+        partials = {}
+        with _phase('zonal_statistics_as_dict', 'statistics') as phase:
+            phase['rows'] = 0
+            with arcpy.da.SearchCursor(intersect, [task['zone_key_field'], task['value_key_field'], 'SHAPE@AREA']) as cursor:
+                for zone, value, area in cursor:
+                    phase['rows'] += 1
+                    partial = partials.get(zone)
+                    if partial is None:
+                        partials[zone] = [value * area, area, value, value, value]
+                    else:
+                        partial[0] += value * area
+                        partial[1] += area
+                        partial[2] += value
+                        partial[3] = min(partial[3], value)
+                        partial[4] = max(partial[4], value)
+        return partials
+    finally:
+        for dataset in layers + [intersect]:
+            if arcpy.Exists(dataset):
+                arcpy.Delete_management(dataset)
+
+
+def _merge_intersect_partials(partials, other):
+    """Merge the partial statistics per zone key of other into partials."""
+
+    for zone, (weighted, area, total, minimum, maximum) in other.items():
+        partial = partials.get(zone)
+        if partial is None:
+            partials[zone] = [weighted, area, total, minimum, maximum]
+        else:
+            partial[0] += weighted
+            partial[1] += area
+            partial[2] += total
+            partial[3] = min(partial[3], minimum)
+            partial[4] = max(partial[4], maximum)
+
+
+def _raster_to_array(raster, lower_left_corner=None, ncols=0, nrows=0):
+    """Read a raster, or a block of it, to a float64 array with NoData as NaN."""
+
+    desc = arcpy.Describe(raster)
+    if lower_left_corner is None:
+        array = arcpy.RasterToNumPyArray(str(raster))
+    else:
+        array = arcpy.RasterToNumPyArray(str(raster), lower_left_corner, ncols, nrows)
+
+    if array.dtype is numpy.dtype('uint8'):
+        no_data = 255
+    else:
+        no_data = desc.noDataValue
+
+    array = array.astype('float64')
+    array[array == no_data] = None
+    return array
 
 
 def _zonal_statistics_as_dict(value_array, zone_array, methods='mean', zone_key_field='id'):
@@ -686,6 +2420,13 @@ def _zonal_statistics_as_dict(value_array, zone_array, methods='mean', zone_key_
     RETURNS: dictionary containing the values calculated by method, with
     unique zone_array values as keys."""
 
+    return _zonal_statistics_arrays(value_array, zone_array, methods, zone_key_field).to_dict()
+
+
+def _zonal_statistics_arrays(value_array, zone_array, methods='mean', zone_key_field='id'):
+    """Zonal statistics of pre-aligned numpy arrays of values and zones with
+    scipy-ndimage, as ZonalArrays."""
+
     _check_out_arcgis_license()
 
     if not isinstance(methods, list):
@@ -708,18 +2449,101 @@ def _zonal_statistics_as_dict(value_array, zone_array, methods='mean', zone_key_
     mask = ~numpy.isnan(zone_array)
     mask[mask == numpy.isnan(value_array)] = False  # Mask is now the intersect between all non-nan cells.
 
-    dictionary = {zone: {zone_key_field: zone} for zone in unique_groups}
+    statistics = OrderedDict()
     for m in methods:
-        results = valid_methods[m](value_array[mask],
-                                   zone_array[mask],
-                                   unique_groups)
-
-        for i, zone in enumerate(dictionary):
-            dictionary[zone][m] = results[i]
+        statistics[m] = numpy.asarray(valid_methods[m](value_array[mask],
+                                                       zone_array[mask],
+                                                       unique_groups), dtype='float64')
 
     _check_in_arcgis_licence()
 
-    return dictionary
+    return ZonalArrays(unique_groups, statistics, zone_key_field)
+
+
+# Estimated bytes per cell of _zonal_statistics_as_dict: the value and zone
+# arrays as float64, their masked copies and the masks.
+_zonal_cell_bytes = 48
+
+
+def _zonal_statistics_tiled(value_raster, zone_raster, methods='mean', zone_key_field='id', block_rows=1024):
+    """Zonal statistics of aligned rasters read in blocks of block_rows
+    rows. The count, sum, min and max per zone of each block are merged, so
+    only one block is held in memory. Returns ZonalArrays, as
+    _zonal_statistics_arrays."""
+
+    desc = arcpy.Describe(zone_raster)
+    extent = desc.extent
+    partials = []
+    for first in range(0, desc.height, block_rows):
+        nrows = min(block_rows, desc.height - first)
+        # Corner in the middle of the lower left cell, so rounding can not select a neighbouring cell.
+        corner = arcpy.Point(extent.XMin + desc.meanCellWidth / 2, extent.YMax - (first + nrows - 0.5) * desc.meanCellHeight)
+        with _phase('zonal_statistics_as_dict', 'read') as phase:
+            value = _raster_to_array(value_raster, corner, desc.width, nrows)
+            zone = _raster_to_array(zone_raster, corner, desc.width, nrows)
+            phase['rows'] = value.size
+        with _phase('zonal_statistics_as_dict', 'statistics') as phase:
+            partials += [_zonal_partials(value, zone)]
+            phase['rows'] = value.size
+
+    with _phase('zonal_statistics_as_dict', 'merge'):
+        return _zonal_partials_to_arrays(_merge_zonal_partials(partials), methods, zone_key_field)
+
+
+def _zonal_partials(value_array, zone_array):
+    """Zones of zone_array, with the count, sum, min and max of the values
+    of value_array per zone, over the cells where both arrays have values."""
+
+    zone_mask = ~numpy.isnan(zone_array)
+    zones = numpy.unique(zone_array[zone_mask])
+    mask = zone_mask & ~numpy.isnan(value_array)
+    values = value_array[mask]
+    groups = numpy.searchsorted(zones, zone_array[mask])
+
+    count = numpy.bincount(groups, minlength=len(zones))
+    total = numpy.bincount(groups, weights=values, minlength=len(zones))
+    minimum = numpy.full(len(zones), numpy.inf)
+    numpy.minimum.at(minimum, groups, values)
+    maximum = numpy.full(len(zones), -numpy.inf)
+    numpy.maximum.at(maximum, groups, values)
+    return zones, count, total, minimum, maximum
+
+
+def _merge_zonal_partials(partials):
+    """Merge the results of _zonal_partials for parts of the same rasters."""
+
+    zones, count, total, minimum, maximum = [numpy.concatenate(arrays) for arrays in zip(*partials)]
+    merged_zones, groups = numpy.unique(zones, return_inverse=True)
+    merged_minimum = numpy.full(len(merged_zones), numpy.inf)
+    numpy.minimum.at(merged_minimum, groups, minimum)
+    merged_maximum = numpy.full(len(merged_zones), -numpy.inf)
+    numpy.maximum.at(merged_maximum, groups, maximum)
+    return (merged_zones,
+            numpy.bincount(groups, weights=count, minlength=len(merged_zones)),
+            numpy.bincount(groups, weights=total, minlength=len(merged_zones)),
+            merged_minimum,
+            merged_maximum)
+
+
+def _zonal_partials_to_arrays(partials, methods='mean', zone_key_field='id'):
+    """ZonalArrays from the merged results of _zonal_partials. Zones
+    without values get a mean of NaN, and a sum, min and max of 0, as with
+    ndimage."""
+
+    if not isinstance(methods, list):
+        methods = [methods]
+    zones, count, total, minimum, maximum = partials
+    empty = count == 0
+
+    with numpy.errstate(invalid='ignore', divide='ignore'):
+        results = {'mean': total / count,
+                   'sum': total,
+                   'max': numpy.where(empty, 0.0, maximum),
+                   'min': numpy.where(empty, 0.0, minimum)}
+    for m in methods:
+        assert m in results
+
+    return ZonalArrays(zones, OrderedDict((m, results[m]) for m in methods), zone_key_field)
 
 
 def list_unwritable_fields(table, describe_object=None):
@@ -743,7 +2567,59 @@ def list_unwritable_fields(table, describe_object=None):
     return unwritable_fields
 
 
-def create_filled_contours(raster, output_feature_class, explicit_contour_list, create_complete_polygons=False, raster_edge_crop_distance=10):
+def _polygon_raster_means(polygons, oid_field, raster, scratch_workspace='in_memory'):
+    """
+    Mean raster value of each polygon, keyed by object id. The polygon object
+    ids are rasterized once onto the grid of the raster, and the means are
+    calculated by _zonal_statistics_as_dict, so no intermediate table is
+    written.
+    """
+
+    zone_raster = os.path.join(scratch_workspace, 'arctools_polygon_oid_raster')
+
+    desc = arcpy.Describe(raster)
+    snap_raster, extent = arcpy.env.snapRaster, arcpy.env.extent
+    try:
+        arcpy.env.snapRaster = str(raster)
+        arcpy.env.extent = desc.extent
+        if arcpy.Exists(zone_raster):
+            arcpy.Delete_management(zone_raster)
+        arcpy.PolygonToRaster_conversion(polygons, oid_field, zone_raster, 'CELL_CENTER', '', desc.meanCellHeight)
+    finally:
+        arcpy.env.snapRaster, arcpy.env.extent = snap_raster, extent
+
+    # Read both rasters over the extent of the DEM, so the arrays align:
+    lower_left = desc.extent.lowerLeft
+    value = _raster_to_array(raster, lower_left, desc.width, desc.height)
+    zone = _raster_to_array(zone_raster, lower_left, desc.width, desc.height)
+    arcpy.Delete_management(zone_raster)
+
+    means = _zonal_statistics_arrays(value, zone, 'mean')
+    return dict(zip(means.zones.tolist(), means['mean'].tolist()))
+
+
+def _classify_to_contours(values, contour_levels):
+    """
+    Map each value to the top of the contour interval [bottom, top) it falls
+    within. Values below the lowest contour get the lowest contour, and
+    values at or above the highest contour get the highest contour. NaN values
+    are left as NaN.
+
+    Uses a binary search over the sorted contour levels, so the cost is
+    O(values * log(levels)).
+    """
+
+    levels = numpy.sort(numpy.asarray(contour_levels, dtype='float64'))
+    values = numpy.asarray(values, dtype='float64')
+
+    index = numpy.searchsorted(levels, values, side='right')
+    classified = levels[numpy.minimum(index, len(levels) - 1)]
+    classified[numpy.isnan(values)] = numpy.nan
+
+    return classified
+
+
+def create_filled_contours(raster, output_feature_class, explicit_contour_list, create_complete_polygons=False, raster_edge_crop_distance=10, zonal_engine='arcgis', callback=None, scratch_workspace='in_memory', return_report=False):
 
     '''
     Method for creating filled contours for a specified list of contours.
@@ -758,9 +2634,34 @@ def create_filled_contours(raster, output_feature_class, explicit_contour_list,
                                         polygons.
           explicit_contour_list list/float    A list containing the specific levels of
                                         every contour or a value for a single contour.
+          zonal_engine          str     How the mean elevation of each polygon is
+                                        calculated.
+                                            arcgis = ZonalStatisticsAsTable,
+                                                     read back via a table.
+                                            numpy  = Rasterize the polygon
+                                                     object ids onto the DEM
+                                                     grid, and calculate the
+                                                     means in memory.
+          callback              func    Called as callback(report, stage) when
+                                        each stage finishes. Defaults to
+                                        logging the stage to the arctools
+                                        logger. See TimingReport.
+          scratch_workspace     str     Workspace for intermediate data.
+          return_report         bool    Return (output, report), where report
+                                        is the TimingReport for the run.
+
+    Output
+          output                The path of output_feature_class for feature
+                                class output. A list of dictionaries or
+                                geometries when output_feature_class is a list
+                                or a Geometry. (output, report) with
+                                return_report.
 
     '''
 
+    if zonal_engine not in ['arcgis', 'numpy']:
+        raise MethodException('Zonal engine %s not valid. Valid options are "arcgis" and "numpy".' % zonal_engine)
+
     if not isinstance(explicit_contour_list,list):
         explicit_contour_list = [explicit_contour_list]
 
@@ -774,15 +2675,15 @@ def create_filled_contours(raster, output_feature_class, explicit_contour_list,
 
     explicit_contour_list = explicit_contour_list + (explicit_contour_list[-1]+regular_delta,)
 
-    contour_line = r'in_memory\arctools_contour_line'
-    fishnet_line= r'in_memory\arctools_fishnet_line'
-    polygons_raw = r'in_memory\polygons_raw'
-    polygon_raster_mean = r'in_memory\polygon_raster_mean'
-    polygons = r'in_memory\polygons'
-    contour_merge_line = r'in_memory\arctools_contour_merge_line'
-    contour_merge_line_buffer = r'in_memory\contour_merge_line_buffer'
-    buffer_centroid = r'in_memory\buffer_centroid'
-    level_join_polygons = r'in_memory\arctools_level_join_polygons'
+    contour_line = os.path.join(scratch_workspace, 'arctools_contour_line')
+    fishnet_line = os.path.join(scratch_workspace, 'arctools_fishnet_line')
+    polygons_raw = os.path.join(scratch_workspace, 'polygons_raw')
+    polygon_raster_mean = os.path.join(scratch_workspace, 'polygon_raster_mean')
+    polygons = os.path.join(scratch_workspace, 'polygons')
+    contour_merge_line = os.path.join(scratch_workspace, 'arctools_contour_merge_line')
+    contour_merge_line_buffer = os.path.join(scratch_workspace, 'contour_merge_line_buffer')
+    buffer_centroid = os.path.join(scratch_workspace, 'buffer_centroid')
+    level_join_polygons = os.path.join(scratch_workspace, 'arctools_level_join_polygons')
     level_lyr = 'level_lyr'
 
 
@@ -799,88 +2700,306 @@ def create_filled_contours(raster, output_feature_class, explicit_contour_list,
 ####
 
 
-    print('Create contours')
-    arcpy.CheckOutExtension('Spatial')
-    arcpy.sa.ContourWithBarriers(raster,contour_line,explicit_only = True, in_explicit_contours = explicit_contour_list)
-    arcpy.CheckInExtension('Spatial')
-
+    report = TimingReport('create_filled_contours', callback)
 
-    print('Create fishnet')
-    desc = arcpy.Describe(raster)
-    XMin = desc.extent.XMin+desc.meanCellWidth
-    XMax = desc.extent.XMax-desc.meanCellWidth
-    YMin = desc.extent.YMin+desc.meanCellHeight
-    YMax = desc.extent.YMax-desc.meanCellHeight
-    arcpy.env.overwriteOutput = True
-    arcpy.CreateFishnet_management(out_feature_class=fishnet_line, origin_coord='%0.4f %0.4f' % (XMin,YMin), y_axis_coord='%0.4f %0.4f' % (XMin,YMin+10), cell_width="0", cell_height="0", number_rows="1", number_columns="1", corner_coord='%0.4f %0.4f' % (XMax,YMax), labels="LABELS", template='%0.4f %0.4f %0.4f %0.4f' % (XMin,YMin,XMax,YMax), geometry_type="POLYLINE")
-    arcpy.DefineProjection_management(fishnet_line,desc.spatialReference)
+    with report.stage('contour') as stage:
+        arcpy.CheckOutExtension('Spatial')
+        arcpy.sa.ContourWithBarriers(raster,contour_line,explicit_only = True, in_explicit_contours = explicit_contour_list)
+        arcpy.CheckInExtension('Spatial')
+        stage['count'] = _count(contour_line)
 
-    print('Merge')
-    arcpy.env.overwriteOutput = True
-    arcpy.Merge_management(inputs=';'.join([contour_line,fishnet_line]), output=contour_merge_line, field_mappings="""Contour "Contour" true true false 8 Double 0 0 ,First,#,%(contour_line)s,Contour,-1,-1;Type "Type" true true false 4 Long 0 0 ,First,#,%(contour_line)s,Type,-1,-1;;Shape_Length "Shape_Length" false true true 8 Double 0 0 ,First,#,%(contour_line)s,Shape_Length,-1,-1,%(fishnet_line)s,Shape_Length,-1,-1""" % {'fishnet_line':fishnet_line,'contour_line':contour_line})
+    with report.stage('fishnet') as stage:
+        desc = arcpy.Describe(raster)
+        XMin = desc.extent.XMin+desc.meanCellWidth
+        XMax = desc.extent.XMax-desc.meanCellWidth
+        YMin = desc.extent.YMin+desc.meanCellHeight
+        YMax = desc.extent.YMax-desc.meanCellHeight
+        arcpy.env.overwriteOutput = True
+        arcpy.CreateFishnet_management(out_feature_class=fishnet_line, origin_coord='%0.4f %0.4f' % (XMin,YMin), y_axis_coord='%0.4f %0.4f' % (XMin,YMin+10), cell_width="0", cell_height="0", number_rows="1", number_columns="1", corner_coord='%0.4f %0.4f' % (XMax,YMax), labels="LABELS", template='%0.4f %0.4f %0.4f %0.4f' % (XMin,YMin,XMax,YMax), geometry_type="POLYLINE")
+        arcpy.DefineProjection_management(fishnet_line,desc.spatialReference)
+        stage['count'] = _count(fishnet_line)
 
-    print('Feature to polygon')
-    arcpy.FeatureToPolygon_management(in_features=contour_merge_line, out_feature_class=polygons_raw, cluster_tolerance="", attributes="ATTRIBUTES", label_features="")
+    with report.stage('merge') as stage:
+        arcpy.env.overwriteOutput = True
+        arcpy.Merge_management(inputs=';'.join([contour_line,fishnet_line]), output=contour_merge_line, field_mappings="""Contour "Contour" true true false 8 Double 0 0 ,First,#,%(contour_line)s,Contour,-1,-1;Type "Type" true true false 4 Long 0 0 ,First,#,%(contour_line)s,Type,-1,-1;;Shape_Length "Shape_Length" false true true 8 Double 0 0 ,First,#,%(contour_line)s,Shape_Length,-1,-1,%(fishnet_line)s,Shape_Length,-1,-1""" % {'fishnet_line':fishnet_line,'contour_line':contour_line})
+        stage['count'] = _count(contour_merge_line)
 
-    arcpy.AddField_management(polygons_raw,'Contour','DOUBLE')
+    with report.stage('FeatureToPolygon') as stage:
+        arcpy.FeatureToPolygon_management(in_features=contour_merge_line, out_feature_class=polygons_raw, cluster_tolerance="", attributes="ATTRIBUTES", label_features="")
+        arcpy.AddField_management(polygons_raw,'Contour','DOUBLE')
+        stage['count'] = _count(polygons_raw)
 
     poly_oid_name = arcpy.Describe(polygons_raw).OIDFieldName
 
-
     # Get the average elevation of each polygon, map these to their
     # corresponding contour elevation, and use the OBJECTID to map these back to
     # the polygon data. This process is 50x times faster than Spatial Join.
-    print('Zonal statistics')
-    start = time.clock()
-    arcpy.CheckOutExtension('Spatial')
-    arcpy.gp.ZonalStatisticsAsTable_sa(polygons_raw, poly_oid_name, raster, polygon_raster_mean, "DATA", "MEAN")
-    arcpy.CheckInExtension('Spatial')
-    stop = time.clock()
+    with report.stage('zonal') as stage:
+        if zonal_engine == 'numpy':
+            polygon_means = _polygon_raster_means(polygons_raw, poly_oid_name, raster, scratch_workspace)
+        else:
+            arcpy.CheckOutExtension('Spatial')
+            arcpy.gp.ZonalStatisticsAsTable_sa(polygons_raw, poly_oid_name, raster, polygon_raster_mean, "DATA", "MEAN")
+            arcpy.CheckInExtension('Spatial')
 
-    table_oid_name = arcpy.Describe(polygon_raster_mean).OIDFieldName
+            forreign_key = poly_oid_name + '_'
+            table_dict = tableToDict(polygon_raster_mean, keyField=forreign_key, fields=[forreign_key, 'MEAN'])  # Create ditionary from table, with keyField as the dictionary keys.
+            polygon_means = {k: v['MEAN'] for k, v in table_dict.items()}
+        stage['count'] = len(polygon_means)
 
-    forreign_key = poly_oid_name + '_'
-    table_dict = tableToDict(polygon_raster_mean,keyField = forreign_key) # Create ditionary from table, with keyField as the dictionary keys.
+    #Reclassify mean raster values to contour values:
+    with report.stage('reclassify') as stage:
+        keys = list(polygon_means)
+        means = _classify_to_contours([polygon_means[k] for k in keys], explicit_contour_list)
+        polygon_contours = dict(zip(keys, means.tolist()))
+        stage['count'] = len(polygon_contours)
 
-    bottom = explicit_contour_list[:-1]
-    top = explicit_contour_list[1:]
+    #Insert contour values to polygon data:
+    with report.stage('update') as stage:
+        missing = 0
+        updated = 0
+        with arcpy.da.UpdateCursor(polygons_raw,[poly_oid_name,'Contour'])as cursor:
+            for row in cursor:
+                if not row[0] in polygon_contours:
+                    row[1] = None #Polygons that where too small to get a raster value from Zonal Statistics. Handled later.
+                    missing += 1
+                else:
+                    row[1] = polygon_contours[row[0]]
+                cursor.updateRow(row)
+                updated += 1
+        stage['count'] = updated
+
+    if missing:
+        logger.warning('Some contours were too close together to be handled properly. Check Contour = None for %d polygons in resulting table.', missing)
+
+    with report.stage('copy') as stage:
+        if isinstance(output_feature_class,arcpy.Geometry):
+            output = arcpy.CopyFeatures_management(polygons_raw,arcpy.Geometry())
+            stage['count'] = len(output)
+        elif isinstance(output_feature_class,list):
+            output = tableToDict(polygons_raw) # Will pass output as a list when no keyField is passed as an argument.
+            stage['count'] = len(output)
+        else:
+            arcpy.CopyFeatures_management(polygons_raw,output_feature_class)
+            output = output_feature_class
+            stage['count'] = _count(output_feature_class)
 
-    #Reclassify mean raster values to contour values:
-    for k in table_dict:
-        if table_dict[k]['MEAN'] > explicit_contour_list[-1]:
-            table_dict[k]['MEAN'] = explicit_contour_list[-1]
-        elif table_dict[k]['MEAN'] < explicit_contour_list[0]:
-            table_dict[k]['MEAN'] = explicit_contour_list[0]
+    for dataset in [contour_line, fishnet_line, contour_merge_line, polygons_raw, polygon_raster_mean]:
+        if arcpy.Exists(dataset):
+            arcpy.Delete_management(dataset)
+
+    if return_report:
+        return output, report
+    return output
+
+
+def _tile_extents(extent, tile_size, overlap):
+    """
+    Split an extent (XMin, YMin, XMax, YMax) into square tiles of tile_size.
+    Returns a list of (core, buffered) extents, where the buffered extent is
+    the core extent grown by overlap and cropped to the input extent.
+    """
+
+    x_min, y_min, x_max, y_max = extent
+    tiles = []
+    for x in numpy.arange(x_min, x_max, tile_size):
+        for y in numpy.arange(y_min, y_max, tile_size):
+            core = (float(x), float(y), float(min(x + tile_size, x_max)), float(min(y + tile_size, y_max)))
+            buffered = (max(core[0] - overlap, x_min), max(core[1] - overlap, y_min),
+                        min(core[2] + overlap, x_max), min(core[3] + overlap, y_max))
+            tiles += [(core, buffered)]
+    return tiles
+
+
+def _filled_contours_task(task):
+    """
+    Worker for create_filled_contours_batch. Runs create_filled_contours for
+    a whole raster, or for one tile of it, and returns the timing report as
+    a dictionary. Scratch data lives in the in_memory workspace of the
+    worker process, and tiles are written to their own file geodatabase.
+    """
+
+    if not task['tile']:
+        _, report = create_filled_contours(task['raster'], task['output'], task['levels'], zonal_engine=task['zonal_engine'], return_report=True)
+        return report.as_dict()
+
+    core, buffered = task['tile']
+    workspace = str(arcpy.CreateFileGDB_management(task['scratch'], 'tile.gdb'))
+    tile_raster = os.path.join(workspace, 'dem')
+    tile_polygons = os.path.join(workspace, 'polygons')
+
+    arcpy.Clip_management(task['raster'], '%f %f %f %f' % buffered, tile_raster)
+    _, report = create_filled_contours(tile_raster, tile_polygons, task['levels'], zonal_engine=task['zonal_engine'], return_report=True)
+
+    # Crop to the core of the tile. The overlap only serves to get continuous
+    # contours and keep the raster edge effects out of the core.
+    x_min, y_min, x_max, y_max = core
+    corners = [(x_min, y_min), (x_min, y_max), (x_max, y_max), (x_max, y_min), (x_min, y_min)]
+    core_polygon = arcpy.Polygon(arcpy.Array([arcpy.Point(x, y) for x, y in corners]), arcpy.Describe(tile_raster).spatialReference)
+    arcpy.Clip_analysis(tile_polygons, core_polygon, task['output'])
+
+    return report.as_dict()
+
+
+def create_filled_contours_batch(jobs, processes=None, tile_size=None, tile_overlap=None, zonal_engine='arcgis'):
+    '''
+    Method for running create_filled_contours for many rasters in parallel,
+    with optional splitting of each raster into tiles.
+
+    Each job runs in a pool of worker processes. Every process has its own
+    in_memory workspace, so the scratch data of concurrent jobs never
+    collide.
+
+    When tile_size is given, every raster is split into overlapping tiles
+    which are contoured in parallel. The tiles are cropped to their core
+    extent, merged, and the seams are removed by dissolving on Contour.
+
+    Input
+          jobs                  list    List of (raster, output_feature_class,
+                                        explicit_contour_list) tuples.
+          processes             int     Number of worker processes. Defaults
+                                        to the number of cores. 1 runs all
+                                        jobs in the current process.
+          tile_size             float   Side length of the tiles in map units.
+                                        None processes each raster whole.
+          tile_overlap          float   Overlap between tiles in map units.
+                                        Defaults to 10 cells.
+          zonal_engine          str     Passed on to create_filled_contours.
+
+    Output
+          reports               list    One timing report dictionary per job,
+                                        see TimingReport.as_dict. Tiled jobs
+                                        list the reports of their tiles
+                                        under the key "tiles".
+    '''
+
+    jobs = [tuple(job) for job in jobs]
+    scratch = tempfile.mkdtemp(prefix='arctools_')
+    tasks = []
+    try:
+        for j, (raster, output, levels) in enumerate(jobs):
+            if not tile_size:
+                tasks += [{'job': j, 'raster': raster, 'output': output, 'levels': levels, 'zonal_engine': zonal_engine, 'tile': None}]
+                continue
+
+            desc = arcpy.Describe(raster)
+            overlap = tile_overlap if tile_overlap is not None else 10 * desc.meanCellWidth
+            extent = (desc.extent.XMin, desc.extent.YMin, desc.extent.XMax, desc.extent.YMax)
+            for t, tile in enumerate(_tile_extents(extent, tile_size, overlap)):
+                tile_scratch = os.path.join(scratch, 'job%d_tile%d' % (j, t))
+                os.mkdir(tile_scratch)
+                tasks += [{'job': j, 'raster': raster, 'output': os.path.join(tile_scratch, 'tile.gdb', 'core'), 'levels': levels,
+                           'zonal_engine': zonal_engine, 'tile': tile, 'scratch': tile_scratch}]
+
+        if processes == 1:
+            task_reports = [_filled_contours_task(task) for task in tasks]
         else:
-            for b,t in zip(bottom,top):
-                if table_dict[k]['MEAN']>=b and table_dict[k]['MEAN']<t:
-                    table_dict[k]['MEAN'] = t
-                    break
+            pool = multiprocessing.Pool(processes)
+            try:
+                task_reports = pool.map(_filled_contours_task, tasks, chunksize=1)
+            finally:
+                pool.close()
+                pool.join()
 
-    #Insert contour values to polygon data:
-    found_warning = False
-    with arcpy.da.UpdateCursor(polygons_raw,[poly_oid_name,'Contour'])as cursor:
-        for row in cursor:
-            if not row[0] in table_dict:
-                row[1] = None #Polygons that where too small to get a raster value from Zonal Statistics. Handled later.
-                found_warning = True
-            else:
-                row[1] = table_dict[row[0]]['MEAN']
-            cursor.updateRow(row)
+        if not tile_size:
+            return task_reports
+
+        reports = []
+        for j, (raster, output, levels) in enumerate(jobs):
+            report = TimingReport('create_filled_contours_tiled')
+            job_tasks = [(task, task_report) for task, task_report in zip(tasks, task_reports) if task['job'] == j]
+            with report.stage('merge') as stage:
+                merged = str(arcpy.Merge_management([task['output'] for task, _ in job_tasks], os.path.join('in_memory', 'arctools_tile_merge')))
+                stage['count'] = _count(merged)
+            with report.stage('dissolve') as stage:
+                arcpy.Dissolve_management(merged, output, 'Contour', '', 'SINGLE_PART')
+                arcpy.Delete_management(merged)
+                stage['count'] = _count(output)
 
-    if found_warning:
-        print('WARNING: Some contours were too close together to be handled properly. Check Contour = None in resulting table.')
+            job_report = report.as_dict()
+            job_report['tiles'] = [task_report for _, task_report in job_tasks]
+            reports += [job_report]
 
-    print('Homebrew Spatial Join: %0.2f seconds' % (stop-start))
-    print('Regular Spatial Join: %0.2f seconds' % 1947)
-    print('Improvement: %0.0fx' % (19473/(stop-start)))
+        return reports
 
-    if isinstance(output_feature_class,arcpy.Geometry):
-        return arcpy.CopyFeatures_management(polygons_raw,arcpy.Geometry())
-    elif isinstance(output_feature_class,list):
-        return tableToDict(polygons_raw) # Will pass output as a list when no keyField is passed as an argument.
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def create_filled_contours_tiled(raster, output_feature_class, explicit_contour_list, tile_size, tile_overlap=None, processes=None, zonal_engine='arcgis'):
+    '''
+    Method for creating filled contours for a very large raster, by
+    splitting it into overlapping tiles that are contoured in parallel. See
+    create_filled_contours_batch.
+
+    Output
+          report                dict    Timing report for the merge and
+                                        dissolve, with the reports of the
+                                        tiles under the key "tiles".
+    '''
+
+    return create_filled_contours_batch([(raster, output_feature_class, explicit_contour_list)], processes=processes,
+                                        tile_size=tile_size, tile_overlap=tile_overlap, zonal_engine=zonal_engine)[0]
+
+
+def _copy_table(table, newTable, fieldMappings):
+    """
+    Copy a table or feature class to newTable with a new schema, streaming
+    the rows from a SearchCursor into an InsertCursor, so only one row is
+    held in memory at a time.
+
+    fieldMappings is a list of (field, new name) pairs, where field is an
+    arcpy.Field of table. The fields are created in the order of the list.
+    The object id and shape are carried over by the dataset itself.
+
+    If newTable is the same as table, the copy replaces the original.
+    """
+
+    desc = arcpy.Describe(table)
+    featureClass = desc.dataType == 'FeatureClass'
+
+    output_table = newTable
+    if os.path.normcase(os.path.abspath(str(table))) == os.path.normcase(os.path.abspath(str(newTable))):
+        output_table = str(newTable) + '_arctools_copy'
+
+    if arcpy.Exists(output_table):
+        if output_table == newTable and not overwriteExistingOutput:
+            raise FieldException('Output %s already exists.' % output_table)
+        arcpy.Delete_management(output_table)
+
+    out_path, out_name = os.path.split(str(output_table))
+    if featureClass:
+        arcpy.CreateFeatureclass_management(out_path, out_name, geometry_type=desc.shapeType, has_m='ENABLED' if desc.hasM else 'DISABLED',
+                                            has_z='ENABLED' if desc.hasZ else 'DISABLED', spatial_reference=desc.spatialReference)
     else:
-        arcpy.CopyFeatures_management(polygons_raw,output_feature_class)
+        arcpy.CreateTable_management(out_path, out_name)
+
+    for field, name in fieldMappings:
+        arcpy.AddField_management(output_table, name, _add_field_types[field.type], field_precision=field.precision or None,
+                                  field_scale=field.scale or None, field_length=field.length or None)
+
+    source_fields = [field.name for field, _ in fieldMappings]
+    target_fields = [name for _, name in fieldMappings]
+    if featureClass:
+        source_fields += ['SHAPE@']
+        target_fields += ['SHAPE@']
+
+    with arcpy.da.SearchCursor(table, source_fields) as rows:
+        with arcpy.da.InsertCursor(output_table, target_fields) as cursor:
+            for row in rows:
+                cursor.insertRow(row)
+
+    if output_table != newTable:
+        arcpy.Delete_management(table)
+        arcpy.Rename_management(output_table, newTable)
+
+    return [f.name for f in arcpy.ListFields(newTable)]
+
+
+def _copyable_fields(table):
+    """Fields of a table that are written through cursors, i.e. not the object
+    id, shape or other fields maintained by the dataset."""
+    return [f for f in arcpy.ListFields(table) if f.type in _add_field_types and getattr(f, 'editable', True)]
 
 
 def changeFieldOrder(table, newTable, orderedFieldList):
@@ -892,74 +3011,48 @@ def changeFieldOrder(table, newTable, orderedFieldList):
     orderedFieldList does not have to contain all the fields in the table; the
     fields not specified will be moved to the head of the list.
 
+    The rows are streamed from the table into a new table with the new field
+    order, so memory use is independent of the size of the table.
+
     Input:
         table               str         path specifying the table or feature
                                         class.
+        newTable            str         path specifying the resulting table or
+                                        feature class. Can be the same as input
+                                        table, which is then replaced.
         orderedFieldList    list(str)   names of existing fields in table.
 
     Output:
         newFieldList        list(str)   new complete list of field names in
                                         table.
-
-
-    The way to handle this would be to make a new table with the correct fields,
-    and copy all the data to the new table with a field mapping.
     '''
 
-    shapeIdentification = '^shape(@\w*)?$'
-
-    desc = arcpy.Describe(table)
-    desc.hasM
-    desc.hasZ
-    desc.shapeType
-    desc.featureType
-
     arcpy.env.overwriteOutput = overwriteExistingOutput
 
-    fields = arcpy.ListFields(table)
-
-    fieldCheck = False
-    if isinstance(orderedFieldList[0],arcpy.Field):
-        fieldCheck = True
+    fields = _copyable_fields(table)
+    fields_by_name = {f.name.lower(): f for f in fields}
 
+    names = []
     for of in orderedFieldList:
-        if fieldCheck:
-            name = of.name
-        else:
-            name = of
-        if not name in [f.name for f in fields]:
-            raise Exception('Field %s not found in table %s' % (of.name,table))
+        name = of.name if hasattr(of, 'name') else of
+        if not name.lower() in fields_by_name:
+            raise MissingFieldException('Field %s not found in table %s' % (name, table))
+        names += [name.lower()]
 
-    newFields = []
-    for of in orderedFieldList:
-        if fieldCheck:
-            name = of.name
-        else:
-            name = of
-        for f in fields:
-            if f.name == name:
-                newFields += [f]
-
-    if desc.datatype == u'FeatureClass':
-        arcpy.CreateFeatureclass_management(os.path.realpath(newTable),os.path.basename(newTable),geometry_type=desc.shapeType,has_m=desc.hasM,has_z=desc.hasZ,spatial_reference=desc.spatialReference)
-    else:
-        arcpy.CreateTable_management(os.path.realpath(newTable),os.path.basename(newTable))
-
-
-    for nf in newFields:
-        if not nf.name.lower() == 'objectid':
-            arcpy.AddField_management(newTable,nf.name,nf.type,)
-
-    #CONTINUE HERE
+    newFields = [f for f in fields if f.name.lower() not in names] + [fields_by_name[name] for name in names]
 
+    return _copy_table(table, newTable, [(f, f.name) for f in newFields])
 
 
 def renameFields(table,newTable,fieldMappingDict):
     '''
     Method for batch-renaming fields in a table.
 
-    For easy of coding, this method uses dictToTable and tableToDict in
-    sequence, renaming the keys in the dictionary in between the operations.
+    If newTable is the same as table and the backend supports
+    AlterField_management, the fields are renamed in place without copying
+    any data. Otherwise the rows are streamed from the table into a new table
+    with the renamed fields, so memory use is independent of the size of the
+    table.
 
     Input:
         table               str         path specifying the table or feature
@@ -967,7 +3060,7 @@ def renameFields(table,newTable,fieldMappingDict):
         newTable            str         path specifying the resulting table or
                                         feature class. Can be the same as input
                                         table. In that case, input table is
-                                        deleted before write operation.
+                                        replaced.
         fieldMappingDict    dict(str)   dictionary with key/value pairs
                                         representing current/new field names.
 
@@ -978,24 +3071,667 @@ def renameFields(table,newTable,fieldMappingDict):
 
     arcpy.env.overwriteOutput = overwriteExistingOutput
 
-    old = tableToDict(table)
+    fields = _copyable_fields(table)
+    field_names = [f.name for f in fields]
+    for k in fieldMappingDict:
+        if k not in field_names:
+            raise MissingFieldException('Field %s not found in table %s' % (k, table))
 
-    new = []
-    for row in old:
-        new += [OrderedDict()]
-        for k,v in row.items():
-            if k in fieldMappingDict:
-                k = fieldMappingDict[k]
-            new[-1][k] = v
+    in_place = os.path.normcase(os.path.abspath(str(table))) == os.path.normcase(os.path.abspath(str(newTable)))
+    if in_place and hasattr(arcpy, 'AlterField_management'):
+        for k, v in fieldMappingDict.items():
+            if k != v:
+                arcpy.AlterField_management(table, k, v, v)
+        return [f.name for f in arcpy.ListFields(table)]
 
-    if overwriteExistingOutput or table == newTable:
+    return _copy_table(table, newTable, [(f, fieldMappingDict.get(f.name, f.name)) for f in fields])
+
+
+class TablePipeline(object):
+    """
+    Streams rows from a table through a chain of stages into another table,
+    or to the caller.
+
+    Rows flow as tuples from the SearchCursor of the source to the
+    InsertCursor of the sink, one row at a time, without building
+    dictionaries. The stages are generators, chained in the order they are
+    added:
+
+        filter(predicate)   Keep the rows for which predicate(row) is true.
+        map(function)       Replace each row with function(row). Pass fields
+                            if the function changes the fields of the row.
+        rename(mapping)     Rename fields. Costs nothing per row.
+        select(fields)      Keep only the given fields, in the given order.
+
+    Use index(field) to find the position of a field in the rows passed to
+    a stage. The pipeline runs when iterated, or when written with
+    to_table, and can be run again.
+
+    The sink maps fields to the output table the same way dictToTable does:
+    SHAPE@ tokens follow the shape field of the output, and OBJECTID its
+    object id field. Unwritable fields (object and global ids) are left out.
+
+    After each run, report holds a TimingReport with the wall time, cpu time
+    and number of rows passed on by every stage, the time of each stage
+    excluding the stages before it. The stages are also recorded in active
+    profiles.
+
+    Example:
+        pipeline = TablePipeline(table, ['id', 'value', 'SHAPE@'], where_clause='value > 0')
+        value = pipeline.index('value')
+        pipeline.filter(lambda row: row[value] < 100)
+        pipeline.map(lambda row: row + (row[value] * 2,), fields=pipeline.fields + ('double',))
+        pipeline.rename({'value': 'original'})
+        count = pipeline.to_table(output, makeTable=True)
+        print(pipeline.report)
+    """
+
+    def __init__(self, table, fields, where_clause=None, sql_clause=(None, None), callback=None):
+        if isinstance(fields, str):
+            fields = [fields]
+        self.table = table
+        self.fields = tuple(fields)
+        self.source_fields = tuple(fields)
+        self.where_clause = where_clause
+        self.sql_clause = sql_clause
+        self.callback = callback
+        self.report = None
+        self._stages = []
+
+    def index(self, field):
+        """Position of field in the rows at the end of the pipeline so far."""
         try:
-            arcpy.Delete_management(newTable)
-        except:
-            pass
+            return self.fields.index(field)
+        except ValueError:
+            raise MissingFieldException('Field %s is not in pipeline fields %s.' % (field, ', '.join(self.fields)))
+
+    def _add(self, name, stage, fields=None):
+        self._stages += [(name, stage)]
+        if fields is not None:
+            self.fields = tuple(fields)
+        return self
+
+    def filter(self, predicate, name='filter'):
+        return self._add(name, lambda rows: (row for row in rows if predicate(row)))
+
+    def map(self, function, fields=None, name='map'):
+        if isinstance(fields, str):
+            fields = [fields]
+        return self._add(name, lambda rows: (function(row) for row in rows), fields)
+
+    def rename(self, mapping, name='rename'):
+        for field in mapping:
+            self.index(field)
+        return self._add(name, lambda rows: rows, [mapping.get(field, field) for field in self.fields])
+
+    def select(self, fields, name='select'):
+        if isinstance(fields, str):
+            fields = [fields]
+        getter = _tuple_getter([self.index(field) for field in fields])
+        return self._add(name, lambda rows: (getter(row) for row in rows), fields)
+
+    def _chain(self, cursor, timers):
+        rows = _stage_timer(cursor, 'source', timers)
+        for name, stage in self._stages:
+            rows = _stage_timer(stage(rows), name, timers)
+        return rows
+
+    def __iter__(self):
+        self.report = TimingReport('TablePipeline', self.callback)
+        timers = []
+        with arcpy.da.SearchCursor(self.table, self.source_fields, where_clause=self.where_clause, sql_clause=self.sql_clause) as cursor:
+            rows = self._chain(cursor, timers)
+            try:
+                for row in rows:
+                    yield row
+            finally:
+                rows.close()
+                self._report(timers)
+
+    def _report(self, timers, sink=None):
+        """Add the stages to report, with the time of the stages before
+        each stage subtracted."""
+        previous_wall = previous_cpu = 0.0
+        for timer in timers:
+            self.report.add({'stage': timer['stage'],
+                             'wall': timer['wall'] - previous_wall,
+                             'cpu': timer['cpu'] - previous_cpu,
+                             'count': timer['count']})
+            previous_wall, previous_cpu = timer['wall'], timer['cpu']
+        if sink:
+            self.report.add(sink)
+
+    def to_table(self, table, batch_size=1000, makeTable=False, featureClassType='', spatialReference=''):
+        """
+        Run the pipeline and insert the rows into table.
+
+        Input
+            table           str     Path to output table.
+            batch_size      int     Number of rows gathered from the
+                                    stages before they are written.
+            makeTable       logic   True creates table with fields typed
+                                    after the values of the first row.
+                                    False appends to an existing table.
+            featureClassType str    The type of feature class created. If
+                                    empty, queries the type property of the
+                                    shape geometry.
+            spatialReference bin    All valid identifiers of a spatial
+                                    reference, by name, ID or object.
+
+        Output
+            count           int     Number of rows written to table.
+        """
+
+        arcpy.env.overwriteOutput = overwriteExistingOutput
+
+        shape_name, shape_suffix = _shape_field_parts(self.fields)
+        featureClass = bool(shape_name)
+
+        self.report = TimingReport('TablePipeline', self.callback)
+        timers = []
+        sink = {'stage': 'sink', 'wall': 0.0, 'cpu': 0.0, 'count': 0}
+
+        with arcpy.da.SearchCursor(self.table, self.source_fields, where_clause=self.where_clause, sql_clause=self.sql_clause) as source:
+            rows = self._chain(source, timers)
+
+            try:
+                batch = list(itertools.islice(rows, batch_size))
+                if not batch:
+                    return 0
+
+                if makeTable:
+                    wall, cpu = time.perf_counter(), time.process_time()
+                    self._create_table(table, batch[0], shape_name, shape_suffix, featureClassType, spatialReference)
+                    sink['wall'] += time.perf_counter() - wall
+                    sink['cpu'] += time.process_time() - cpu
+
+                describe = arcpy.Describe(table)
+                mappings = _map_table_fields(self.fields, describe, featureClass, shape_name, shape_suffix)
+                unwritable_fields = list_unwritable_fields(table, describe_object=describe)
+                tableFieldNames = [field.name for field in arcpy.ListFields(table)]
+
+                positions = []
+                for i, field in enumerate(self.fields):
+                    mapped = mappings[field]
+                    if mapped in unwritable_fields or mapped.upper() == 'OID@':
+                        continue
+                    if not mapped in tableFieldNames and not re.findall(shapeIdentification, field):
+                        raise MissingFieldException('Pipeline field %s is not present in table %s.' % (mapped, table))
+                    positions += [i]
+                getter = _tuple_getter(positions)
+
+                with arcpy.da.Editor(os.path.dirname(table)):
+                    with arcpy.da.InsertCursor(table, [mappings[self.fields[i]] for i in positions]) as cursor:
+                        while batch:
+                            wall, cpu = time.perf_counter(), time.process_time()
+                            for row in batch:
+                                cursor.insertRow(getter(row))
+                            sink['wall'] += time.perf_counter() - wall
+                            sink['cpu'] += time.process_time() - cpu
+                            sink['count'] += len(batch)
+                            batch = list(itertools.islice(rows, batch_size))
+            finally:
+                rows.close()
+                self._report(timers, sink)
+
+        return sink['count']
+
+    def _create_table(self, table, row, shape_name, shape_suffix, featureClassType, spatialReference):
+        shape_field = shape_name + shape_suffix
+        out_path, out_name = os.path.split(table)
+        if shape_name:
+            shape = row[self.fields.index(shape_field)]
+            if not featureClassType:
+                if not hasattr(shape, 'type'):
+                    raise InputTypeException('featureClassType argument not passed, and pipeline shape field %s does not have a type attribute' % shape_field)
+                featureClassType = shape.type
+            if not spatialReference:
+                if not hasattr(shape, 'spatialReference'):
+                    raise InputTypeException('spatialReference argument not passed, and pipeline shape field %s does not have a spatialReference attribute' % shape_field)
+                spatialReference = shape.spatialReference
+            arcpy.CreateFeatureclass_management(out_path, out_name, geometry_type=featureClassType, spatial_reference=spatialReference)
+        else:
+            arcpy.CreateTable_management(out_path, out_name)
+
+        for field, value in zip(self.fields, row):
+            if re.findall(shapeIdentification, field) or re.findall(oidIdentification, field) or field.upper() == 'OID@':
+                continue
+            if shape_name and field.startswith(shape_name + '_'):
+                continue  # Maintained by the feature class, e.g. SHAPE_Length.
+            fieldType, length = _field_type_for_value(field, value)
+            try:
+                arcpy.AddField_management(table, field, fieldType, field_length=length)
+            except arcpy.ExecuteError:
+                raise FieldException('Failed to create field %s of type %s in table %s' % (field, fieldType, table))
+
+
+def _tuple_getter(positions):
+    """Function picking the values at positions from a row, as a tuple."""
+    if len(positions) == 1:
+        position = positions[0]
+        return lambda row: (row[position],)
+    return operator.itemgetter(*positions)
+
+
+def _stage_timer(rows, name, timers):
+    """
+    Iterate over rows, adding up the time spent producing them in a timer
+    appended to timers. The time includes the stages before this one.
+    """
+
+    timer = {'stage': name, 'wall': 0.0, 'cpu': 0.0, 'count': 0}
+    timers += [timer]
+    return _timed_stage(iter(rows), timer)
+
 
-    dictToTable(new, os.path.split(newTable)[0], os.path.split(newTable)[1], method = 'insert', makeTable = True)
+def _timed_stage(rows, timer):
+    while True:
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            row = next(rows)
+        except StopIteration:
+            return
+        finally:
+            timer['wall'] += time.perf_counter() - wall
+            timer['cpu'] += time.process_time() - cpu
+        timer['count'] += 1
+        yield row
+
+
+# Version of the snapshot format written by export_snapshot:
+_snapshot_version = 1
+
+# Rows read and written at a time by export_snapshot:
+_snapshot_batch_rows = 100000
+
+
+def export_snapshot(source, directory, sqlQuery='', fields=[]):
+    """
+    Write a table, or the output of tableToDict, to a columnar snapshot that
+    load_snapshot maps back into memory almost instantly.
+
+    The snapshot is a directory with a manifest.json describing the columns,
+    and one .npy file per column. Numbers, booleans and dates are stored as
+    numpy arrays. Text, bytes and geometries are stored as one array of
+    concatenated UTF-8 or WKB bytes, and one array of offsets into it.
+    Columns with empty values have a boolean mask array as well. Geometries
+    of a table are read as WKB into the column SHAPE@. The rows are read and
+    written in batches, so a table is never held in memory as a whole.
+
+    Input
+          source          str/list Path to a table, or a list or dictionary
+                                  of dictionaries as from tableToDict.
+          directory       str     Directory to write the snapshot to. Must
+                                  not exist, unless overwriteExistingOutput
+                                  is set.
+          sqlQuery        str     SQL query selecting the rows of a table.
+          fields          list    Fields of a table to include. Default is
+                                  all fields.
+
+    Output
+          manifest        dict    Contents of manifest.json.
+    """
+
+    if os.path.exists(directory):
+        if not overwriteExistingOutput:
+            raise FieldException('Output %s already exists.' % directory)
+        shutil.rmtree(directory)
+
+    manifest = {'format': 'arctools snapshot',
+                'version': _snapshot_version,
+                'created': datetime.datetime.now().isoformat(),
+                'source': source if isinstance(source, str) else None,
+                'shapeType': None,
+                'spatialReference': None}
+    geometry_fields = []
+
+    with _phase('export_snapshot', 'describe'):
+        if isinstance(source, str):
+            desc = arcpy.Describe(source)
+            fields = _cursor_fields(source, fields)
+            cursor_fields, names, _ = _geometry_fields(source, fields, 'wkb')
+            for i, name in enumerate(names):
+                if name.upper().endswith('@WKB'):
+                    names[i] = 'SHAPE@'
+                    geometry_fields += ['SHAPE@']
+            if geometry_fields:
+                manifest['shapeType'] = getattr(desc, 'shapeType', None)
+                manifest['spatialReference'] = getattr(getattr(desc, 'spatialReference', None), 'factoryCode', None) or None
+        else:
+            rows = _unpack_dictionary(source)
+            names = list(rows[0].keys())
+
+    def source_rows():
+        if isinstance(source, str):
+            with arcpy.da.SearchCursor(source, cursor_fields, where_clause=sqlQuery) as cursor:
+                for row in cursor:
+                    yield row
+        else:
+            for row in rows:
+                yield tuple(row.get(name) for name in names)
+
+    os.makedirs(directory)
+    columns = [_SnapshotColumn(directory, i, name, 'geometry' if name in geometry_fields else None) for i, name in enumerate(names)]
+    try:
+        with closing(source_rows()) as cursor:
+            while True:
+                with _phase('export_snapshot', 'read') as phase:
+                    batch = list(itertools.islice(cursor, _snapshot_batch_rows))
+                    phase['rows'] = len(batch)
+                if not batch:
+                    break
+                with _phase('export_snapshot', 'write') as phase:
+                    for column, values in zip(columns, zip(*batch)):
+                        column.append(values)
+                    phase['rows'] = len(batch)
+
+        with _phase('export_snapshot', 'write'):
+            manifest['rows'] = columns[0].rows if columns else 0
+            manifest['columns'] = [column.finish() for column in columns]
+    except BaseException:
+        for column in columns:
+            column.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def _snapshot_kind(name, values):
+    """Snapshot column kind of a list of values, or None if all are empty."""
+
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        elif isinstance(value, bool) or isinstance(value, numpy.bool_):
+            kinds.add('bool')
+        elif isinstance(value, (int, numpy.integer)):
+            kinds.add('int')
+        elif isinstance(value, (float, numpy.floating)):
+            kinds.add('float')
+        elif isinstance(value, datetime.datetime):
+            kinds.add('date')
+        elif isinstance(value, str):
+            kinds.add('string')
+        elif isinstance(value, (bytes, bytearray)):
+            kinds.add('bytes')
+        elif isinstance(value, LazyGeometry) or hasattr(value, 'WKB'):
+            kinds.add('geometry')
+        else:
+            raise InputTypeException('Value %r of field %s can not be stored in a snapshot.' % (value, name))
+
+    if kinds == set(['int', 'float']):
+        return 'float'
+    if len(kinds) > 1:
+        raise InputTypeException('Field %s mixes values of the types %s.' % (name, ', '.join(sorted(kinds))))
+    return kinds.pop() if kinds else None
+
+
+def _snapshot_bytes(kind, value):
+    if value is None:
+        return b''
+    if kind == 'string':
+        return value.encode('utf-8')
+    if kind == 'geometry':
+        return bytes(value.wkb if isinstance(value, LazyGeometry) else value.WKB)
+    return bytes(value)
+
+
+class _SnapshotColumn(object):
+    """
+    Column of a snapshot written by export_snapshot in batches. Each batch
+    is appended to raw files in the kind of its own values, so only one
+    batch is held in memory. finish() joins the batches into the .npy
+    files of the final kind of the column, e.g. float when the first batch
+    held integers and a later batch floats.
+    """
+
+    _dtypes = {'int': 'int64', 'float': 'float64', 'bool': 'bool', 'date': 'datetime64[us]'}
+    _fills = {'int': 0, 'float': numpy.nan, 'bool': False, 'date': numpy.datetime64('NaT')}
+
+    def __init__(self, directory, index, name, kind=None):
+        self.directory = directory
+        self.index = index
+        self.name = name
+        self.kind = kind
+        self.rows = 0
+        self.masked = False
+        self.batches = []  # (kind, rows, masked) of each batch.
+        self.raw = {}  # Raw files of the values, lengths and masks, opened when first written.
+
+    def _path(self, name):
+        return os.path.join(self.directory, '%d.%s' % (self.index, name))
+
+    def _write(self, part, data):
+        if part not in self.raw:
+            self.raw[part] = open(self._path('%s.raw' % part), 'w+b')
+        self.raw[part].write(data)
+
+    def append(self, values):
+        mask = numpy.array([v is None for v in values], dtype='bool')
+        if self.kind == 'geometry':
+            batch_kind = None if mask.all() else 'geometry'
+        else:
+            batch_kind = _snapshot_kind(self.name, values)
+            kinds = set([self.kind, batch_kind]) - set([None])
+            if kinds == set(['int', 'float']):
+                self.kind = 'float'
+            elif len(kinds) > 1:
+                raise InputTypeException('Field %s mixes values of the types %s.' % (self.name, ', '.join(sorted(kinds))))
+            elif kinds:
+                self.kind = kinds.pop()
+
+        masked = bool(mask.any())
+        if masked:
+            self.masked = True
+            self._write('mask', mask.tobytes())
+        if batch_kind in ('string', 'bytes', 'geometry'):
+            encoded = [_snapshot_bytes(batch_kind, v) for v in values]
+            self._write('lengths', numpy.array([len(b) for b in encoded], dtype='int64').tobytes())
+            self._write('values', b''.join(encoded))
+        elif batch_kind == 'date':
+            self._write('values', numpy.array([numpy.datetime64('NaT') if v is None else numpy.datetime64(v, 'us') for v in values], dtype='datetime64[us]').tobytes())
+        elif batch_kind is not None:
+            fill = self._fills[batch_kind]
+            self._write('values', numpy.array([fill if v is None else v for v in values], dtype=self._dtypes[batch_kind]).tobytes())
+
+        self.batches += [(batch_kind, len(values), masked)]
+        self.rows += len(values)
+
+    def _read(self, part, dtype, count):
+        return numpy.fromfile(self.raw[part], dtype=dtype, count=count)
+
+    def finish(self):
+        """Write the .npy files of the column, and return its manifest entry."""
+
+        kind = self.kind or 'string'
+        column = {'name': self.name, 'kind': kind, 'files': {}}
+        for raw in self.raw.values():
+            raw.flush()
+            raw.seek(0)
+
+        if self.masked:
+            column['files']['mask'] = '%d.mask.npy' % self.index
+            _write_npy(self._path('mask.npy'), 'bool', self.rows,
+                       (self._read('mask', 'bool', rows) if masked else numpy.zeros(rows, dtype='bool') for _, rows, masked in self.batches))
+
+        if kind in ('string', 'bytes', 'geometry'):
+            lengths = [numpy.zeros(1, dtype='int64')]
+            for batch_kind, rows, _ in self.batches:
+                lengths += [self._read('lengths', 'int64', rows) if batch_kind else numpy.zeros(rows, dtype='int64')]
+            offsets = numpy.cumsum(numpy.concatenate(lengths))
+            column['files']['offsets'] = '%d.offsets.npy' % self.index
+            numpy.save(self._path('offsets.npy'), offsets)
+            size = int(offsets[-1])
+            blocks = (self._read('values', 'uint8', min(_snapshot_batch_rows, size - start)) for start in range(0, size, _snapshot_batch_rows))
+            _write_npy(self._path('npy'), 'uint8', size, blocks)
+        else:
+            dtype = self._dtypes[kind]
+            blocks = (numpy.full(rows, self._fills[kind], dtype=dtype) if batch_kind is None else self._read('values', self._dtypes[batch_kind], rows)
+                      for batch_kind, rows, _ in self.batches)
+            _write_npy(self._path('npy'), dtype, self.rows, blocks)
+        column['files']['values'] = '%d.npy' % self.index
+
+        self.close()
+        return column
+
+    def close(self):
+        for part, raw in self.raw.items():
+            raw.close()
+            if os.path.exists(self._path('%s.raw' % part)):
+                os.remove(self._path('%s.raw' % part))
+        self.raw = {}
+
+
+def _write_npy(path, dtype, length, blocks):
+    """Write blocks of values, length values in total, to one .npy file,
+    one block at a time."""
+
+    dtype = numpy.dtype(dtype)
+    with open(path, 'wb') as f:
+        numpy.lib.format.write_array_header_1_0(f, {'descr': numpy.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (length,)})
+        for block in blocks:
+            f.write(numpy.ascontiguousarray(block, dtype=dtype).tobytes())
+
+
+def load_snapshot(directory):
+    """
+    Load a snapshot written by export_snapshot. The column files are
+    memory-mapped, so loading takes constant time, and values are only
+    read from disk when used.
 
+    Input
+          directory       str     Directory of the snapshot.
+
+    Output
+          snapshot        Snapshot
+    """
+
+    with open(os.path.join(directory, 'manifest.json')) as f:
+        manifest = json.load(f)
+    if manifest.get('format') != 'arctools snapshot' or manifest.get('version', 0) > _snapshot_version:
+        raise InputTypeException('%s is not a snapshot of a supported version.' % directory)
+    return Snapshot(directory, manifest)
+
+
+class Snapshot(object):
+    """
+    Snapshot loaded by load_snapshot. Iterating gives the rows as
+    dictionaries, like tableToDict. Geometries are returned as
+    LazyGeometry. A snapshot can be passed to dictToTable as is.
+
+        len(snapshot)           Number of rows.
+        snapshot.fields         Names of the columns.
+        snapshot[i]             Row i as a dictionary.
+        snapshot.column(name)   All values of a column as a list.
+        snapshot.array(name)    Memory-mapped numpy array of a number, bool
+                                or date column. Empty values are 0, nan,
+                                False or NaT; see snapshot.mask(name).
+    """
+
+    def __init__(self, directory, manifest):
+        self.directory = directory
+        self.manifest = manifest
+        self.fields = [c['name'] for c in manifest['columns']]
+        self._columns = dict((c['name'], c) for c in manifest['columns'])
+        self._files = {}
+        self._decoders = {}
+
+    def __len__(self):
+        return self.manifest['rows']
+
+    def _file(self, name, part):
+        files = self._columns[name]['files']
+        if part not in files:
+            return None
+        if files[part] not in self._files:
+            self._files[files[part]] = numpy.load(os.path.join(self.directory, files[part]), mmap_mode='r')
+        return self._files[files[part]]
+
+    def _column(self, name):
+        if name not in self._columns:
+            raise MissingFieldException('Field [%s] not found in snapshot %s' % (name, self.directory))
+        return self._columns[name]
+
+    def array(self, name):
+        if self._column(name)['kind'] not in ('int', 'float', 'bool', 'date'):
+            raise FieldException('Field %s of kind %s is not stored as an array of values.' % (name, self._column(name)['kind']))
+        return self._file(name, 'values')
+
+    def mask(self, name):
+        """Boolean array, true for the rows where name is empty, or None if
+        no rows are."""
+        self._column(name)
+        return self._file(name, 'mask')
+
+    def _decoder(self, name, geometry='lazy'):
+        """Function returning the value of column name in row i. Built once
+        per column, and kept."""
+
+        key = (name, geometry)
+        if key not in self._decoders:
+            self._decoders[key] = self._make_decoder(name, geometry)
+        return self._decoders[key]
+
+    def _make_decoder(self, name, geometry):
+        kind = self._column(name)['kind']
+        values = self._file(name, 'values')
+        mask = self._file(name, 'mask')
+
+        if kind in ('string', 'bytes', 'geometry'):
+            offsets = self._file(name, 'offsets')
+            if kind == 'string':
+                convert = lambda b: b.decode('utf-8')
+            elif kind == 'geometry' and geometry == 'lazy':
+                code = self.manifest['spatialReference']
+                spatial_reference = arcpy.SpatialReference(code) if code and hasattr(arcpy, 'SpatialReference') else None
+                convert = lambda b: LazyGeometry(b, spatial_reference)
+            else:
+                convert = lambda b: b
+            decode = lambda i: convert(values[offsets[i]:offsets[i + 1]].tobytes())
+        elif kind == 'date':
+            decode = lambda i: values[i].item()
+        else:
+            python_type = {'int': int, 'float': float, 'bool': bool}[kind]
+            decode = lambda i: python_type(values[i])
+
+        if mask is None:
+            return decode
+        return lambda i: None if mask[i] else decode(i)
+
+    def column(self, name):
+        decode = self._decoder(name)
+        return [decode(i) for i in range(len(self))]
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return dict((name, self._decoder(name)(index)) for name in self.fields)
+
+    def _rows(self, geometry='lazy'):
+        names = list(self.fields)
+        if geometry == 'wkb':
+            names = [name.split('@')[0] + '@WKB' if self._columns[name]['kind'] == 'geometry' else name for name in names]
+        decoders = [self._decoder(name, geometry) for name in self.fields]
+        for i in range(len(self)):
+            yield dict(zip(names, [decode(i) for decode in decoders]))
+
+    def __iter__(self):
+        return self._rows()
+
+    def to_dicts(self, geometry='lazy'):
+        """
+        All rows as a list of dictionaries. With geometry='wkb', geometry
+        columns are returned as WKB bytes in the field [name]@WKB, as
+        written by dictToTable.
+        """
+        return list(self._rows(geometry))
 
 
 if __name__ == '__main__':
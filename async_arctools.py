@@ -0,0 +1,221 @@
+# -*- coding: UTF-8 -*-
+'''
+-------------------------------------------------------------------------------
+Name:       async_arctools
+Purpose:    asyncio counterparts of the arctools table methods, for use in
+            event loop based services.
+
+Created:    18.10.2026
+
+-------------------------------------------------------------------------------
+
+ The cursor I/O runs in a bounded pool of threads, so the event loop is
+ never blocked. Each workspace admits a limited number of concurrent
+ operations, so a slow query against one database does not hold every
+ thread of the pool. Writes to a workspace run one at a time by default,
+ as the SQLite backend shares one connection per workspace.
+
+    rows = await async_arctools.table_to_dict(table, keyField='id')
+    await async_arctools.dict_to_table(rows, table, method='update', dictionaryKey='id')
+
+    async for batch in async_arctools.iter_batches(table, batch_size=1000):
+        ...
+
+ Cancelling table_to_dict or dict_to_table returns control at once, but an
+ operation already running in a thread finishes in the background, and
+ keeps its workspace slot until then. iter_batches stops reading at the
+ next batch when cancelled or closed.
+
+-------------------------------------------------------------------------------
+'''
+
+import asyncio
+import threading
+import itertools
+import functools
+import weakref
+import concurrent.futures
+from collections import OrderedDict
+
+try:
+    from . import arctools
+except (ImportError, ValueError):
+    import arctools
+
+# Properties
+maxWorkers = 8 #Threads running cursor I/O.
+maxPerWorkspace = 2 #Concurrent operations against the same workspace.
+maxWritesPerWorkspace = 1 #Concurrent writes (dict_to_table) to the same workspace.
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Workspace semaphores per event loop, as asyncio primitives belong to a loop.
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def configure(max_workers=None, max_per_workspace=None, max_writes_per_workspace=None):
+    """Change the size of the thread pool and the limits per workspace. Takes
+    effect for operations started afterwards."""
+
+    global _executor, maxWorkers, maxPerWorkspace, maxWritesPerWorkspace
+    with _executor_lock:
+        if max_workers is not None:
+            maxWorkers = max_workers
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+                _executor = None
+        if max_per_workspace is not None:
+            maxPerWorkspace = max_per_workspace
+            _semaphores.clear()
+        if max_writes_per_workspace is not None:
+            maxWritesPerWorkspace = max_writes_per_workspace
+            _semaphores.clear()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = concurrent.futures.ThreadPoolExecutor(maxWorkers, thread_name_prefix='async_arctools')
+        return _executor
+
+
+def _workspace(table):
+    return str(table).replace('\\', '/').rpartition('/')[0].lower()
+
+
+def _semaphore(table, write=False):
+    loop = asyncio.get_running_loop()
+    semaphores = _semaphores.setdefault(loop, {})
+    key = (_workspace(table), write)
+    if key not in semaphores:
+        semaphores[key] = asyncio.Semaphore(maxWritesPerWorkspace if write else maxPerWorkspace)
+    return semaphores[key]
+
+
+async def _run(table, function, *args, **kwargs):
+    """Run function in the thread pool, within the limit of the workspace of
+    table. The slot is released when the thread finishes, even if the
+    caller is cancelled first."""
+    return await _run_limited([_semaphore(table)], function, *args, **kwargs)
+
+
+async def _run_write(table, function, *args, **kwargs):
+    """_run for writes, which also take one of the maxWritesPerWorkspace
+    write slots of the workspace."""
+    return await _run_limited([_semaphore(table, write=True), _semaphore(table)], function, *args, **kwargs)
+
+
+async def _run_limited(semaphores, function, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    acquired = []
+
+    def release(_=None):
+        for semaphore in acquired:
+            semaphore.release()
+
+    try:
+        for semaphore in semaphores:
+            await semaphore.acquire()
+            acquired.append(semaphore)
+        future = loop.run_in_executor(_get_executor(), arctools._in_context(functools.partial(function, *args, **kwargs)))
+    except BaseException:
+        release()
+        raise
+    future.add_done_callback(release)
+    return await future
+
+
+async def table_to_dict(table, **kwargs):
+    """arctools.tableToDict in the thread pool. Takes the same arguments."""
+    return await _run(table, arctools.tableToDict, table, **kwargs)
+
+
+async def dict_to_table(dictionary, table, **kwargs):
+    """arctools.dictToTable in the thread pool, one write per workspace at a
+    time by default. Takes the same arguments."""
+    return await _run_write(table, arctools.dictToTable, dictionary, table, **kwargs)
+
+
+async def aggregate(table, groupBy, statistics, **kwargs):
+    """arctools.aggregate in the thread pool. Takes the same arguments."""
+    return await _run(table, arctools.aggregate, table, groupBy, statistics, **kwargs)
+
+
+async def iter_batches(table, fields=[], sqlQuery='', batch_size=1000, field_case='', ordered=False, prefetch=2):
+    """
+    Read the rows of a table as lists of at most batch_size dictionaries,
+    like tableToDict without keyField or groupBy.
+
+    One thread of the pool reads the cursor and hands the batches over
+    through a queue of prefetch batches, so memory use is bounded when the
+    consumer is slower than the table. When the iteration is cancelled or
+    closed, the thread stops at the next batch and closes the cursor.
+
+    Input
+          table           str     Path to the table.
+          fields          list    Fields to read. Default is all fields.
+          sqlQuery        str     SQL query selecting the rows.
+          batch_size      int     Number of rows per batch.
+          field_case      str     "upper" or "lower" to force the case of the
+                                  field names.
+          ordered         bool    Rows as OrderedDict instead of dict.
+          prefetch        int     Number of batches read ahead.
+    """
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    slots = threading.Semaphore(prefetch)  # Bounds the batches read ahead.
+    stopped = threading.Event()
+    end = object()
+
+    def put(item):
+        # Hand over with call_soon_threadsafe rather than a queue.put
+        # coroutine, which would be left unawaited if the loop closes first.
+        while not slots.acquire(timeout=0.1):
+            if stopped.is_set() or loop.is_closed():
+                return
+        if stopped.is_set() or loop.is_closed():
+            return
+        try:
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+        except RuntimeError:
+            pass  # The loop closed in the meantime.
+
+    def read():
+        try:
+            dict_func = OrderedDict if ordered else dict
+            cursor_fields = arctools._cursor_fields(table, fields)
+            case_fields = arctools._case_fields(cursor_fields, field_case)
+            with arctools.arcpy.da.SearchCursor(table, cursor_fields, where_clause=sqlQuery) as cursor:
+                while not stopped.is_set():
+                    batch = [dict_func(zip(case_fields, row)) for row in itertools.islice(cursor, batch_size)]
+                    if not batch:
+                        break
+                    put(batch)
+        except Exception as e:
+            put(e)
+        finally:
+            put(end)
+
+    semaphore = _semaphore(table)
+    await semaphore.acquire()
+    try:
+        reader = loop.run_in_executor(_get_executor(), arctools._in_context(read))
+    except BaseException:
+        semaphore.release()
+        raise
+    reader.add_done_callback(lambda _: semaphore.release())
+
+    try:
+        while True:
+            item = await queue.get()
+            slots.release()
+            if item is end:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
@@ -0,0 +1,1063 @@
+﻿# -*- coding: UTF-8 -*-
+from __future__ import unicode_literals
+'''
+-------------------------------------------------------------------------------
+Name:       sqlite_arcpy
+Purpose:    Pure-python stand-in for the subset of arcpy used by the table
+            methods of arctools (tableToDict, dictToTable, ...). Operates on
+            SQLite databases and GeoPackages, so the table methods can run
+            on machines without an ArcGIS installation.
+
+Created:    18.10.2026
+
+-------------------------------------------------------------------------------
+
+ Paths follow the geodatabase convention of [workspace]/[table], where the
+ workspace is a SQLite or GeoPackage file, or the in_memory workspace:
+
+    /data/reference.sqlite/lookup_table
+    C:\\data\\reference.gpkg\\lookup_table
+    in_memory\\temporary_dataset
+
+ Supported surface:
+    env, ExecuteError, Exists, Describe, ListFields, AddFieldDelimiters,
+    CreateTable_management, AddField_management, AddFields_management,
+    AlterField_management,
+    Delete_management, Rename_management, CopyRows_management,
+    GetCount_management, Statistics_analysis, MakeTableView_management,
+    CheckExtension, CheckOutExtension, CheckInExtension, FromWKB,
+    da.SearchCursor, da.InsertCursor, da.UpdateCursor, da.Editor
+
+ Where clauses and sql_clause are passed straight to SQLite, except for date
+ literals in the file geodatabase syntax, date 'YYYY-MM-DD HH:MM:SS', which
+ are compared as the ISO text dates are stored as. InsertCursor and
+ UpdateCursor buffer their rows and write them with executemany. Edit
+ sessions and writes of different threads on the same workspace run one
+ at a time.
+
+ Geometry columns of GeoPackage feature tables are read as the raw
+ GeoPackage blobs, or through the SHAPE@WKB, SHAPE@XY, SHAPE@X, SHAPE@Y,
+ SHAPE@TRUECENTROID, SHAPE@AREA and SHAPE@LENGTH tokens, which are computed
+ from the blob. Other tokens raise ExecuteError. FromWKB builds read-only
+ geometries with the extent, area, length and centroid of the WKB.
+ Geometry operations and creating feature classes are not supported.
+
+-------------------------------------------------------------------------------
+'''
+
+import os
+import re
+import math
+import struct
+import sqlite3
+import datetime
+import fnmatch
+import threading
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+else:
+    # Let numpy scalars (e.g. results from zonal statistics) be written directly.
+    for _type in (numpy.int8, numpy.int16, numpy.int32, numpy.int64,
+                  numpy.uint8, numpy.uint16, numpy.uint32, numpy.uint64):
+        sqlite3.register_adapter(_type, int)
+    sqlite3.register_adapter(numpy.float32, float)
+    sqlite3.register_adapter(numpy.bool_, bool)
+
+IN_MEMORY = 'in_memory'
+WORKSPACE_EXTENSIONS = ('.sqlite', '.sqlite3', '.db', '.gpkg')
+
+# Number of rows buffered by InsertCursor and UpdateCursor before they are
+# written with executemany, and the page size of UpdateCursor reads.
+batch_size = 1000
+
+# AddField_management field types and their SQLite column declarations.
+_DECLARED_TYPES = {'TEXT': 'TEXT',
+                   'SHORT': 'SMALLINT',
+                   'LONG': 'INTEGER',
+                   'FLOAT': 'FLOAT',
+                   'DOUBLE': 'DOUBLE',
+                   'DATE': 'DATETIME',
+                   'GUID': 'GUID',
+                   'BLOB': 'BLOB'}
+
+# ListFields field types and their AddField_management counterparts.
+_ADD_FIELD_TYPES = {'String': 'TEXT',
+                    'SmallInteger': 'SHORT',
+                    'Integer': 'LONG',
+                    'Single': 'FLOAT',
+                    'Double': 'DOUBLE',
+                    'Date': 'DATE',
+                    'Guid': 'GUID',
+                    'Blob': 'BLOB'}
+
+_geometryDeclaration = '(?i)^(GEOMETRY|POINT|LINESTRING|POLYGON|MULTIPOINT|MULTILINESTRING|MULTIPOLYGON|GEOMETRYCOLLECTION)'
+
+_connections = {}
+
+
+class ExecuteError(Exception):
+    def __init__(self, message):
+        # Call the base class constructor with the parameters it needs
+        super(ExecuteError, self).__init__(message)
+
+
+class _Environment(object):
+    """Mirror of arcpy.env. Only overwriteOutput is acted upon."""
+
+    def __init__(self):
+        self.overwriteOutput = False
+        self.workspace = None
+        self.scratchWorkspace = IN_MEMORY
+        self.extent = None
+        self.snapRaster = None
+
+
+env = _Environment()
+
+
+class Result(object):
+    """Mirror of the arcpy Result object returned by the tools."""
+
+    def __init__(self, *outputs):
+        self._outputs = [str(o) for o in outputs]
+
+    def getOutput(self, index):
+        return self._outputs[index]
+
+    def __getitem__(self, index):
+        return self._outputs[index]
+
+    def __str__(self):
+        return self._outputs[0]
+
+
+class Field(object):
+    """Mirror of arcpy.Field."""
+
+    def __init__(self, name, type, length=0):
+        self.name = name
+        self.baseName = name
+        self.aliasName = name
+        self.type = type
+        self.length = length
+        self.precision = 0
+        self.scale = 0
+        self.domain = ''
+        self.isNullable = type != 'OID'
+        self.required = type in ('OID', 'Geometry')
+        self.editable = type != 'OID'
+
+    def __repr__(self):
+        return '<Field %s (%s)>' % (self.name, self.type)
+
+
+class SpatialReference(object):
+    """Minimal spatial reference holding the srs_id of a GeoPackage table."""
+
+    def __init__(self, factory_code=0, name='Unknown'):
+        self.factoryCode = factory_code
+        self.PCSCode = factory_code
+        self.GCSCode = factory_code
+        self.name = name
+
+
+class Point(object):
+    """Mirror of arcpy.Point."""
+
+    def __init__(self, X=None, Y=None):
+        self.X = X
+        self.Y = Y
+
+
+class Extent(object):
+    """Mirror of arcpy.Extent. The coordinates are None for empty geometries."""
+
+    def __init__(self, XMin=None, YMin=None, XMax=None, YMax=None):
+        self.XMin, self.YMin, self.XMax, self.YMax = XMin, YMin, XMax, YMax
+        self.width = None if XMin is None else XMax - XMin
+        self.height = None if YMin is None else YMax - YMin
+        self.lowerLeft = Point(XMin, YMin)
+        self.upperRight = Point(XMax, YMax)
+
+
+# WKB geometry type codes and their arcpy geometry types.
+_WKB_TYPES = {1: 'point', 2: 'polyline', 3: 'polygon', 4: 'multipoint', 5: 'polyline', 6: 'polygon'}
+
+
+def _read_wkb(wkb, offset=0):
+    """
+    Read the WKB geometry at offset. Returns (type code, parts, offset after
+    the geometry), where parts is a list of parts, each a list of rings of
+    (x, y) tuples. Points and lines are parts with a single ring. Handles
+    ISO and extended WKB with Z and M values.
+    """
+
+    order = '<' if wkb[offset] == 1 else '>'
+    code = struct.unpack_from(order + 'I', wkb, offset + 1)[0]
+    offset += 5
+
+    dimensions = 2 + bool(code & 0x80000000) + bool(code & 0x40000000)
+    if code & 0x20000000:
+        offset += 4  # SRID of extended WKB.
+    code &= 0x0FFFFFFF
+    dimensions += {0: 0, 1: 1, 2: 1, 3: 2}.get(code // 1000, 0)
+    code %= 1000
+    if code not in _WKB_TYPES:
+        raise ExecuteError('WKB geometry type %d is not supported.' % code)
+
+    def ring(offset, count):
+        values = struct.unpack_from('%s%dd' % (order, count * dimensions), wkb, offset)
+        points = [(values[i], values[i + 1]) for i in range(0, len(values), dimensions)]
+        return [p for p in points if not math.isnan(p[0])], offset + 8 * count * dimensions
+
+    if code == 1:
+        points, offset = ring(offset, 1)
+        return code, [[points]] if points else [], offset
+
+    count = struct.unpack_from(order + 'I', wkb, offset)[0]
+    offset += 4
+    if code == 2:
+        points, offset = ring(offset, count)
+        return code, [[points]] if points else [], offset
+
+    parts = []
+    for _ in range(count):
+        if code == 3:
+            length = struct.unpack_from(order + 'I', wkb, offset)[0]
+            points, offset = ring(offset + 4, length)
+            if parts:
+                parts[0] += [points]
+            else:
+                parts = [[points]]
+        else:
+            _, members, offset = _read_wkb(wkb, offset)
+            parts += members
+    return code, parts, offset
+
+
+def _ring_area(points):
+    return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]))) / 2.0
+
+
+def _ring_length(points):
+    return sum(math.hypot(x1 - x0, y1 - y0) for (x0, y0), (x1, y1) in zip(points, points[1:]))
+
+
+def _ring_centroid(points, sign=1):
+    """(signed area, x, y) of the centroid of a ring."""
+    area = x = y = 0.0
+    for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]):
+        cross = x0 * y1 - x1 * y0
+        area += cross
+        x += (x0 + x1) * cross
+        y += (y0 + y1) * cross
+    if not area:
+        return 0.0, 0.0, 0.0
+    return sign * abs(area) / 2.0, x / (3.0 * area), y / (3.0 * area)
+
+
+class Geometry(object):
+    """
+    Read-only geometry built from WKB by FromWKB, with the type, extent,
+    area, length and counts of an arcpy geometry. Polygon areas are the
+    outer ring less the holes of each part.
+    """
+
+    def __init__(self, wkb, spatial_reference=None):
+        self.WKB = bytearray(wkb)
+        self.spatialReference = spatial_reference
+        code, self._parts, _ = _read_wkb(bytes(self.WKB))
+        self.type = _WKB_TYPES[code]
+        self.partCount = len(self._parts)
+        self.isMultipart = self.partCount > 1
+
+        points = [point for part in self._parts for ring in part for point in ring]
+        self.pointCount = len(points)
+        if points:
+            xs, ys = [p[0] for p in points], [p[1] for p in points]
+            self.extent = Extent(min(xs), min(ys), max(xs), max(ys))
+        else:
+            self.extent = Extent()
+
+    @property
+    def area(self):
+        if self.type != 'polygon':
+            return 0.0
+        return sum(_ring_area(part[0]) - sum(_ring_area(ring) for ring in part[1:]) for part in self._parts)
+
+    @property
+    def length(self):
+        return sum(_ring_length(ring) for part in self._parts for ring in part)
+
+    @property
+    def trueCentroid(self):
+        """Area weighted centroid of polygons, length weighted centroid of
+        lines and the mean of points. None for empty geometries."""
+        weights = []
+        for part in self._parts:
+            for index, ring in enumerate(part):
+                if self.type == 'polygon':
+                    weights += [_ring_centroid(ring, -1 if index else 1)]
+                elif self.type == 'polyline':
+                    weights += [(math.hypot(x1 - x0, y1 - y0), (x0 + x1) / 2.0, (y0 + y1) / 2.0) for (x0, y0), (x1, y1) in zip(ring, ring[1:])]
+                else:
+                    weights += [(1.0, x, y) for x, y in ring]
+        total = sum(w for w, _, _ in weights)
+        if not total:
+            return None
+        return Point(sum(w * x for w, x, _ in weights) / total, sum(w * y for w, _, y in weights) / total)
+
+    centroid = trueCentroid
+
+    def __repr__(self):
+        return '<Geometry %s, %d points>' % (self.type, self.pointCount)
+
+
+def FromWKB(wkb, spatial_reference=None):
+    """Geometry from WKB, or from a GeoPackage geometry blob."""
+    return Geometry(_gpkg_wkb(bytes(wkb)), spatial_reference)
+
+
+class _Workspace(object):
+    """
+    A connection to a SQLite database, with nestable transactions. The
+    connection is shared by all threads, so a transaction holds the write
+    lock of the workspace from begin to the final commit or rollback.
+    Writes of other threads wait for it, and can not be rolled back with
+    it.
+    """
+
+    def __init__(self, path, connection):
+        self.path = path
+        self.connection = connection
+        self._lock = threading.RLock()
+        self._owner = None
+        self._depth = 0
+
+    def _owned(self):
+        return self._depth and self._owner == threading.get_ident()
+
+    def begin(self):
+        self._lock.acquire()
+        if not self._depth:
+            try:
+                self.connection.execute('BEGIN')
+            except BaseException:
+                self._lock.release()
+                raise
+            self._owner = threading.get_ident()
+        self._depth += 1
+
+    def commit(self):
+        if not self._owned():
+            return  # Already rolled back by a failed statement.
+        self._depth -= 1
+        try:
+            if not self._depth:
+                self._owner = None
+                self.connection.execute('COMMIT')
+        finally:
+            self._lock.release()
+
+    def rollback(self):
+        if not self._owned():
+            return  # Already rolled back by a failed statement.
+        depth, self._depth, self._owner = self._depth, 0, None
+        try:
+            if self.connection.in_transaction:
+                self.connection.execute('ROLLBACK')
+        finally:
+            for _ in range(depth):
+                self._lock.release()
+
+    def executemany(self, sql, rows):
+        self.begin()
+        try:
+            self.connection.executemany(sql, rows)
+        except sqlite3.Error as e:
+            self.rollback()
+            raise ExecuteError('%s\n%s' % (e, sql))
+        self.commit()
+
+    def execute(self, sql, parameters=()):
+        # Reads go straight to the connection. Other statements wait for
+        # the transactions of other threads.
+        read = sql.lstrip()[:6].upper() in ('SELECT', 'PRAGMA')
+        if not read:
+            self._lock.acquire()
+        try:
+            return self.connection.execute(sql, parameters)
+        except sqlite3.Error as e:
+            raise ExecuteError('%s\n%s' % (e, sql))
+        finally:
+            if not read:
+                self._lock.release()
+
+
+def _normalize(path):
+    return str(path).replace('\\', '/').rstrip('/')
+
+
+def _split_path(path):
+    """Split a dataset path into workspace and table name."""
+    workspace, _, name = _normalize(path).rpartition('/')
+    return workspace, name
+
+
+def _is_workspace(path):
+    path = _normalize(path)
+    return path.lower() == IN_MEMORY or os.path.splitext(path)[1].lower() in WORKSPACE_EXTENSIONS
+
+
+def _connect(workspace):
+    workspace = _normalize(workspace)
+    key = IN_MEMORY if workspace.lower() == IN_MEMORY else os.path.abspath(workspace)
+    if key not in _connections:
+        if not _is_workspace(workspace):
+            raise ExecuteError('%s is not a SQLite or GeoPackage workspace.' % workspace)
+        database = ':memory:' if key == IN_MEMORY else key
+        connection = sqlite3.connect(database, check_same_thread=False)
+        connection.isolation_level = None  # Transactions are handled by _Workspace.
+        _connections[key] = _Workspace(workspace, connection)
+    return _connections[key]
+
+
+def _quote(name):
+    return '"%s"' % name.replace('"', '""')
+
+
+def _where(where_clause):
+    """Translate the date literals of a where clause to text. Quoted strings
+    and identifiers are skipped, so their contents are left as they are."""
+    return re.sub(r"""(?i)'(?:[^']|'')*'|"(?:[^"]|"")*"|\bdate\s+('[^']*')""",
+                  lambda match: match.group(1) or match.group(0), where_clause)
+
+
+def _field_type(declared):
+    declared = declared.upper()
+    if re.findall(_geometryDeclaration, declared):
+        return 'Geometry'
+    if 'GUID' in declared:
+        return 'Guid'
+    if 'SMALLINT' in declared:
+        return 'SmallInteger'
+    if 'INT' in declared:
+        return 'Integer'
+    if 'FLOAT' in declared:
+        return 'Single'
+    if 'REAL' in declared or 'DOUB' in declared or 'NUMERIC' in declared or 'DECIMAL' in declared:
+        return 'Double'
+    if 'DATE' in declared or 'TIME' in declared:
+        return 'Date'
+    if 'BLOB' in declared:
+        return 'Blob'
+    return 'String'
+
+
+def _to_date(value):
+    if value is None or isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(value)
+
+
+def _from_date(value):
+    if isinstance(value, datetime.date):
+        return value.isoformat(' ') if isinstance(value, datetime.datetime) else value.isoformat()
+    return value
+
+
+def _gpkg_wkb(value):
+    """WKB part of a GeoPackage geometry blob."""
+    if value is None or bytes(value[:2]) != b'GP':
+        return value
+    envelope = (value[3] >> 1) & 7
+    return bytes(value[8 + {0: 0, 1: 32, 2: 48, 3: 48, 4: 64}[envelope]:])
+
+
+def _centroid_xy(geometry):
+    centroid = geometry.trueCentroid
+    return (None, None) if centroid is None else (centroid.X, centroid.Y)
+
+
+# Geometry tokens that can be read from a GeoPackage geometry column, and the
+# functions computing their values from the WKB geometry. SHAPE@ and SHAPE@WKB
+# are read without building the geometry.
+_GEOMETRY_TOKENS = {'xy': _centroid_xy,
+                    'truecentroid': _centroid_xy,
+                    'x': lambda geometry: _centroid_xy(geometry)[0],
+                    'y': lambda geometry: _centroid_xy(geometry)[1],
+                    'area': lambda geometry: geometry.area,
+                    'length': lambda geometry: geometry.length}
+
+
+def _geometry_converter(token):
+    """Function converting a GeoPackage blob to the value of a token."""
+    if token == 'wkb':
+        return _gpkg_wkb
+    function = _GEOMETRY_TOKENS[token]
+    return lambda value: None if value is None else function(Geometry(_gpkg_wkb(bytes(value))))
+
+
+# Tables and views of a workspace, including the temporary views created by
+# MakeTableView_management.
+_SCHEMA = '(SELECT type, name FROM sqlite_master UNION ALL SELECT type, name FROM sqlite_temp_master)'
+
+
+class _Table(object):
+    """Schema information for a table in a workspace."""
+
+    def __init__(self, path):
+        workspace, name = _split_path(path)
+        if not Exists(path):
+            raise ExecuteError('Dataset %s does not exist or is not supported.' % path)
+        self.path = _normalize(path)
+        self.workspace = _connect(workspace)
+        self.name = self.workspace.execute("SELECT name FROM %s WHERE type IN ('table', 'view') AND lower(name) = lower(?)" % _SCHEMA, (name,)).fetchone()[0]
+
+        self.geometry = None
+        self.srs_id = 0
+        if self.workspace.execute("SELECT 1 FROM sqlite_master WHERE name = 'gpkg_geometry_columns'").fetchone():
+            geometry = self.workspace.execute('SELECT column_name, geometry_type_name, srs_id FROM gpkg_geometry_columns WHERE lower(table_name) = lower(?)', (self.name,)).fetchone()
+            if geometry:
+                self.geometry, self.geometry_type, self.srs_id = geometry
+
+        self.oid = None
+        self.fields = []
+        info = self.workspace.execute('PRAGMA table_info(%s)' % _quote(self.name)).fetchall()
+        primary_keys = [column for column in info if column[5]]
+        for cid, column, declared, notnull, default, pk in info:
+            if len(primary_keys) == 1 and pk and 'INT' in declared.upper():
+                self.oid = column
+                field_type = 'OID'
+            elif self.geometry and column.lower() == self.geometry.lower():
+                field_type = 'Geometry'
+            else:
+                field_type = _field_type(declared)
+            length = re.findall(r'\((\d+)\)', declared)
+            self.fields += [Field(column, field_type, int(length[0]) if length else 0)]
+
+        self._fields_by_name = {f.name.lower(): f for f in self.fields}
+
+    def field(self, name):
+        """Resolve a field name or token (OID@, SHAPE@...) to a Field."""
+        lower = name.lower()
+        if lower == 'oid@':
+            if self.oid:
+                return self._fields_by_name[self.oid.lower()]
+            return Field('rowid', 'OID')
+        if '@' in lower and self.geometry:
+            base, token = lower.split('@', 1)
+            if base in ('shape', self.geometry.lower()):
+                if token not in ('', 'wkb') and token not in _GEOMETRY_TOKENS:
+                    raise ExecuteError('Geometry token %s is not supported by the SQLite backend.' % name)
+                return self._fields_by_name[self.geometry.lower()]
+        if lower not in self._fields_by_name:
+            raise ExecuteError('Cannot find field %s in %s' % (name, self.path))
+        return self._fields_by_name[lower]
+
+    def resolve(self, field_names, writable=False):
+        """Return the requested field names and the matching Field objects.
+        With writable, the computed geometry tokens (SHAPE@AREA...) raise
+        ExecuteError."""
+        if isinstance(field_names, str):
+            field_names = [f.strip() for f in field_names.split(';')]
+        field_names = list(field_names)
+        if field_names == ['*']:
+            field_names = [f.name for f in self.fields]
+        if writable and self.geometry:
+            for name in field_names:
+                if name.split('@', 1)[-1].lower() in _GEOMETRY_TOKENS and '@' in name:
+                    raise ExecuteError('Geometry token %s can not be written by the SQLite backend.' % name)
+        return tuple(field_names), [self.field(name) for name in field_names]
+
+
+class SearchCursor(object):
+    """Mirror of arcpy.da.SearchCursor."""
+
+    def __init__(self, in_table, field_names, where_clause=None, spatial_reference=None, explode_to_points=False, sql_clause=(None, None)):
+        self._table = _Table(in_table)
+        self.fields, columns = self._table.resolve(field_names)
+
+        prefix, postfix = sql_clause if sql_clause else (None, None)
+        sql = 'SELECT %s%s FROM %s' % (prefix + ' ' if prefix else '',
+                                       ', '.join(_quote(c.name) for c in columns),
+                                       _quote(self._table.name))
+        if where_clause:
+            sql += ' WHERE %s' % _where(where_clause)
+        if postfix:
+            sql += ' %s' % postfix
+        self._sql = sql
+
+        self._converters = [(i, _to_date) for i, c in enumerate(columns) if c.type == 'Date']
+        self._converters += [(i, _geometry_converter(name.split('@', 1)[1].lower())) for i, (name, c) in enumerate(zip(self.fields, columns))
+                             if c.type == 'Geometry' and not name.endswith('@') and '@' in name]
+        self._rows = self._generate()
+
+    def _generate(self):
+        cursor = self._table.workspace.execute(self._sql)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if self._converters:
+                for row in rows:
+                    row = list(row)
+                    for i, converter in self._converters:
+                        row[i] = converter(row[i])
+                    yield tuple(row)
+            else:
+                for row in rows:
+                    yield row
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    next = __next__
+
+    def reset(self):
+        self._rows = self._generate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._rows = iter(())
+
+
+class InsertCursor(object):
+    """Mirror of arcpy.da.InsertCursor. Rows are buffered and written in
+    batches of batch_size, so insertRow does not return the new object id."""
+
+    def __init__(self, in_table, field_names):
+        self._table = _Table(in_table)
+        self.fields, columns = self._table.resolve(field_names, writable=True)
+        self._sql = 'INSERT INTO %s (%s) VALUES (%s)' % (_quote(self._table.name),
+                                                         ', '.join(_quote(c.name) for c in columns),
+                                                         ', '.join('?' * len(columns)))
+        self._dates = [i for i, c in enumerate(columns) if c.type == 'Date']
+        self._buffer = []
+
+    def insertRow(self, row):
+        if len(row) != len(self.fields):
+            raise TypeError('sequence size must match size of the row')
+        if self._dates:
+            row = list(row)
+            for i in self._dates:
+                row[i] = _from_date(row[i])
+        self._buffer.append(tuple(row))
+        if len(self._buffer) >= batch_size:
+            self._flush()
+
+    def _flush(self):
+        # Drop the buffer even if the insert fails, so it is not retried.
+        try:
+            if self._buffer:
+                self._table.workspace.executemany(self._sql, self._buffer)
+        finally:
+            self._buffer = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._flush()
+
+    def __del__(self):
+        if getattr(self, '_buffer', None):
+            self._flush()
+
+
+class UpdateCursor(object):
+    """Mirror of arcpy.da.UpdateCursor. Reads pages of batch_size rows in
+    rowid order, and writes buffered updates and deletes between pages."""
+
+    def __init__(self, in_table, field_names, where_clause=None, spatial_reference=None, explode_to_points=False, sql_clause=(None, None)):
+        if sql_clause and any(sql_clause):
+            raise ExecuteError('sql_clause is not supported for UpdateCursor in the SQLite backend.')
+
+        self._table = _Table(in_table)
+        self.fields, columns = self._table.resolve(field_names, writable=True)
+        table = _quote(self._table.name)
+
+        self._select = 'SELECT rowid, %s FROM %s WHERE %srowid > ? ORDER BY rowid LIMIT %d' % (
+            ', '.join(_quote(c.name) for c in columns),
+            table,
+            '(%s) AND ' % _where(where_clause) if where_clause else '',
+            batch_size)
+        self._update = 'UPDATE %s SET %s WHERE rowid = ?' % (table, ', '.join('%s = ?' % _quote(c.name) for c in columns))
+        self._delete = 'DELETE FROM %s WHERE rowid = ?' % table
+
+        self._dates = [i for i, c in enumerate(columns) if c.type == 'Date']
+        self._updates = []
+        self._deletes = []
+        self._rowid = None
+        self._rows = self._generate()
+
+    def _generate(self):
+        last = -2 ** 63
+        while True:
+            self._flush()
+            rows = self._table.workspace.execute(self._select, (last,)).fetchall()
+            if not rows:
+                break
+            for row in rows:
+                self._rowid = last = row[0]
+                row = list(row[1:])
+                for i in self._dates:
+                    row[i] = _to_date(row[i])
+                yield row
+        self._rowid = None
+
+    def updateRow(self, row):
+        if self._rowid is None:
+            raise ExecuteError('updateRow called outside of cursor iteration.')
+        row = list(row)
+        for i in self._dates:
+            row[i] = _from_date(row[i])
+        self._updates.append(tuple(row) + (self._rowid,))
+
+    def deleteRow(self):
+        if self._rowid is None:
+            raise ExecuteError('deleteRow called outside of cursor iteration.')
+        self._deletes.append((self._rowid,))
+
+    def _flush(self):
+        # Drop the buffers even if the statements fail, so they are not retried.
+        try:
+            if self._updates:
+                self._table.workspace.executemany(self._update, self._updates)
+            if self._deletes:
+                self._table.workspace.executemany(self._delete, self._deletes)
+        finally:
+            self._updates = []
+            self._deletes = []
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._rows)
+
+    next = __next__
+
+    def reset(self):
+        self._flush()
+        self._rows = self._generate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._flush()
+        self._rows = iter(())
+
+    def __del__(self):
+        if getattr(self, '_updates', None) or getattr(self, '_deletes', None):
+            self._flush()
+
+
+class Editor(object):
+    """Mirror of arcpy.da.Editor. Wraps the edits in a single transaction.
+    Paths that are not SQLite workspaces are accepted and ignored."""
+
+    def __init__(self, workspace):
+        self._workspace = _connect(workspace) if _is_workspace(workspace) else None
+
+    def startEditing(self, with_undo=True, multiuser_mode=True):
+        if self._workspace:
+            self._workspace.begin()
+
+    def stopEditing(self, save_changes=True):
+        if self._workspace:
+            if save_changes:
+                self._workspace.commit()
+            else:
+                self._workspace.rollback()
+
+    def startOperation(self):
+        pass
+
+    def stopOperation(self):
+        pass
+
+    def __enter__(self):
+        self.startEditing()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stopEditing(save_changes=exc_type is None)
+
+
+class _DataAccess(object):
+    """Mirror of the arcpy.da module."""
+    SearchCursor = SearchCursor
+    InsertCursor = InsertCursor
+    UpdateCursor = UpdateCursor
+    Editor = Editor
+
+
+da = _DataAccess()
+
+
+def Exists(dataset):
+    dataset = _normalize(dataset)
+    if _is_workspace(dataset):
+        return dataset.lower() == IN_MEMORY or os.path.isfile(dataset)
+    workspace, name = _split_path(dataset)
+    if not _is_workspace(workspace) or not Exists(workspace):
+        return False
+    return bool(_connect(workspace).execute("SELECT 1 FROM %s WHERE type IN ('table', 'view') AND lower(name) = lower(?)" % _SCHEMA, (name,)).fetchone())
+
+
+class Describe(object):
+    """Mirror of the arcpy Describe object for workspaces and tables."""
+
+    def __init__(self, value):
+        path = _normalize(value)
+        self.catalogPath = path
+        self.path, self.name = _split_path(path)
+        self.baseName = os.path.splitext(self.name)[0]
+
+        if _is_workspace(path):
+            if not Exists(path):
+                raise IOError('"%s" does not exist' % value)
+            self.dataType = 'Workspace'
+            self.workspaceType = 'LocalDatabase'
+            self.workspaceFactoryProgID = 'esriDataSourcesGDB.%sWorkspaceFactory.1' % ('InMemory' if path.lower() == IN_MEMORY else 'Sqlite')
+            return
+
+        table = _Table(path)
+        self.name = self.baseName = table.name
+        self.fields = list(table.fields)
+        self.hasOID = bool(table.oid)
+        self.OIDFieldName = table.oid or ''
+        self.hasGlobalID = False
+        self.globalIDFieldName = ''
+
+        if table.geometry:
+            self.dataType = self.datasetType = 'FeatureClass'
+            self.shapeFieldName = table.geometry
+            self.shapeType = table.geometry_type.capitalize()
+            self.spatialReference = SpatialReference(table.srs_id)
+        else:
+            self.dataType = self.datasetType = 'Table'
+
+
+def ListFields(dataset, wild_card=None, field_type=None):
+    fields = _Table(dataset).fields
+    if wild_card:
+        fields = [f for f in fields if fnmatch.fnmatch(f.name.lower(), wild_card.lower())]
+    if field_type and field_type.lower() != 'all':
+        fields = [f for f in fields if f.type.lower() == field_type.lower()]
+    return list(fields)
+
+
+def AddFieldDelimiters(datasource, field):
+    return _quote(field)
+
+
+def CreateTable_management(out_path, out_name, template=None, config_keyword=None):
+    path = _normalize(out_path + '/' + out_name if out_path else out_name)
+    workspace, name = _split_path(path)
+    if Exists(path):
+        if not env.overwriteOutput:
+            raise ExecuteError('ERROR 000258: Output %s already exists' % path)
+        Delete_management(path)
+    _connect(workspace).execute('CREATE TABLE %s ("OBJECTID" INTEGER PRIMARY KEY)' % _quote(name))
+
+    if template:
+        for field in ListFields(template):
+            if field.type in _ADD_FIELD_TYPES:
+                AddField_management(path, field.name, _ADD_FIELD_TYPES[field.type], field_length=field.length or None)
+
+    return Result(path)
+
+
+def CreateFeatureclass_management(out_path, out_name, *args, **kwargs):
+    raise ExecuteError('Feature classes can not be created by the SQLite backend.')
+
+
+def AddField_management(in_table, field_name, field_type, field_precision=None, field_scale=None, field_length=None, field_alias=None, field_is_nullable=None, field_is_required=None, field_domain=None):
+    table = _Table(in_table)
+    if field_name.lower() in [f.name.lower() for f in table.fields]:
+        raise ExecuteError('ERROR 000012: %s already exists' % field_name)
+    if field_type.upper() not in _DECLARED_TYPES:
+        raise ExecuteError('ERROR 000800: %s is not a valid field type' % field_type)
+    declared = _DECLARED_TYPES[field_type.upper()]
+    if declared == 'TEXT' and field_length:
+        declared = 'TEXT(%d)' % int(field_length)
+    table.workspace.execute('ALTER TABLE %s ADD COLUMN %s %s' % (_quote(table.name), _quote(field_name), declared))
+    return Result(table.path)
+
+
+def AddFields_management(in_table, field_description, template=None):
+    """Add several fields in one transaction. field_description is a list of
+    [name, type, alias, length, default, domain], where only name and type
+    are required."""
+
+    table = _Table(in_table)
+    table.workspace.begin()
+    try:
+        for description in field_description:
+            description = list(description) + [None] * (4 - len(description))
+            AddField_management(table.path, description[0], description[1], field_length=description[3] or None)
+    except Exception:
+        table.workspace.rollback()
+        raise
+    table.workspace.commit()
+    return Result(table.path)
+
+
+def AlterField_management(in_table, field, new_field_name=None, new_field_alias=None, *args, **kwargs):
+    table = _Table(in_table)
+    table.field(field)
+    if new_field_name and new_field_name != field:
+        table.workspace.execute('ALTER TABLE %s RENAME COLUMN %s TO %s' % (_quote(table.name), _quote(field), _quote(new_field_name)))
+    return Result(table.path)
+
+
+def Rename_management(in_data, out_data, data_type=None):
+    table = _Table(in_data)
+    workspace, name = _split_path(out_data)
+    if workspace and _connect(workspace) is not table.workspace:
+        raise ExecuteError('Rename_management can not move %s to another workspace.' % in_data)
+    if Exists(out_data):
+        raise ExecuteError('ERROR 000725: %s already exists' % out_data)
+    table.workspace.execute('ALTER TABLE %s RENAME TO %s' % (_quote(table.name), _quote(name)))
+    return Result(_normalize(out_data))
+
+
+def Delete_management(in_data, data_type=None):
+    path = _normalize(in_data)
+    if _is_workspace(path):
+        key = IN_MEMORY if path.lower() == IN_MEMORY else os.path.abspath(path)
+        workspace = _connections.pop(key, None)
+        if workspace:
+            workspace.connection.close()
+        if key != IN_MEMORY and os.path.isfile(path):
+            os.remove(path)
+        return Result(path)
+
+    if not Exists(path):
+        raise ExecuteError('ERROR 000732: %s does not exist' % path)
+    table = _Table(path)
+    kind = table.workspace.execute('SELECT type FROM %s WHERE name = ?' % _SCHEMA, (table.name,)).fetchone()[0]
+    table.workspace.execute('DROP %s %s' % (kind.upper(), _quote(table.name)))
+    return Result(path)
+
+
+def CopyRows_management(in_rows, out_table, config_keyword=None):
+    source = _Table(in_rows)
+    out_path, out_name = _split_path(out_table)
+    result = CreateTable_management(out_path, out_name)
+
+    fields = [f for f in source.fields if f.type in _ADD_FIELD_TYPES]
+    for field in fields:
+        AddField_management(result, field.name, _ADD_FIELD_TYPES[field.type], field_length=field.length or None)
+
+    names = [f.name for f in fields]
+    if names:
+        with SearchCursor(in_rows, names) as rows:
+            with InsertCursor(result, names) as cursor:
+                for row in rows:
+                    cursor.insertRow(row)
+
+    return result
+
+
+def MakeTableView_management(in_table, out_view, where_clause=None, workspace=None, field_info=None):
+    """Table view of the rows of in_table matching where_clause, created as a
+    temporary SQLite view next to in_table. Returns the path of the view,
+    which the other functions take in place of the view name."""
+
+    source = _Table(in_table)
+    source_path, _ = _split_path(source.path)
+    path = _normalize(os.path.join(source_path, out_view))
+    if Exists(path):
+        if not env.overwriteOutput:
+            raise ExecuteError("ERROR 000258: Output %s already exists" % path)
+        Delete_management(path)
+
+    sql = 'SELECT * FROM %s' % _quote(source.name)
+    if where_clause:
+        sql += ' WHERE %s' % _where(where_clause)
+    source.workspace.execute('CREATE TEMP VIEW %s AS %s' % (_quote(out_view), sql))
+    return Result(path)
+
+
+def CopyFeatures_management(in_features, out_feature_class, *args, **kwargs):
+    raise ExecuteError('Feature classes can not be created by the SQLite backend.')
+
+
+def GetCount_management(in_rows):
+    table = _Table(in_rows)
+    return Result(table.workspace.execute('SELECT COUNT(*) FROM %s' % _quote(table.name)).fetchone()[0])
+
+
+# Statistics_analysis statistic types and their SQL aggregate functions.
+_STATISTICS = {'SUM': 'SUM', 'MEAN': 'AVG', 'MIN': 'MIN', 'MAX': 'MAX', 'COUNT': 'COUNT'}
+
+
+def Statistics_analysis(in_table, out_table, statistics_fields, case_field=None):
+    """Summary statistics of in_table, per unique combination of the case
+    fields, calculated by SQLite with GROUP BY."""
+
+    source = _Table(in_table)
+    if isinstance(statistics_fields, str):
+        statistics_fields = [item.split() for item in statistics_fields.split(';')]
+    if not case_field:
+        case_field = []
+    elif isinstance(case_field, str):
+        case_field = [f.strip() for f in case_field.split(';')]
+
+    case_fields = [source.field(name) for name in case_field]
+    columns = [_quote(f.name) for f in case_fields] + ['COUNT(*)']
+    out_fields = [(f.name, _ADD_FIELD_TYPES.get(f.type, 'TEXT')) for f in case_fields] + [('FREQUENCY', 'LONG')]
+    for name, statistic in statistics_fields:
+        field = source.field(name)
+        statistic = statistic.upper()
+        if statistic not in _STATISTICS:
+            raise ExecuteError('ERROR 000800: %s is not a supported statistic type' % statistic)
+        columns += ['%s(%s)' % (_STATISTICS[statistic], _quote(field.name))]
+        if statistic == 'COUNT':
+            field_type = 'LONG'
+        elif statistic == 'MEAN':
+            field_type = 'DOUBLE'
+        else:
+            field_type = _ADD_FIELD_TYPES.get(field.type, 'DOUBLE')
+        out_fields += [('%s_%s' % (statistic, field.name), field_type)]
+
+    sql = 'SELECT %s FROM %s' % (', '.join(columns), _quote(source.name))
+    if case_fields:
+        sql += ' GROUP BY %s' % ', '.join(_quote(f.name) for f in case_fields)
+    rows = source.workspace.execute(sql).fetchall()
+
+    out_path, out_name = _split_path(out_table)
+    result = CreateTable_management(out_path, out_name)
+    for name, field_type in out_fields:
+        AddField_management(result, name, field_type)
+    with InsertCursor(result, [name for name, _ in out_fields]) as cursor:
+        for row in rows:
+            cursor.insertRow(row)
+
+    return result
+
+
+def CheckExtension(product):
+    # There is no licensing in the SQLite backend. The pure numpy methods
+    # of arctools only check extensions out as a formality.
+    return 'Available'
+
+
+def CheckOutExtension(product):
+    return 'CheckedOut'
+
+
+def CheckInExtension(product):
+    return 'CheckedIn'
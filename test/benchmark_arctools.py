@@ -0,0 +1,197 @@
+#-------------------------------------------------------------------------------
+# Name:        arctools benchmark suite
+# Purpose:     Measure the performance of the arctools methods against the
+#              in-memory fake_arcpy backend, and record the results as JSON
+#              so that runs can be compared.
+#
+# Created:     18.10.2026
+#-------------------------------------------------------------------------------
+'''
+Usage:
+    python test/benchmark_arctools.py [--output results.json] [--compare baseline.json]
+                                      [--quick] [--repeat N]
+                                      [--describe-latency S] [--cursor-latency S]
+                                      [--row-latency S] [--tool-latency S]
+
+Every benchmark is run --repeat times, and the fastest run is recorded.
+With --compare, each result is listed with its ratio to the same benchmark
+in an earlier result file. Ratios above 1 are slowdowns.
+'''
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import datetime
+
+import numpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import arctools
+
+try:
+    from . import fake_arcpy
+except (ImportError, ValueError):
+    import fake_arcpy
+
+TABLE = 'in_memory\\benchmark_table'
+OUTPUT = 'in_memory\\benchmark_output'
+
+SIZES = {'rows': [1000, 10000, 100000],
+         'update_rows': [1000, 10000],
+         'update_keys': [10, 100, 1000],
+         'raster_side': [100, 300, 1000]}
+
+QUICK_SIZES = {'rows': [100, 1000],
+               'update_rows': [100, 1000],
+               'update_keys': [10, 100],
+               'raster_side': [50, 100]}
+
+
+def make_rows(count, groups=100):
+    return [{'id': i, 'group': i % groups, 'name': 'name_%d' % i, 'value': i * 0.5} for i in range(count)]
+
+
+def make_table(count):
+    fake_arcpy.reset()
+    arctools.dictToTable(make_rows(count), TABLE)
+
+
+def timed(function, repeat, setup=None):
+    """Fastest wall time of repeat runs of function. setup is run, untimed,
+    before each run."""
+    best = None
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def benchmark_table_to_dict(sizes, repeat):
+    for rows in sizes['rows']:
+        make_table(rows)
+        for mode, kwargs in [('list', {}), ('keyField', {'keyField': 'id'}), ('groupBy', {'groupBy': 'group'})]:
+            seconds = timed(lambda: arctools.tableToDict(TABLE, **kwargs), repeat)
+            yield {'benchmark': 'tableToDict', 'mode': mode, 'rows': rows, 'seconds': seconds}
+
+
+def benchmark_dict_to_table(sizes, repeat):
+    for rows in sizes['rows']:
+        data = make_rows(rows)
+
+        def setup():
+            fake_arcpy.reset()
+
+        seconds = timed(lambda: arctools.dictToTable(data, OUTPUT), repeat, setup)
+        yield {'benchmark': 'dictToTable', 'mode': 'insert', 'rows': rows, 'seconds': seconds}
+
+    for rows in sizes['update_rows']:
+        for keys in sizes['update_keys']:
+            if keys > rows:
+                continue
+            step = rows // keys
+            updates = [{'id': i * step, 'name': 'updated'} for i in range(keys)]
+            deletes = [{'id': i * step} for i in range(keys)]
+
+            seconds = timed(lambda: arctools.dictToTable(updates, TABLE, method='update', dictionaryKey='id'), repeat, lambda: make_table(rows))
+            yield {'benchmark': 'dictToTable', 'mode': 'update', 'rows': rows, 'keys': keys, 'seconds': seconds}
+
+            seconds = timed(lambda: arctools.dictToTable(deletes, TABLE, method='delete', dictionaryKey='id', makeTable=False), repeat, lambda: make_table(rows))
+            yield {'benchmark': 'dictToTable', 'mode': 'delete', 'rows': rows, 'keys': keys, 'seconds': seconds}
+
+
+def benchmark_zonal_statistics(sizes, repeat):
+    random = numpy.random.RandomState(0)
+    for side in sizes['raster_side']:
+        value = random.random_sample((side, side)) * 100
+        value[random.random_sample((side, side)) < 0.05] = numpy.nan
+        zone = numpy.floor(random.random_sample((side, side)) * side).astype('float64')
+        zone[random.random_sample((side, side)) < 0.05] = numpy.nan
+
+        seconds = timed(lambda: arctools._zonal_statistics_as_dict(value, zone, ['mean', 'sum', 'max', 'min']), repeat)
+        yield {'benchmark': '_zonal_statistics_as_dict', 'mode': 'mean,sum,max,min', 'rows': side * side, 'zones': side, 'seconds': seconds}
+
+
+def run(sizes, repeat, latency):
+    previous = arctools.use_backend(fake_arcpy)
+    fake_arcpy.reset()
+    try:
+        results = []
+        for suite in [benchmark_table_to_dict, benchmark_dict_to_table, benchmark_zonal_statistics]:
+            fake_arcpy.set_latency(**latency)
+            for result in suite(sizes, repeat):
+                result['rows_per_second'] = result['rows'] / result['seconds'] if result['seconds'] else None
+                results += [result]
+                print(format_result(result))
+        return results
+    finally:
+        fake_arcpy.reset()
+        arctools.use_backend(previous)
+
+
+def key(result):
+    return tuple((k, result[k]) for k in sorted(result) if k not in ('seconds', 'rows_per_second', 'ratio'))
+
+
+def compare(results, baseline):
+    baseline = dict((key(r), r) for r in baseline['results'])
+    for result in results:
+        if key(result) in baseline and baseline[key(result)]['seconds']:
+            result['ratio'] = result['seconds'] / baseline[key(result)]['seconds']
+
+
+def format_result(result):
+    parameters = ', '.join('%s=%s' % (k, result[k]) for k in sorted(result) if k not in ('benchmark', 'seconds', 'rows_per_second', 'ratio'))
+    line = '%-26s %-50s %10.4f s' % (result['benchmark'], parameters, result['seconds'])
+    if 'ratio' in result:
+        line += ' %6.2fx' % result['ratio']
+    return line
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Benchmark arctools against an in-memory arcpy.')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write the results to.')
+    parser.add_argument('--compare', help='Earlier JSON result file to compare against.')
+    parser.add_argument('--quick', action='store_true', help='Run with small sizes only.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--describe-latency', type=float, default=0.0)
+    parser.add_argument('--cursor-latency', type=float, default=0.0)
+    parser.add_argument('--row-latency', type=float, default=0.0)
+    parser.add_argument('--tool-latency', type=float, default=0.0)
+    arguments = parser.parse_args(arguments)
+
+    latency = {'describe': arguments.describe_latency,
+               'cursor': arguments.cursor_latency,
+               'row': arguments.row_latency,
+               'tool': arguments.tool_latency}
+
+    results = run(QUICK_SIZES if arguments.quick else SIZES, arguments.repeat, latency)
+
+    if arguments.compare:
+        with open(arguments.compare) as f:
+            compare(results, json.load(f))
+        print('\nCompared to %s:' % arguments.compare)
+        for result in results:
+            print(format_result(result))
+
+    output = {'created': datetime.datetime.now().isoformat(),
+              'python': sys.version.split()[0],
+              'platform': platform.platform(),
+              'numpy': numpy.__version__,
+              'latency': latency,
+              'repeat': arguments.repeat,
+              'results': results}
+    with open(arguments.output, 'w') as f:
+        json.dump(output, f, indent=2)
+
+    return output
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,765 @@
+#-------------------------------------------------------------------------------
+# Name:        fake_arcpy
+# Purpose:     In-memory stand-in for arcpy, holding tables as python lists.
+#              Used to benchmark arctools without ArcGIS. The cost of the
+#              arcpy calls is simulated with configurable latencies.
+#
+#              Feature classes hold axis-aligned rectangles, and rasters
+#              numpy arrays, which is enough to run the geoprocessing paths
+#              of arctools in tests. The contour tools only simulate their
+#              output: ContourWithBarriers writes one line per level, and
+#              FeatureToPolygon splits the extent of its input into one
+#              vertical strip per input feature.
+#
+# Created:     18.10.2026
+#-------------------------------------------------------------------------------
+import re
+import time
+import struct
+import fnmatch
+import numpy
+
+# Simulated cost in seconds of the arcpy calls. See set_latency.
+latency = {'describe': 0.0,  # Describe and ListFields.
+           'cursor': 0.0,    # Opening a cursor.
+           'row': 0.0,       # Each row fetched or written by a cursor.
+           'tool': 0.0}      # Each geoprocessing tool.
+
+# Tables and feature classes, and rasters, by lower case path.
+_tables = {}
+_rasters = {}
+
+_FIELD_TYPES = {'TEXT': 'String', 'SHORT': 'SmallInteger', 'LONG': 'Integer', 'FLOAT': 'Single',
+                'DOUBLE': 'Double', 'DATE': 'Date', 'GUID': 'Guid', 'BLOB': 'Blob'}
+
+
+class ExecuteError(Exception):
+    pass
+
+
+class _Environment(object):
+    def __init__(self):
+        self.overwriteOutput = False
+        self.workspace = None
+        self.extent = None
+        self.snapRaster = None
+
+
+env = _Environment()
+
+
+def set_latency(describe=0.0, cursor=0.0, row=0.0, tool=0.0):
+    """Set the simulated cost in seconds of the arcpy calls."""
+    latency.update(describe=describe, cursor=cursor, row=row, tool=tool)
+
+
+def reset():
+    """Remove all tables, rasters and latencies."""
+    _tables.clear()
+    _rasters.clear()
+    env.__init__()
+    set_latency()
+
+
+def _wait(kind):
+    seconds = latency[kind]
+    if seconds:
+        # Busy wait; time.sleep is far too coarse for per-row latencies.
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            pass
+
+
+def _key(path):
+    return str(path).replace('\\', '/').rstrip('/').lower()
+
+
+class Result(object):
+    def __init__(self, *outputs):
+        self._outputs = [str(o) for o in outputs]
+
+    def getOutput(self, index):
+        return self._outputs[index]
+
+    def __getitem__(self, index):
+        return self._outputs[index]
+
+    def __str__(self):
+        return self._outputs[0]
+
+
+class Field(object):
+    def __init__(self, name, type, length=0):
+        self.name = name
+        self.type = type
+        self.length = length
+
+
+class SpatialReference(object):
+    def __init__(self, code=0):
+        self.factoryCode = self.PCSCode = code
+        self.GCSCode = 0
+        self.name = 'EPSG:%s' % code
+
+
+class Point(object):
+    def __init__(self, X=0.0, Y=0.0):
+        self.X = X
+        self.Y = Y
+
+
+class Array(list):
+    pass
+
+
+class Extent(object):
+    def __init__(self, XMin, YMin, XMax, YMax):
+        self.XMin, self.YMin, self.XMax, self.YMax = XMin, YMin, XMax, YMax
+        self.width = XMax - XMin
+        self.height = YMax - YMin
+        self.lowerLeft = Point(XMin, YMin)
+
+    def overlaps(self, other):
+        return self.XMin <= other.XMax and other.XMin <= self.XMax and self.YMin <= other.YMax and other.YMin <= self.YMax
+
+    def intersect(self, other):
+        """Intersection with positive area, or None."""
+        box = (max(self.XMin, other.XMin), max(self.YMin, other.YMin), min(self.XMax, other.XMax), min(self.YMax, other.YMax))
+        return Extent(*box) if box[0] < box[2] and box[1] < box[3] else None
+
+
+class Geometry(object):
+    pass
+
+
+class Polygon(Geometry):
+    """Axis-aligned rectangle, the bounding box of the points."""
+
+    type = 'polygon'
+
+    def __init__(self, points, spatial_reference=None):
+        if isinstance(points, Extent):
+            self.extent = points
+        else:
+            xs, ys = [p.X for p in points], [p.Y for p in points]
+            self.extent = Extent(min(xs), min(ys), max(xs), max(ys))
+        self.spatialReference = spatial_reference
+
+    @property
+    def area(self):
+        return self.extent.width * self.extent.height
+
+    @property
+    def centroid(self):
+        return Point((self.extent.XMin + self.extent.XMax) / 2.0, (self.extent.YMin + self.extent.YMax) / 2.0)
+
+    @property
+    def WKB(self):
+        e = self.extent
+        ring = [(e.XMin, e.YMin), (e.XMin, e.YMax), (e.XMax, e.YMax), (e.XMax, e.YMin), (e.XMin, e.YMin)]
+        return bytearray(struct.pack('<BIII', 1, 3, 1, len(ring)) + b''.join(struct.pack('<dd', x, y) for x, y in ring))
+
+
+_SHAPE_TOKENS = {'shape@': lambda g: g,
+                 'shape@area': lambda g: g.area,
+                 'shape@wkb': lambda g: g.WKB,
+                 'shape@xy': lambda g: (g.centroid.X, g.centroid.Y)}
+
+
+class _FakeTable(object):
+    def __init__(self, path):
+        self.path = str(path)
+        self.fields = [Field('OBJECTID', 'OID')]
+        self.rows = []  # Lists of values in the order of fields.
+        self.next_oid = 1
+        self.shape_type = None  # Set for feature classes, with a Shape field.
+        self.spatial_reference = None
+
+    def copy(self, path, rows=None):
+        copy = _FakeTable(path)
+        copy.fields = list(self.fields)
+        copy.rows = [list(row) for row in (self.rows if rows is None else rows)]
+        copy.next_oid = self.next_oid
+        copy.shape_type = self.shape_type
+        copy.spatial_reference = self.spatial_reference
+        return copy
+
+    def index(self, name):
+        lower = name.lower()
+        if lower == 'oid@':
+            return 0
+        if self.shape_type and lower.startswith('shape@'):
+            return self.index('Shape')
+        for i, field in enumerate(self.fields):
+            if field.name.lower() == lower:
+                return i
+        raise ExecuteError('Cannot find field %s in %s' % (name, self.path))
+
+    def indexes(self, field_names):
+        if isinstance(field_names, str):
+            field_names = [field_names]
+        field_names = list(field_names)
+        if field_names == ['*']:
+            field_names = [f.name for f in self.fields]
+        return tuple(field_names), [self.index(name) for name in field_names]
+
+    def converters(self, field_names):
+        """(position, function) of the shape tokens in field_names."""
+        return [(i, _SHAPE_TOKENS[name.lower()]) for i, name in enumerate(field_names)
+                if self.shape_type and name.lower() in _SHAPE_TOKENS]
+
+    def predicate(self, where_clause):
+        """Translate a simple SQL where clause to a python function of a row."""
+        if not where_clause:
+            return None
+        names = dict((f.name.lower(), i) for i, f in enumerate(self.fields))
+
+        tokens = re.findall(r"'(?:[^']|'')*'|\"[^\"]+\"|<>|!=|<=|>=|[=<>(),]|[\w.@-]+", where_clause)
+        expression = []
+        in_lists = []
+        i = 0
+        while i < len(tokens):
+            token = tokens[i]
+            upper = token.upper()
+            if token.startswith("'"):
+                expression += [repr(token[1:-1].replace("''", "'"))]
+            elif token.startswith('"') or token.lower() in names:
+                expression += ['row[%d]' % names[token.strip('"').lower()]]
+            elif upper in ('AND', 'OR', 'NOT', 'IN'):
+                expression += [upper.lower()]
+            elif upper == 'IS':
+                if tokens[i + 1].upper() == 'NOT':
+                    expression += ['is not']
+                    i += 1
+                else:
+                    expression += ['is']
+            elif upper == 'NULL':
+                expression += ['None']
+            elif token == '=':
+                expression += ['==']
+            elif token == '<>':
+                expression += ['!=']
+            elif token == '(':
+                in_lists += [bool(expression) and expression[-1] == 'in']
+                expression += ['(']
+            elif token == ')':
+                expression += [',)' if in_lists.pop() else ')']
+            else:
+                expression += [token]
+            i += 1
+        return eval('lambda row: ' + ' '.join(expression))
+
+
+def Exists(dataset):
+    return _key(dataset) in _tables or _key(dataset) in _rasters
+
+
+def _table(path):
+    if _key(path) not in _tables:
+        raise ExecuteError('Dataset %s does not exist.' % path)
+    return _tables[_key(path)]
+
+
+class Describe(object):
+    def __init__(self, value):
+        _wait('describe')
+        if _key(value) in _rasters:
+            raster = _rasters[_key(value)]
+            self.catalogPath = raster.path
+            self.dataType = self.datasetType = 'RasterDataset'
+            self.extent = raster.extent
+            self.meanCellWidth = self.meanCellHeight = raster.cell_size
+            self.height, self.width = raster.array.shape
+            self.noDataValue = raster.no_data
+            self.spatialReference = raster.spatial_reference
+            return
+
+        table = _table(value)
+        self.catalogPath = table.path
+        self.dataType = self.datasetType = 'FeatureClass' if table.shape_type else 'Table'
+        self.hasOID = True
+        self.OIDFieldName = 'OBJECTID'
+        self.hasGlobalID = False
+        self.globalIDFieldName = ''
+        self.fields = list(table.fields)
+        if table.shape_type:
+            self.shapeFieldName = 'Shape'
+            self.shapeType = table.shape_type
+            self.spatialReference = table.spatial_reference
+            self.extent = _features_extent(table)
+
+
+def ListFields(dataset, wild_card=None, field_type=None):
+    _wait('describe')
+    fields = list(_table(dataset).fields)
+    if wild_card:
+        fields = [f for f in fields if fnmatch.fnmatch(f.name.lower(), wild_card.lower())]
+    return fields
+
+
+def AddFieldDelimiters(datasource, field):
+    return field
+
+
+def CreateTable_management(out_path, out_name, template=None, config_keyword=None):
+    _wait('tool')
+    path = str(out_path) + '/' + str(out_name) if out_path else str(out_name)
+    if Exists(path) and not env.overwriteOutput:
+        raise ExecuteError('Output %s already exists' % path)
+    _tables[_key(path)] = _FakeTable(path)
+    return Result(path)
+
+
+def CreateFeatureclass_management(out_path, out_name, geometry_type='POLYGON', template=None, has_m=None, has_z=None, spatial_reference=None, **kwargs):
+    result = CreateTable_management(out_path, out_name)
+    table = _table(result)
+    table.fields += [Field('Shape', 'Geometry')]
+    table.shape_type = geometry_type.capitalize()
+    table.spatial_reference = spatial_reference if isinstance(spatial_reference, SpatialReference) else SpatialReference(spatial_reference or 0)
+    return result
+
+
+def AddField_management(in_table, field_name, field_type, field_precision=None, field_scale=None, field_length=None, **kwargs):
+    _wait('tool')
+    table = _table(in_table)
+    table.fields += [Field(field_name, _FIELD_TYPES[field_type.upper()], field_length or 0)]
+    for row in table.rows:
+        row.append(None)
+    return Result(in_table)
+
+
+def Delete_management(in_data, data_type=None):
+    _wait('tool')
+    if _key(in_data) in _rasters:
+        del _rasters[_key(in_data)]
+    else:
+        _table(in_data)
+        del _tables[_key(in_data)]
+    return Result(in_data)
+
+
+def CopyRows_management(in_rows, out_table, config_keyword=None):
+    _wait('tool')
+    if Exists(out_table) and not env.overwriteOutput:
+        raise ExecuteError('Output %s already exists' % out_table)
+    _tables[_key(out_table)] = _table(in_rows).copy(out_table)
+    return Result(out_table)
+
+
+def GetCount_management(in_rows):
+    _wait('tool')
+    return Result(len(_table(in_rows).rows))
+
+
+def CheckExtension(product):
+    return 'Available'
+
+
+def CheckOutExtension(product):
+    return 'CheckedOut'
+
+
+def CheckInExtension(product):
+    return 'CheckedIn'
+
+
+def _ordered(table, rows, sql_clause):
+    postfix = sql_clause[1] if sql_clause else None
+    if not postfix:
+        return rows
+    order = re.findall(r'(?i)^\s*ORDER\s+BY\s+(.+)$', postfix)
+    if not order:
+        raise ExecuteError('Only ORDER BY is supported in sql_clause by fake_arcpy.')
+    rows = list(rows)
+    for term in reversed(order[0].split(',')):
+        parts = term.split()
+        index = table.index(parts[0].strip('"'))
+        rows.sort(key=lambda row: (row[index] is None, row[index]), reverse=len(parts) > 1 and parts[1].upper() == 'DESC')
+    return rows
+
+
+class SearchCursor(object):
+    def __init__(self, in_table, field_names, where_clause=None, spatial_reference=None, explode_to_points=False, sql_clause=(None, None)):
+        _wait('cursor')
+        table = _table(in_table)
+        self.fields, self._indexes = table.indexes(field_names)
+        self._converters = table.converters(self.fields)
+        predicate = table.predicate(where_clause)
+        rows = [row for row in table.rows if predicate(row)] if predicate else table.rows
+        self._rows = iter(_ordered(table, rows, sql_clause))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self._rows)
+        _wait('row')
+        if self._converters:
+            values = [row[i] for i in self._indexes]
+            for i, converter in self._converters:
+                values[i] = converter(values[i])
+            return tuple(values)
+        return tuple(row[i] for i in self._indexes)
+
+    next = __next__
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._rows = iter(())
+
+
+class InsertCursor(object):
+    def __init__(self, in_table, field_names):
+        _wait('cursor')
+        self._table = _table(in_table)
+        self.fields, self._indexes = self._table.indexes(field_names)
+
+    def insertRow(self, row):
+        _wait('row')
+        values = [None] * len(self._table.fields)
+        for i, value in zip(self._indexes, row):
+            values[i] = value
+        values[0] = self._table.next_oid
+        self._table.next_oid += 1
+        self._table.rows.append(values)
+        return values[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class UpdateCursor(object):
+    def __init__(self, in_table, field_names, where_clause=None, spatial_reference=None, explode_to_points=False, sql_clause=(None, None)):
+        _wait('cursor')
+        self._table = _table(in_table)
+        self.fields, self._indexes = self._table.indexes(field_names)
+        self._converters = self._table.converters(self.fields)
+        self._predicate = self._table.predicate(where_clause)
+        self._deleted = set()
+        self._current = None
+        self._rows = iter(list(self._table.rows))
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        for row in self._rows:
+            if self._predicate is None or self._predicate(row):
+                _wait('row')
+                self._current = row
+                values = [row[i] for i in self._indexes]
+                for i, converter in self._converters:
+                    values[i] = converter(values[i])
+                return values
+        self._close()
+        raise StopIteration
+
+    next = __next__
+
+    def updateRow(self, row):
+        tokens = set(i for i, _ in self._converters if self.fields[i].lower() != 'shape@')
+        for position, (i, value) in enumerate(zip(self._indexes, row)):
+            if i and position not in tokens:
+                self._current[i] = value
+
+    def deleteRow(self):
+        self._deleted.add(id(self._current))
+
+    def _close(self):
+        if self._deleted:
+            self._table.rows = [row for row in self._table.rows if id(row) not in self._deleted]
+            self._deleted = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self._close()
+
+
+class Editor(object):
+    def __init__(self, workspace):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class _DataAccess(object):
+    SearchCursor = SearchCursor
+    InsertCursor = InsertCursor
+    UpdateCursor = UpdateCursor
+    Editor = Editor
+
+
+da = _DataAccess()
+
+
+def _features_extent(table):
+    shape = table.index('Shape')
+    extents = [row[shape].extent for row in table.rows if row[shape] is not None]
+    if not extents:
+        return Extent(0.0, 0.0, 0.0, 0.0)
+    return Extent(min(e.XMin for e in extents), min(e.YMin for e in extents),
+                  max(e.XMax for e in extents), max(e.YMax for e in extents))
+
+
+def _insert_features(path, shape_type, spatial_reference, fields, rows):
+    """Create the feature class path with fields (name, type) and insert
+    rows of (geometry, values...)."""
+    workspace, _, name = str(path).replace('\\', '/').rpartition('/')
+    if Exists(path):
+        Delete_management(path)
+    CreateFeatureclass_management(workspace, name, shape_type, spatial_reference=spatial_reference)
+    for field, field_type in fields:
+        AddField_management(path, field, field_type)
+    with InsertCursor(path, ['SHAPE@'] + [f for f, _ in fields]) as cursor:
+        for row in rows:
+            cursor.insertRow(row)
+    return Result(path)
+
+
+def _geometry_input(dataset):
+    """Geometries of a feature class, a geometry or a list of geometries."""
+    if isinstance(dataset, Geometry):
+        return [dataset]
+    if isinstance(dataset, list):
+        return dataset
+    table = _table(dataset)
+    shape = table.index('Shape')
+    return [row[shape] for row in table.rows]
+
+
+# Geoprocessing tools:
+
+def CreateFileGDB_management(out_folder_path, out_name):
+    return Result(str(out_folder_path) + '/' + str(out_name))
+
+
+def DefineProjection_management(in_dataset, coor_system):
+    _table(in_dataset).spatial_reference = coor_system
+    return Result(in_dataset)
+
+
+def MakeFeatureLayer_management(in_features, out_layer, where_clause=None):
+    _wait('tool')
+    table = _table(in_features)
+    predicate = table.predicate(where_clause)
+    _tables[_key(out_layer)] = table.copy(out_layer, [row for row in table.rows if predicate is None or predicate(row)])
+    return Result(out_layer)
+
+
+def SelectLayerByLocation_management(in_layer, overlap_type='INTERSECT', select_features=None):
+    _wait('tool')
+    layer = _table(in_layer)
+    shape = layer.index('Shape')
+    extents = [g.extent for g in _geometry_input(select_features)]
+    layer.rows = [row for row in layer.rows if any(row[shape].extent.overlaps(e) for e in extents)]
+    return Result(in_layer)
+
+
+def Intersect_analysis(in_features, out_feature_class, join_attributes='ALL'):
+    """Intersect of two inputs, with FID_ fields and the attributes of both."""
+    _wait('tool')
+    first, second = [_table(f) for f in in_features]
+    names = [f.name.lower() for f in first.fields]
+    fields, columns = [], []
+    for table, dataset in [(first, in_features[0]), (second, in_features[1])]:
+        fields += [('FID_' + str(dataset).replace('\\', '/').rpartition('/')[2], 'LONG')]
+        columns += [(table, 0)]
+        for i, field in enumerate(table.fields):
+            if field.type in ('OID', 'Geometry'):
+                continue
+            name = field.name
+            if table is second and name.lower() in names:
+                name += '_1'
+            fields += [(name, {'Integer': 'LONG', 'Double': 'DOUBLE', 'String': 'TEXT'}.get(field.type, 'TEXT'))]
+            columns += [(table, i)]
+
+    rows = []
+    first_shape, second_shape = first.index('Shape'), second.index('Shape')
+    for a in first.rows:
+        for b in second.rows:
+            extent = a[first_shape].extent.intersect(b[second_shape].extent)
+            if extent is not None:
+                rows += [[Polygon(extent)] + [(a if table is first else b)[i] for table, i in columns]]
+    return _insert_features(out_feature_class, 'Polygon', first.spatial_reference, fields, rows)
+
+
+def Clip_analysis(in_features, clip_features, out_feature_class, cluster_tolerance=None):
+    _wait('tool')
+    table = _table(in_features)
+    shape = table.index('Shape')
+    fields = [(f.name, {'Integer': 'LONG', 'Double': 'DOUBLE'}.get(f.type, 'TEXT')) for f in table.fields if f.type not in ('OID', 'Geometry')]
+    positions = [i for i, f in enumerate(table.fields) if f.type not in ('OID', 'Geometry')]
+    rows = []
+    for clip in _geometry_input(clip_features):
+        for row in table.rows:
+            extent = row[shape].extent.intersect(clip.extent)
+            if extent is not None:
+                rows += [[Polygon(extent)] + [row[i] for i in positions]]
+    return _insert_features(out_feature_class, table.shape_type, table.spatial_reference, fields, rows)
+
+
+def Merge_management(inputs, output, field_mappings=None):
+    """Union of the rows of the inputs, matching fields by name."""
+    _wait('tool')
+    if isinstance(inputs, str):
+        inputs = inputs.split(';')
+    tables = [_table(i) for i in inputs]
+    fields = []
+    for table in tables:
+        for field in table.fields:
+            if field.type not in ('OID', 'Geometry') and field.name.lower() not in [f.lower() for f, _ in fields]:
+                fields += [(field.name, {'Integer': 'LONG', 'Double': 'DOUBLE'}.get(field.type, 'TEXT'))]
+    rows = []
+    for table in tables:
+        shape = table.index('Shape')
+        names = dict((f.name.lower(), i) for i, f in enumerate(table.fields))
+        rows += [[row[shape]] + [row[names[f.lower()]] if f.lower() in names else None for f, _ in fields] for row in table.rows]
+    return _insert_features(output, tables[0].shape_type, tables[0].spatial_reference, fields, rows)
+
+
+def Dissolve_management(in_features, out_feature_class, dissolve_field=None, statistics_fields=None, multi_part=None):
+    """One feature per value of dissolve_field, covering the extents of its features."""
+    _wait('tool')
+    table = _table(in_features)
+    shape, field = table.index('Shape'), table.index(dissolve_field)
+    groups = {}
+    for row in table.rows:
+        groups.setdefault(row[field], []).append(row[shape].extent)
+    rows = [[Polygon(Extent(min(e.XMin for e in extents), min(e.YMin for e in extents), max(e.XMax for e in extents), max(e.YMax for e in extents))), value]
+            for value, extents in sorted(groups.items(), key=lambda item: (item[0] is None, item[0]))]
+    field_type = {'Integer': 'LONG', 'Double': 'DOUBLE'}.get(table.fields[field].type, 'TEXT')
+    return _insert_features(out_feature_class, table.shape_type, table.spatial_reference, [(dissolve_field, field_type)], rows)
+
+
+def CopyFeatures_management(in_features, out_feature_class):
+    _wait('tool')
+    if isinstance(out_feature_class, Geometry):
+        return _geometry_input(in_features)
+    return CopyRows_management(in_features, out_feature_class)
+
+
+def CreateFishnet_management(out_feature_class, origin_coord, y_axis_coord, cell_width, cell_height, number_rows, number_columns, corner_coord=None, labels=None, template=None, geometry_type='POLYGON'):
+    """A single cell spanning template, as that is all arctools asks for."""
+    x_min, y_min, x_max, y_max = [float(v) for v in template.split()]
+    return _insert_features(out_feature_class, geometry_type, None, [], [[Polygon(Extent(x_min, y_min, x_max, y_max))]])
+
+
+def FeatureToPolygon_management(in_features, out_feature_class, cluster_tolerance=None, attributes=None, label_features=None):
+    """Simulated: one vertical strip per input feature over their extent."""
+    _wait('tool')
+    table = _table(in_features)
+    extent = _features_extent(table)
+    edges = numpy.linspace(extent.XMin, extent.XMax, len(table.rows) + 1)
+    rows = [[Polygon(Extent(float(x_min), extent.YMin, float(x_max), extent.YMax))] for x_min, x_max in zip(edges[:-1], edges[1:])]
+    return _insert_features(out_feature_class, 'Polygon', table.spatial_reference, [], rows)
+
+
+# Rasters:
+
+class _FakeRaster(object):
+    def __init__(self, path, array, x_min, y_min, cell_size, no_data, spatial_reference):
+        self.path = str(path)
+        self.array = numpy.asarray(array)
+        self.cell_size = float(cell_size)
+        self.no_data = no_data
+        self.spatial_reference = spatial_reference
+        rows, cols = self.array.shape
+        self.extent = Extent(x_min, y_min, x_min + cols * self.cell_size, y_min + rows * self.cell_size)
+
+
+class Raster(object):
+    def __init__(self, path):
+        self.path = str(path)
+
+    def __str__(self):
+        return self.path
+
+
+_raster_count = [0]
+
+
+def NumPyArrayToRaster(in_array, lower_left_corner=None, x_cell_size=1.0, y_cell_size=None, value_to_nodata=None, path=None):
+    if path is None:
+        _raster_count[0] += 1
+        path = 'in_memory/raster_%d' % _raster_count[0]
+    lower_left_corner = lower_left_corner or Point(0.0, 0.0)
+    _rasters[_key(path)] = _FakeRaster(path, in_array, lower_left_corner.X, lower_left_corner.Y, x_cell_size, value_to_nodata,
+                                       SpatialReference(0))
+    return Raster(path)
+
+
+def RasterToNumPyArray(in_raster, lower_left_corner=None, ncols=None, nrows=None, nodata_to_value=None):
+    raster = _rasters[_key(in_raster)]
+    if lower_left_corner is None:
+        return raster.array.copy()
+    rows, cols = raster.array.shape
+    col = int(numpy.floor((lower_left_corner.X - raster.extent.XMin) / raster.cell_size + 1e-9))
+    last_row = rows - 1 - int(numpy.floor((lower_left_corner.Y - raster.extent.YMin) / raster.cell_size + 1e-9))
+    ncols, nrows = ncols or cols - col, nrows or last_row + 1
+    return raster.array[last_row + 1 - nrows:last_row + 1, col:col + ncols].copy()
+
+
+def Clip_management(in_raster, rectangle, out_raster, *args, **kwargs):
+    raster = _rasters[_key(in_raster)]
+    x_min, y_min, x_max, y_max = [float(v) for v in rectangle.split()]
+    c = raster.cell_size
+    col_min = max(0, int(round((x_min - raster.extent.XMin) / c)))
+    col_max = min(raster.array.shape[1], int(round((x_max - raster.extent.XMin) / c)))
+    row_min = max(0, int(round((raster.extent.YMax - y_max) / c)))
+    row_max = min(raster.array.shape[0], int(round((raster.extent.YMax - y_min) / c)))
+    _rasters[_key(out_raster)] = _FakeRaster(out_raster, raster.array[row_min:row_max, col_min:col_max],
+                                             raster.extent.XMin + col_min * c, raster.extent.YMax - row_max * c,
+                                             c, raster.no_data, raster.spatial_reference)
+    return Result(out_raster)
+
+
+def PolygonToRaster_conversion(in_features, value_field, out_rasterdataset=None, cell_assignment='CELL_CENTER', priority_field=None, cellsize=None):
+    """Rasterize onto the grid of env.snapRaster, over env.extent, by cell centre."""
+    _wait('tool')
+    snap = _rasters[_key(env.snapRaster)]
+    extent = env.extent if isinstance(env.extent, Extent) else snap.extent
+    c = float(cellsize or snap.cell_size)
+    cols, rows = int(round(extent.width / c)), int(round(extent.height / c))
+    x = extent.XMin + (numpy.arange(cols) + 0.5) * c
+    y = extent.YMax - (numpy.arange(rows) + 0.5) * c
+    array = numpy.full((rows, cols), -9999.0)
+    table = _table(in_features)
+    shape, field = table.index('Shape'), table.index(value_field)
+    for row in table.rows:
+        e = row[shape].extent
+        inside = ((y >= e.YMin) & (y < e.YMax))[:, None] & ((x >= e.XMin) & (x < e.XMax))[None, :]
+        array[inside] = row[field]
+    if out_rasterdataset is None:
+        _raster_count[0] += 1
+        out_rasterdataset = 'in_memory/raster_%d' % _raster_count[0]
+    _rasters[_key(out_rasterdataset)] = _FakeRaster(out_rasterdataset, array, extent.XMin, extent.YMin, c, -9999.0, snap.spatial_reference)
+    return Raster(out_rasterdataset)
+
+
+class _SpatialAnalyst(object):
+    """Mirror of the arcpy.sa module."""
+
+    @staticmethod
+    def ContourWithBarriers(in_raster, out_contour_feature_class, in_barrier_features=None, in_contour_type=None, in_contour_values_file=None,
+                            in_contour_interval=None, in_base_contour=None, explicit_only=None, in_explicit_contours=None, **kwargs):
+        """Simulated: one line per level within the range of the raster."""
+        raster = _rasters[_key(in_raster)]
+        e = raster.extent
+        values = raster.array[raster.array != raster.no_data]
+        levels = [level for level in in_explicit_contours if values.min() <= level <= values.max()]
+        rows = [[Polygon(Extent(e.XMin, e.YMin, e.XMax, e.YMax)), level, 1] for level in levels]
+        _insert_features(out_contour_feature_class, 'Polyline', raster.spatial_reference, [('Contour', 'DOUBLE'), ('Type', 'LONG')], rows)
+
+
+sa = _SpatialAnalyst()
@@ -11,7 +11,19 @@
 import unittest
 import os
 import shutil
+import tempfile
+import threading
+import datetime
+import time
+import pickle
+import sqlite3
+import struct
+import numpy
 import arctools
+import sqlite_arcpy
+
+from . import benchmark_arctools
+from . import fake_arcpy
 
 PATH = os.path.dirname(__file__)
 
@@ -27,7 +39,10 @@ FIELDS = [['id', 'weight', 'SHAPE@', 'name', 'SHAPE_Length', 'SHAPE_Area', 'time
 
 METHODS = ['insert', 'update', 'delete']
 
+ARCGIS = arctools.arcpy.__name__ == 'arcpy'
+
 
+@unittest.skipUnless(ARCGIS, 'Requires an ArcGIS installation.')
 class TestArctoolsModule(unittest.TestCase):
 
     def setUp(self):
@@ -150,8 +165,706 @@ class TestArctoolsModule(unittest.TestCase):
                 if arctools.arcpy.Exists(output):
                     arctools.arcpy.Delete_management(output)
 
+
+class TestArctoolsSQLite(unittest.TestCase):
+    """The table methods run against the sqlite_arcpy backend."""
+
+    def setUp(self):
+        self.previous_backend = arctools.use_backend(sqlite_arcpy)
+        self.directory = tempfile.mkdtemp()
+        self.workspace = os.path.join(self.directory, 'test.sqlite')
+        self.table = os.path.join(self.workspace, 'geodatabase_table')
+        self.data = [{'id': i,
+                      'date': datetime.datetime(2015, 11, 10 + i % 10),
+                      'age': 20.5 + i,
+                      'name': 'name_%d' % (i % 3)} for i in range(25)]
+        arctools.dictToTable(self.data, self.table)
+
+    def tearDown(self):
+        arctools.use_backend(self.previous_backend)
+        sqlite_arcpy.Delete_management(self.workspace)
+        shutil.rmtree(self.directory)
+
+    def test_tableToDict_method(self):
+        data = arctools.tableToDict(self.table, fields=FIELDS[2])
+        self.assertEqual(data, self.data)
+
+        data = arctools.tableToDict(self.table, keyField='id', sqlQuery='id < 5')
+        self.assertEqual(sorted(data), [0, 1, 2, 3, 4])
+
+        data = arctools.tableToDict(self.table, groupBy='name')
+        self.assertEqual(sorted(data), ['name_0', 'name_1', 'name_2'])
+        self.assertEqual(len(data['name_0']), 9)
+
+    def test_memory_budget(self):
+        previous, arctools.memoryBudget = arctools.memoryBudget, 500
+        try:
+            with self.assertLogs('arctools', 'INFO') as logs:
+                data = arctools.tableToDict(self.table, keyField='id', keys=[1, 2, 3], workers=4)
+                count = arctools.dictToTable([{'id': 3, 'name': 'a'}, {'id': 7, 'name': 'b'}], self.table, method='update', dictionaryKey='id')
+            self.assertEqual(sorted(data), [1, 2, 3])
+            self.assertEqual(count, 2)
+            self.assertTrue(any('WARNING' in line and 'tableToDict: the 3 rows' in line for line in logs.output))
+            self.assertTrue(any('dictToTable: estimated' in line and 'chunked execution' in line for line in logs.output))
+
+            # The share of rows selected by sqlQuery is unknown, so nothing is estimated.
+            with self.assertNoLogs('arctools', 'INFO'):
+                data = arctools.tableToDict(self.table, sqlQuery='id IN (3, 7)')
+            self.assertEqual(sorted(d['name'] for d in data), ['a', 'b'])
+
+            arctools.memoryBudget = 10 ** 9
+            with self.assertLogs('arctools', 'INFO') as logs:
+                arctools.tableToDict(self.table)
+            self.assertEqual(len(logs.output), 1)
+            self.assertIn('tableToDict: estimated', logs.output[0])
+        finally:
+            arctools.memoryBudget = previous
+
+    def test_join_dict(self):
+        stats = dict((i, {'mean': numpy.float64(i / 2.0), 'zone': 'zone_%d' % i, 'age': 0.0}) for i in range(0, 25, 2))
+        with arctools.profile() as report:
+            count = arctools.join_dict(self.table, 'id', stats, fields=['mean', 'zone', 'age'], null_value=-1)
+        self.assertEqual(count, 13)
+        self.assertEqual(report.tool_calls['AddFields_management'], 1)
+        self.assertEqual(report.tool_calls['da.UpdateCursor'], 1)
+        self.assertEqual(dict((f.name, f.type) for f in sqlite_arcpy.ListFields(self.table))['mean'], 'Double')
+
+        rows = arctools.tableToDict(self.table, keyField='id')
+        self.assertEqual((rows[4]['mean'], rows[4]['zone'], rows[4]['age']), (2.0, 'zone_4', 0.0))
+        self.assertEqual((rows[5]['mean'], rows[5]['age']), (-1, -1))
+
+        count = arctools.join_dict(self.table, 'id', [{'key': 5, 'mean': 9.5}], dictionaryKey='key')
+        self.assertEqual(count, 1)
+        self.assertEqual(arctools.tableToDict(self.table, keyField='id')[5]['mean'], 9.5)
+        self.assertIsNone(arctools.tableToDict(self.table, keyField='id')[4]['mean'])
+
+        self.assertRaises(arctools.MissingFieldException, arctools.join_dict, self.table, 'missing', stats)
+
+    def test_dictToTable_update_delete_pushdown(self):
+        previous, arctools.maxKeysPerQuery = arctools.maxKeysPerQuery, 2
+        try:
+            with arctools.profile() as report:
+                count = arctools.dictToTable([{'id': 3, 'name': 'a'}, {'id': 7, 'name': 'b'}, {'id': 11, 'name': 'c'}],
+                                             self.table, method='update', dictionaryKey='id')
+        finally:
+            arctools.maxKeysPerQuery = previous
+        self.assertEqual(count, 3)
+        self.assertEqual(report.tool_calls['da.UpdateCursor'], 2)
+        names = dict((d['id'], d['name']) for d in arctools.tableToDict(self.table))
+        self.assertEqual([names[i] for i in (3, 7, 11, 12)], ['a', 'b', 'c', 'name_0'])
+
+        count = arctools.dictToTable([{'id': 3}, {'id': 4}, {'id': 100}], self.table, method='delete', dictionaryKey='id', makeTable=False)
+        self.assertEqual(count, 2)
+        self.assertEqual(arctools._count(self.table), 23)
+
+        # Keys of a type that can not be selected on fall back to a full scan.
+        count = arctools.dictToTable([{'date': datetime.datetime(2015, 11, 19)}], self.table, method='delete', dictionaryKey='date', makeTable=False)
+        self.assertEqual(count, 2)
+
+    def test_tableToDict_sortField(self):
+        data = arctools.tableToDict(self.table, sortField='age DESC')
+        self.assertEqual([d['id'] for d in data], list(range(24, -1, -1)))
+
+        data = arctools.tableToDict(self.table, groupBy='name', sortField=['date', 'id DESC'], ordered=True)
+        self.assertEqual(list(data), ['name_0', 'name_1', 'name_2'])
+        self.assertEqual([d['id'] for d in data['name_1']], [10, 1, 22, 13, 4, 16, 7, 19])
+
+        self.assertRaises(arctools.FieldException, arctools.tableToDict, self.table, sortField='id DOWN')
+
+    def test_tableToDict_keys(self):
+        everything = arctools.tableToDict(self.table, keyField='id')
+        keys = [3, 17, 3, 24, 99]
+
+        previous, arctools.maxKeysPerQuery = arctools.maxKeysPerQuery, 2
+        try:
+            with arctools.profile() as report:
+                data = arctools.tableToDict(self.table, keyField='id', keys=keys, workers=2)
+        finally:
+            arctools.maxKeysPerQuery = previous
+        self.assertEqual(data, dict((k, everything[k]) for k in (3, 17, 24)))
+        self.assertEqual(report.tool_calls['da.SearchCursor'], 2)
+
+        data = arctools.tableToDict(self.table, keyField='id', keys=keys, sqlQuery='age > 40')
+        self.assertEqual(sorted(data), [24])
+
+        data = arctools.tableToDict(self.table, keyField='name', fields=['name', 'id'], keys=["name_1", "o'brien"])
+        self.assertEqual(list(data), ['name_1'])
+        self.assertEqual(arctools.tableToDict(self.table, keyField='id', keys=[]), {})
+
+        self.assertRaises(arctools.MethodException, arctools.tableToDict, self.table, keys=[1])
+        self.assertRaises(arctools.FieldException, arctools.tableToDict, self.table, keyField='id', keys=['a'])
+        self.assertRaises(arctools.FieldException, arctools.tableToDict, self.table, keyField='id', keys=[3.7])
+        self.assertEqual(list(arctools.tableToDict(self.table, keyField='id', keys=[3.0])), [3])
+        self.assertRaises(arctools.FieldException, arctools.tableToDict, self.table, keyField='date', keys=[datetime.datetime(2015, 11, 10)])
+
+    def test_tableToDict_cache(self):
+        cache = arctools.TableCache(directory=os.path.join(self.directory, 'cache'))
+        first = arctools.tableToDict(self.table, keyField='id', cache=cache)
+        first[0]['name'] = 'modified'
+
+        with arctools.profile() as report:
+            second = arctools.tableToDict(self.table, keyField='id', cache=cache)
+        self.assertEqual(second, arctools.tableToDict(self.table, keyField='id'))
+        self.assertEqual(report.tool_calls['da.SearchCursor'], 1)  # Only the change token.
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+        arctools.tableToDict(self.table, groupBy='name', cache=cache)
+        self.assertEqual(len(cache), 2)
+
+        arctools.dictToTable([{'id': 25, 'name': 'new'}], self.table, makeTable=False)
+        self.assertEqual(len(arctools.tableToDict(self.table, keyField='id', cache=cache)), 26)
+        self.assertEqual(cache.misses, 3)
+
+        shared = arctools.TableCache(directory=cache.directory, max_bytes=1)
+        self.assertEqual(len(arctools.tableToDict(self.table, keyField='id', cache=shared)), 26)
+        self.assertEqual((shared.hits, len(shared)), (1, 0))
+
+        # Generators of keys are read once, and hit the cache.
+        self.assertEqual(sorted(arctools.tableToDict(self.table, keyField='id', keys=(i for i in [1, 2]), cache=cache)), [1, 2])
+        self.assertEqual(sorted(arctools.tableToDict(self.table, keyField='id', keys=(i for i in [1, 2]), cache=cache)), [1, 2])
+        self.assertEqual((cache.hits, cache.misses), (2, 4))
+
+        # Stale files are deleted, and the directory is kept within max_age and max_disk_bytes.
+        cache.put('stale', 1, 'value')
+        self.assertIsNone(shared.get('stale', 2))
+        self.assertFalse(os.path.exists(cache._path('stale')))
+
+        cache.put('old', 1, 'value')
+        os.utime(cache._path('old'), (time.time() - 3600, time.time() - 3600))
+        aged = arctools.TableCache(directory=cache.directory, max_age=60)
+        aged.put('new', 1, 'value')
+        self.assertEqual((os.path.exists(cache._path('old')), os.path.exists(cache._path('new'))), (False, True))
+
+        small = arctools.TableCache(directory=cache.directory, max_disk_bytes=os.path.getsize(cache._path('new')))
+        small.put('newest', 1, 'value')
+        self.assertEqual(os.listdir(cache.directory), [os.path.basename(cache._path('newest'))])
+
+        cache.clear()
+        self.assertEqual((len(cache), cache.bytes, os.listdir(cache.directory)), (0, 0, []))
+
+    def test_refresh_table_dict(self):
+        lookup = {}
+        watermark = arctools.refresh_table_dict(lookup, self.table, 'id')
+        self.assertEqual(watermark, 25)
+        self.assertEqual(lookup, arctools.tableToDict(self.table, keyField='id'))
+
+        arctools.dictToTable([{'id': 25, 'name': 'new'}], self.table, makeTable=False)
+        arctools.dictToTable([{'id': 4}], self.table, method='delete', dictionaryKey='id', makeTable=False)
+        with arctools.profile() as report:
+            watermark = arctools.refresh_table_dict(lookup, self.table, 'id', watermark)
+        self.assertEqual(watermark, 26)
+        self.assertEqual(lookup, arctools.tableToDict(self.table, keyField='id'))
+        self.assertEqual(dict((p['phase'], p['rows']) for p in report.as_dict()['phases'] if p['method'] == 'tableToDict')['build'], 1)
+
+        # Editor tracking style date field as watermark.
+        lookup = arctools.tableToDict(self.table, keyField='id')
+        watermark = arctools.refresh_table_dict({}, self.table, 'id', watermarkField='date')
+        self.assertEqual(watermark, datetime.datetime(2015, 11, 19))
+        arctools.dictToTable([{'id': 7, 'name': 'edited', 'date': datetime.datetime(2015, 12, 1, 12)}], self.table, method='update', dictionaryKey='id')
+        watermark = arctools.refresh_table_dict(lookup, self.table, 'id', watermark, watermarkField='date')
+        self.assertEqual(watermark, datetime.datetime(2015, 12, 1, 12))
+        self.assertEqual(lookup[7]['name'], 'edited')
+        self.assertEqual(lookup, arctools.tableToDict(self.table, keyField='id'))
+
+        # Date literals in the syntax of the workspace.
+        date = datetime.datetime(2015, 12, 1, 12)
+        self.assertEqual(arctools._date_literal(self.table, date), "'2015-12-01 12:00:00'")
+        memory_table = str(sqlite_arcpy.CreateTable_management('in_memory', 'watermark_table'))
+        try:
+            self.assertEqual(arctools._date_literal(memory_table, date), "date '2015-12-01 12:00:00'")
+        finally:
+            sqlite_arcpy.Delete_management(memory_table)
+
+    def test_tableToDict_geometry(self):
+        square = struct.pack('<BII', 1, 3, 1) + struct.pack('<I10d', 5, 0, 0, 4, 0, 4, 3, 0, 3, 0, 0)
+        multipoint = struct.pack('>BII', 0, 1004, 2) + struct.pack('>BI3d', 0, 1001, -1, 2, 9) + struct.pack('>BI3d', 0, 1001, 1, 5, 9)
+        workspace = os.path.join(self.directory, 'test.gpkg')
+        connection = sqlite3.connect(workspace)
+        connection.executescript('''
+            CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT, geometry_type_name TEXT, srs_id INTEGER, z TINYINT, m TINYINT);
+            CREATE TABLE shapes (fid INTEGER PRIMARY KEY, geom GEOMETRY, name TEXT);
+            INSERT INTO gpkg_geometry_columns VALUES ('shapes', 'geom', 'GEOMETRY', 25833, 0, 0);''')
+        header = b'GP\x00\x03' + struct.pack('<i', 25833) + struct.pack('<4d', 0, 0, 0, 0)
+        connection.executemany('INSERT INTO shapes (geom, name) VALUES (?, ?)', [(header + square, 'square'), (b'GP\x00\x01' + struct.pack('<i', 25833) + multipoint, 'points')])
+        connection.commit()
+        connection.close()
+        table = os.path.join(workspace, 'shapes')
+
+        data = arctools.tableToDict(table, keyField='name', geometry='extent')
+        self.assertEqual(sorted(data['square']), ['fid', 'geom@EXTENT', 'name'])
+        self.assertEqual(data['square']['geom@EXTENT'], (0.0, 0.0, 4.0, 3.0))
+        self.assertEqual(data['points']['geom@EXTENT'], (-1.0, 2.0, 1.0, 5.0))
+
+        data = arctools.tableToDict(table, keyField='name', fields=['name', 'SHAPE@'], geometry='wkb')
+        self.assertEqual(data['square']['SHAPE@WKB'], square)
+
+        data = arctools.tableToDict(table, keyField='name', geometry='lazy')
+        proxy = data['points']['geom@']
+        self.assertEqual(proxy.wkb, multipoint)
+        self.assertEqual(proxy.spatialReference.factoryCode, 25833)
+        self.assertEqual((proxy.type, proxy.pointCount, proxy.area), ('multipoint', 2, 0.0))
+        self.assertEqual(data['square']['geom@'].area, 12.0)
+        self.assertEqual(data['square']['geom@'].geometry.spatialReference.factoryCode, 25833)
+        self.assertEqual(pickle.loads(pickle.dumps(proxy)).wkb, multipoint)
+
+        # The centroid, area and length tokens are computed from the blob.
+        data = arctools.tableToDict(table, keyField='name', geometry='xy')
+        self.assertEqual((data['square']['geom@XY'], data['points']['geom@XY']), ((2.0, 1.5), (0.0, 3.5)))
+        data = arctools.tableToDict(table, keyField='name', fields=['name', 'SHAPE@'], geometry='centroid')
+        self.assertEqual(data['square']['SHAPE@TRUECENTROID'], (2.0, 1.5))
+        data = arctools.tableToDict(table, keyField='name', geometry='area')
+        self.assertEqual((data['square']['geom@AREA'], data['points']['geom@AREA']), (12.0, 0.0))
+        data = arctools.tableToDict(table, keyField='name', geometry='length')
+        self.assertEqual((data['square']['geom@LENGTH'], data['points']['geom@LENGTH']), (14.0, 0.0))
+
+        self.assertRaises(arctools.MethodException, arctools.tableToDict, table, geometry='svg')
+        sqlite_arcpy.Delete_management(workspace)
+
+    def test_snapshot(self):
+        directory = os.path.join(self.directory, 'snapshot')
+        manifest = arctools.export_snapshot(self.table, directory, sqlQuery='id < 20')
+        self.assertEqual(manifest['rows'], 20)
+        self.assertEqual([(c['name'], c['kind']) for c in manifest['columns']],
+                         [('OBJECTID', 'int'), ('id', 'int'), ('date', 'date'), ('age', 'float'), ('name', 'string')])
+        self.assertRaises(arctools.FieldException, arctools.export_snapshot, self.table, directory)
+
+        snapshot = arctools.load_snapshot(directory)
+        self.assertEqual(len(snapshot), 20)
+        self.assertEqual(list(snapshot), arctools.tableToDict(self.table, sqlQuery='id < 20'))
+        self.assertEqual(snapshot[-1]['name'], 'name_1')
+        self.assertEqual(snapshot.array('age').sum(), sum(d['age'] for d in self.data[:20]))
+        self.assertIsNone(snapshot.mask('age'))
+        self.assertRaises(arctools.FieldException, snapshot.array, 'name')
+
+        output = os.path.join(self.workspace, 'output')
+        self.assertEqual(arctools.dictToTable(snapshot, output), 20)
+        self.assertEqual(arctools.tableToDict(output, fields=FIELDS[2]), self.data[:20])
+
+        rows = [{'name': 'a', 'value': 1, 'blob': b'\x00\x01', 'flag': True, 'shape': arctools.LazyGeometry(b'\x01\x01')},
+                {'name': None, 'value': 2.5, 'blob': None, 'flag': None, 'shape': None}]
+        directory = os.path.join(self.directory, 'rows')
+        arctools.export_snapshot(rows, directory)
+        snapshot = arctools.load_snapshot(directory)
+        self.assertEqual(snapshot.column('value'), [1.0, 2.5])
+        self.assertEqual(snapshot.column('name'), ['a', None])
+        self.assertEqual(snapshot.column('blob'), [b'\x00\x01', None])
+        self.assertEqual(snapshot.column('flag'), [True, None])
+        self.assertEqual(snapshot[0]['shape'].wkb, b'\x01\x01')
+        self.assertEqual(snapshot.to_dicts(geometry='wkb')[0]['shape@WKB'], b'\x01\x01')
+
+        self.assertRaises(arctools.InputTypeException, arctools.export_snapshot, [{'value': 1}, {'value': 'a'}], os.path.join(self.directory, 'mixed'))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'mixed')))
+
+        # Written in batches of 3 rows, where the kinds of the batches differ.
+        previous, arctools._snapshot_batch_rows = arctools._snapshot_batch_rows, 3
+        try:
+            directory = os.path.join(self.directory, 'batches')
+            arctools.export_snapshot(self.table, directory, sqlQuery='id < 20')
+            self.assertEqual(list(arctools.load_snapshot(directory)), arctools.tableToDict(self.table, sqlQuery='id < 20'))
+
+            rows = [{'value': None, 'name': None}] * 3 + [{'value': 1, 'name': 'b'}] * 3 + [{'value': 2.5, 'name': None}]
+            directory = os.path.join(self.directory, 'batch_kinds')
+            manifest = arctools.export_snapshot(rows, directory)
+            self.assertEqual([c['kind'] for c in manifest['columns']], ['float', 'string'])
+            self.assertFalse([f for f in os.listdir(directory) if f.endswith('.raw')])
+            snapshot = arctools.load_snapshot(directory)
+            self.assertEqual(snapshot.column('value'), [None] * 3 + [1.0] * 3 + [2.5])
+            self.assertEqual(snapshot.column('name'), [None] * 3 + ['b'] * 3 + [None])
+            self.assertIs(snapshot._decoder('name'), snapshot._decoder('name'))
+
+            self.assertRaises(arctools.InputTypeException, arctools.export_snapshot, [{'value': 1}] * 3 + [{'value': 'a'}], os.path.join(self.directory, 'mixed'))
+            self.assertFalse(os.path.exists(os.path.join(self.directory, 'mixed')))
+        finally:
+            arctools._snapshot_batch_rows = previous
+
+    def test_iter_groups(self):
+        groups = list(arctools.iter_groups(self.table, 'name', sqlQuery='id < 20', sortField='id DESC', field_case='upper'))
+        self.assertEqual([value for value, rows in groups], ['name_0', 'name_1', 'name_2'])
+        self.assertEqual([d['ID'] for d in groups[0][1]], [18, 15, 12, 9, 6, 3, 0])
+
+        grouped = arctools.tableToDict(self.table, groupBy='name')
+        self.assertEqual(dict(arctools.iter_groups(self.table, 'name')), grouped)
+        self.assertRaises(arctools.MissingFieldException, list, arctools.iter_groups(self.table, 'name', fields=['id']))
+
+    def test_dictToTable_method(self):
+        output = os.path.join(self.workspace, 'output')
+        arctools.dictToTable(self.data, output)
+        self.assertRaises(Exception, arctools.dictToTable, self.data, output, method='insert', makeTable=True)
+
+        arctools.dictToTable(self.data, output, method='insert', makeTable=False)
+        self.assertEqual(arctools.tableToDict(output, fields=FIELDS[2]), self.data + self.data)
+
+        count = arctools.dictToTable([{'id': 1, 'name': 'test_name'}], output, method='update', dictionaryKey='id')
+        self.assertEqual(count, 2)
+        for id, items in arctools.tableToDict(output, groupBy='id').items():
+            for item in items:
+                self.assertEqual(item['name'] == 'test_name', id == 1)
+
+        count = arctools.dictToTable([{'id': 1}, {'id': 2}], output, method='delete', dictionaryKey='id', makeTable=False)
+        self.assertEqual(count, 4)
+        self.assertEqual(len(arctools.tableToDict(output)), 46)
+
+    def test_renameFields_method(self):
+        output = os.path.join(self.workspace, 'renamed')
+        names = arctools.renameFields(self.table, output, {'name': 'title', 'age': 'years'})
+        self.assertEqual(names, ['OBJECTID', 'id', 'date', 'years', 'title'])
+        self.assertEqual(arctools.tableToDict(output, fields=['id', 'date', 'years', 'title']),
+                         [{'id': d['id'], 'date': d['date'], 'years': d['age'], 'title': d['name']} for d in self.data])
+
+        # In place, through AlterField:
+        names = arctools.renameFields(self.table, self.table, {'name': 'title'})
+        self.assertEqual(names, ['OBJECTID', 'id', 'date', 'age', 'title'])
+        self.assertEqual(len(arctools.tableToDict(self.table)), 25)
+        self.assertRaises(arctools.MissingFieldException, arctools.renameFields, self.table, output, {'missing': 'field'})
+
+    def test_changeFieldOrder_method(self):
+        output = os.path.join(self.workspace, 'reordered')
+        names = arctools.changeFieldOrder(self.table, output, ['name', 'id'])
+        self.assertEqual(names, ['OBJECTID', 'date', 'age', 'name', 'id'])
+        self.assertEqual(arctools.tableToDict(output, fields=FIELDS[2]), self.data)
+
+        names = arctools.changeFieldOrder(self.table, self.table, ['age', 'date', 'name', 'id'])
+        self.assertEqual(names, ['OBJECTID', 'age', 'date', 'name', 'id'])
+        self.assertEqual(arctools.tableToDict(self.table, fields=FIELDS[2]), self.data)
+        self.assertFalse(sqlite_arcpy.Exists(self.table + '_arctools_copy'))
+
+    def test_profile(self):
+        reports = []
+        with arctools.profile(callback=reports.append, trace_memory=True) as outer:
+            arctools.tableToDict(self.table, keyField='id')
+            with arctools.profile() as inner:
+                arctools.dictToTable(self.data, os.path.join(self.workspace, 'output'))
+
+        self.assertEqual(reports, [outer])
+        self.assertTrue(outer.peak_memory > 0)
+        self.assertIsNone(inner.peak_memory)
+        self.assertIs(arctools.use_backend(sqlite_arcpy), sqlite_arcpy)
+
+        phases = {(p['method'], p['phase']): p for p in outer.as_dict()['phases']}
+        self.assertEqual(phases[('tableToDict', 'fetch')]['rows'], 25)
+        self.assertEqual(phases[('tableToDict', 'build')]['rows'], 25)
+        self.assertEqual(phases[('dictToTable', 'write')]['rows'], 25)
+        self.assertTrue(phases[('tableToDict', 'fetch')]['rows_per_second'] > 0)
+
+        self.assertEqual(set(p[0] for p in inner.phases), set(['dictToTable']))
+        self.assertEqual(outer.tool_calls['da.SearchCursor'], 2)
+        self.assertEqual(outer.tool_calls['da.InsertCursor'], inner.tool_calls['da.InsertCursor'])
+        self.assertEqual(inner.tool_calls['CreateTable_management'], 1)
+
+    def test_profile_threads(self):
+        # Profiles in concurrent threads only count their own calls.
+        with arctools.profile() as single:
+            arctools.tableToDict(self.table, keyField='id')
+        calls = single.tool_calls['da.SearchCursor']
+
+        barrier = threading.Barrier(2)
+        reports = {}
+
+        def run(name, calls):
+            with arctools.profile() as report:
+                barrier.wait()
+                for _ in range(calls):
+                    arctools.tableToDict(self.table, keyField='id')
+                barrier.wait()
+            reports[name] = report
+
+        threads = [threading.Thread(target=run, args=('one', 1)), threading.Thread(target=run, args=('three', 3))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(reports['one'].tool_calls, single.tool_calls)
+        self.assertEqual(reports['three'].tool_calls['da.SearchCursor'], 3 * calls)
+        self.assertEqual(reports['three'].phases[('tableToDict', 'fetch')]['calls'], 3)
+
+    def test_aggregate(self):
+        statistics = [('age', 'SUM'), ('age', 'MEAN'), ('id', 'MIN'), ('date', 'MAX'), ('id', 'COUNT')]
+        tool = arctools.aggregate(self.table, 'name', statistics, engine='tool')
+        numpy_result = arctools.aggregate(self.table, 'name', statistics, engine='numpy')
+        self.assertEqual(tool, numpy_result)
+
+        name_1 = [d for d in self.data if d['name'] == 'name_1']
+        self.assertEqual(tool['name_1'], {'name': 'name_1',
+                                          'FREQUENCY': 8,
+                                          'SUM_age': sum(d['age'] for d in name_1),
+                                          'MEAN_age': sum(d['age'] for d in name_1) / 8,
+                                          'MIN_id': 1,
+                                          'MAX_date': max(d['date'] for d in name_1),
+                                          'COUNT_id': 8})
+        self.assertFalse(sqlite_arcpy.Exists('in_memory\\arctools_statistics'))
+
+        grouped = arctools.aggregate(self.table, ['name', 'date'], [('id', 'COUNT')], sqlQuery='id < 10')
+        self.assertEqual(grouped[('name_0', datetime.datetime(2015, 11, 10))]['COUNT_id'], 1)
+        self.assertEqual(sum(row['FREQUENCY'] for row in grouped.values()), 10)
+
+        # The selection is a table view, so the SQLite backend still groups in SQL.
+        with arctools.profile() as report:
+            selected = arctools.aggregate(self.table, 'name', statistics, sqlQuery='id < 10')
+        self.assertEqual(report.tool_calls['MakeTableView_management'], 1)
+        self.assertEqual(report.tool_calls['Statistics_analysis'], 1)
+        self.assertEqual(selected, arctools.aggregate(self.table, 'name', statistics, sqlQuery='id < 10', engine='numpy'))
+        self.assertFalse(sqlite_arcpy.Exists(os.path.dirname(self.table) + '/arctools_statistics_view'))
+
+        self.assertRaises(arctools.MethodException, arctools.aggregate, self.table, 'name', [('age', 'MEDIAN')])
+        self.assertRaises(arctools.FieldException, arctools.aggregate, self.table, 'id', [('name', 'SUM')], engine='numpy')
+
+    def test_table_pipeline(self):
+        output = os.path.join(self.workspace, 'output')
+        pipeline = arctools.TablePipeline(self.table, ['OBJECTID', 'id', 'age', 'name'], where_clause='id < 20', callback=lambda report, stage: None)
+        age = pipeline.index('age')
+        pipeline.filter(lambda row: row[1] % 2 == 0)
+        pipeline.map(lambda row: row + (row[age] * 2,), fields=pipeline.fields + ('double_age',))
+        pipeline.rename({'name': 'label'})
+        pipeline.select(['OBJECTID', 'id', 'label', 'double_age'])
+        self.assertRaises(arctools.MissingFieldException, pipeline.index, 'name')
+
+        count = pipeline.to_table(output, batch_size=3, makeTable=True)
+        self.assertEqual(count, 10)
+        self.assertEqual(arctools.tableToDict(output, fields=['id', 'label', 'double_age']),
+                         [{'id': d['id'], 'label': d['name'], 'double_age': d['age'] * 2} for d in self.data if d['id'] < 20 and d['id'] % 2 == 0])
+
+        stages = dict((s['stage'], s['count']) for s in pipeline.report.stages)
+        self.assertEqual(stages, {'source': 20, 'filter': 10, 'map': 10, 'rename': 10, 'select': 10, 'sink': 10})
+
+        self.assertEqual(list(pipeline)[0], (1, 0, 'name_0', 41.0))
+        self.assertEqual(pipeline.report.stages[-1]['stage'], 'select')
+        self.assertEqual(pipeline.to_table(output), 10)
+        self.assertEqual(arctools._count(output), 20)
+
+
+class TestContourClassification(unittest.TestCase):
+
+    def test_classify_to_contours(self):
+        levels = (10.0, 12.5, 15.0, 17.5, 20.0)
+        values = [-5.0, 10.0, 11.0, 12.5, 14.9, 19.99, 20.0, 25.0, float('nan')]
+
+        classified = arctools._classify_to_contours(values, levels)
+
+        self.assertEqual(list(classified[:-1]), [10.0, 12.5, 12.5, 15.0, 15.0, 20.0, 20.0, 20.0])
+        self.assertTrue(classified[-1] != classified[-1])
+
+        # Unsorted contour levels give the same result:
+        self.assertEqual(list(arctools._classify_to_contours(values[:-1], levels[::-1])), list(classified[:-1]))
+
+    def test_tile_extents(self):
+        tiles = arctools._tile_extents((0.0, 0.0, 250.0, 100.0), 100.0, 10.0)
+
+        self.assertEqual([core for core, _ in tiles], [(0.0, 0.0, 100.0, 100.0), (100.0, 0.0, 200.0, 100.0), (200.0, 0.0, 250.0, 100.0)])
+        self.assertEqual([buffered for _, buffered in tiles], [(0.0, 0.0, 110.0, 100.0), (90.0, 0.0, 210.0, 100.0), (190.0, 0.0, 250.0, 100.0)])
+
+
+class TestZonalStatistics(unittest.TestCase):
+
+    def test_tiled_statistics(self):
+        random = numpy.random.RandomState(0)
+        value = random.rand(40, 30)
+        value[random.rand(40, 30) < 0.1] = numpy.nan
+        zone = random.randint(1, 6, (40, 30)).astype('float64')
+        zone[:, :3] = numpy.nan
+        zone[0, 0] = 9  # Zone without values.
+        value[0, 0] = numpy.nan
+        methods = ['mean', 'sum', 'max', 'min']
+
+        with numpy.errstate(invalid='ignore'):
+            expected = arctools._zonal_statistics_as_dict(value, zone, methods)
+        partials = [arctools._zonal_partials(value[i:i + 7], zone[i:i + 7]) for i in range(0, 40, 7)]
+        results = arctools._zonal_partials_to_arrays(arctools._merge_zonal_partials(partials), methods).to_dict()
+
+        self.assertEqual(sorted(results), sorted(expected))
+        for key in expected:
+            for m in methods:
+                numpy.testing.assert_allclose(results[key][m], expected[key][m])
+
+    def test_zonal_arrays(self):
+        value = numpy.array([[1.0, 2.0, 3.0], [4.0, numpy.nan, 6.0]])
+        zone = numpy.array([[7.0, 7.0, 2.0], [2.0, 2.0, numpy.nan]])
+        results = arctools._zonal_statistics_arrays(value, zone, ['mean', 'max'], 'zone')
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results['mean'].tolist(), [3.5, 1.5])
+        self.assertEqual(results['max'].tolist(), [4.0, 2.0])
+
+        # The dictionaries keep the float keys of the zone raster.
+        expected = {2.0: {'zone': 2.0, 'mean': 3.5, 'max': 4.0}, 7.0: {'zone': 7.0, 'mean': 1.5, 'max': 2.0}}
+        for dictionary in [results.to_dict(), arctools._zonal_output(results, 'dict')]:
+            self.assertEqual(dictionary, expected)
+            self.assertEqual([type(k) for k in dictionary] + [type(d['zone']) for d in dictionary.values()], [float] * 4)
+        self.assertEqual([type(k) for k in arctools._zonal_statistics_as_dict(value, zone, 'sum')], [float, float])
+
+        # Whole number zone ids are integers in the arrays output.
+        results = arctools._zonal_output(results, 'arrays')
+        self.assertEqual(results.zones.dtype, numpy.dtype('int64'))
+        self.assertEqual(results.zones.tolist(), [2, 7])
+
+        # Zone ids that are not whole numbers stay floats.
+        results = arctools._zonal_output(arctools._zonal_statistics_arrays(value, zone / 4, 'mean'), 'arrays')
+        self.assertEqual(results.zones.tolist(), [0.5, 1.75])
+
+    def test_spatial_batches(self):
+        x, y = numpy.meshgrid(numpy.arange(10.0), numpy.arange(10.0))
+        extents = numpy.column_stack([x.ravel(), y.ravel(), x.ravel() + 1, y.ravel() + 1])
+        batches = arctools._spatial_batches(extents, 25)
+
+        self.assertEqual(sorted(numpy.concatenate(batches)), list(range(100)))
+        self.assertTrue(all(len(batch) <= 25 for batch in batches))
+        # Compact batches span a fraction of the extent.
+        spans = [extents[batch, 2:].max(axis=0) - extents[batch, :2].min(axis=0) for batch in batches]
+        self.assertTrue(all((span <= 6).all() for span in spans))
+        self.assertEqual([len(b) for b in arctools._spatial_batches(extents[:3], 25)], [3])
+
+    def test_merge_intersect_partials(self):
+        partials = {}
+        arctools._merge_intersect_partials(partials, {1: [10.0, 2.0, 5.0, 5.0, 5.0]})
+        arctools._merge_intersect_partials(partials, {1: [3.0, 3.0, 1.0, 1.0, 1.0], 2: [4.0, 1.0, 4.0, 4.0, 4.0]})
+        self.assertEqual(partials, {1: [13.0, 5.0, 6.0, 1.0, 5.0], 2: [4.0, 1.0, 4.0, 4.0, 4.0]})
+
+
+class TestGeoprocessing(unittest.TestCase):
+    """The geoprocessing paths against the rectangles and arrays of fake_arcpy."""
+
+    def setUp(self):
+        self.previous_backend = arctools.use_backend(fake_arcpy)
+        fake_arcpy.reset()
+        # Values increase from west to east, 20 x 10 cells of 10 m.
+        self.dem = fake_arcpy.NumPyArrayToRaster(numpy.tile(numpy.arange(20.0), (10, 1)), fake_arcpy.Point(0.0, 0.0), 10, 10, -9999.0, path='in_memory/dem')
+        self.levels = [5.0, 10.0, 15.0]
+
+    def tearDown(self):
+        fake_arcpy.reset()
+        arctools.use_backend(self.previous_backend)
+
+    def test_create_filled_contours_report(self):
+        output, report = arctools.create_filled_contours(self.dem, 'in_memory/contours', self.levels, zonal_engine='numpy', return_report=True)
+        self.assertEqual(output, 'in_memory/contours')
+        self.assertEqual(report.stages[-1]['count'], 4)
+        self.assertEqual([d['Contour'] for d in arctools.tableToDict(output, fields=['Contour'])], [5.0, 10.0, 15.0, 20.0])
+
+        rows, report = arctools.create_filled_contours(self.dem, [], self.levels, zonal_engine='numpy', return_report=True)
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([s['stage'] for s in report.stages][-1], 'copy')
+
+        geometries, report = arctools.create_filled_contours(self.dem, fake_arcpy.Geometry(), self.levels, zonal_engine='numpy', return_report=True)
+        self.assertEqual(len(geometries), 4)
+        self.assertIsInstance(report, arctools.TimingReport)
+
+        # Without return_report, the report is only passed to the callback.
+        stages = []
+        output = arctools.create_filled_contours(self.dem, 'in_memory/contours', self.levels, zonal_engine='numpy', callback=lambda report, stage: stages.append(stage['stage']))
+        self.assertEqual(output, 'in_memory/contours')
+        self.assertEqual(stages[-1], 'copy')
+        self.assertEqual(len(arctools.create_filled_contours(self.dem, [], self.levels, zonal_engine='numpy')), 4)
+
+    def test_polygon_raster_means(self):
+        halves = self._rectangles('in_memory/halves', 'name', 'TEXT', [((0.0, 0.0, 100.0, 100.0), 'west'), ((100.0, 0.0, 200.0, 100.0), 'east')])
+        means = arctools._polygon_raster_means(halves, 'OBJECTID', self.dem)
+        self.assertEqual(means, {1: 4.5, 2: 14.5})
+        self.assertFalse(fake_arcpy.Exists('in_memory/arctools_polygon_oid_raster'))
+
+    def test_create_filled_contours_batch(self):
+        second = fake_arcpy.NumPyArrayToRaster(numpy.tile(numpy.arange(20.0), (10, 1)).T, fake_arcpy.Point(0.0, 0.0), 10, 10, -9999.0, path='in_memory/dem_north')
+        jobs = [(self.dem, 'in_memory/contours', self.levels), (second, 'in_memory/contours_north', [5.0, 10.0])]
+        reports = arctools.create_filled_contours_batch(jobs, processes=1, zonal_engine='numpy')
+        self.assertEqual([r['name'] for r in reports], ['create_filled_contours'] * 2)
+        self.assertEqual([d['Contour'] for d in arctools.tableToDict('in_memory/contours', fields=['Contour'])], [5.0, 10.0, 15.0, 20.0])
+        self.assertTrue(fake_arcpy.Exists('in_memory/contours_north'))
+
+        task = {'job': 0, 'raster': self.dem, 'output': 'in_memory/task', 'levels': self.levels, 'zonal_engine': 'numpy', 'tile': None}
+        report = arctools._filled_contours_task(task)
+        self.assertEqual(report['name'], 'create_filled_contours')
+        self.assertEqual(pickle.loads(pickle.dumps(report)), report)
+
+    def test_create_filled_contours_tiled(self):
+        # Two tiles of 100 m with the default overlap of 10 cells.
+        report = arctools.create_filled_contours_tiled(self.dem, 'in_memory/tiled', self.levels, tile_size=100.0, processes=1, zonal_engine='numpy')
+        self.assertEqual(report['name'], 'create_filled_contours_tiled')
+        self.assertEqual([s['stage'] for s in report['stages']], ['merge', 'dissolve'])
+        self.assertEqual(len(report['tiles']), 2)
+
+        whole = arctools.create_filled_contours(self.dem, 'in_memory/whole', self.levels, zonal_engine='numpy')
+        tiled = arctools.tableToDict('in_memory/tiled', fields=['Contour', 'SHAPE@AREA'])
+        self.assertEqual(sorted(set(d['Contour'] for d in tiled)), [5.0, 10.0, 15.0, 20.0])
+        self.assertAlmostEqual(sum(d['SHAPE@AREA'] for d in tiled), sum(d['SHAPE@AREA'] for d in arctools.tableToDict('in_memory/whole', fields=['SHAPE@AREA'])))
+        self.assertFalse(fake_arcpy.Exists('in_memory/arctools_tile_merge'))
+
+    def _rectangles(self, path, field, field_type, rectangles):
+        rows = [(fake_arcpy.Polygon(fake_arcpy.Extent(*box)), value) for box, value in rectangles]
+        return str(fake_arcpy._insert_features(path, 'Polygon', fake_arcpy.SpatialReference(), [(field, field_type)], rows))
+
+    def test_zonal_statistics_polygon_batches(self):
+        # Two rows of four 10 m zones, where the first and the last zone share a key,
+        # over value strips 8 m wide with the values 1 to 5 from west to east.
+        zones = self._rectangles('in_memory/zones', 'zone', 'TEXT',
+                                 [((x, y, x + 10.0, y + 10.0), 'zone_%d' % ((x // 10 + 4 * (y // 10)) % 7)) for y in (0.0, 10.0) for x in (0.0, 10.0, 20.0, 30.0)])
+        values = self._rectangles('in_memory/values', 'value', 'DOUBLE',
+                                  [((8.0 * i, 0.0, 8.0 * i + 8.0, 20.0), i + 1.0) for i in range(5)])
+
+        unbatched = arctools.zonal_statistics_as_dict(values, zones, 'mean,sum,min,max', 'value', 'zone')
+        self.assertEqual(sorted(unbatched), ['zone_%d' % i for i in range(7)])
+        self.assertAlmostEqual(unbatched['zone_1']['mean'], (2 * 60 + 3 * 40) / 100.0)
+        self.assertEqual((unbatched['zone_1']['sum'], unbatched['zone_1']['min'], unbatched['zone_1']['max']), (5.0, 2.0, 3.0))
+        self.assertEqual((unbatched['zone_0']['min'], unbatched['zone_0']['max']), (1.0, 5.0))
+
+        for zone_batch_size in (1, 3):
+            with arctools.profile() as report:
+                batched = arctools.zonal_statistics_as_dict(values, zones, 'mean,sum,min,max', 'value', 'zone', zone_batch_size=zone_batch_size)
+            self.assertEqual(report.tool_calls['Intersect_analysis'], -(-8 // zone_batch_size))
+            self.assertEqual(sorted(batched), sorted(unbatched))
+            for zone, statistics in unbatched.items():
+                for method, value in statistics.items():
+                    self.assertAlmostEqual(batched[zone][method], value)
+        # The layers and intersects of the batches are deleted.
+        self.assertEqual(sorted(fake_arcpy._tables), sorted(fake_arcpy._key(path) for path in (values, zones)))
+
+
+class TestTimingReport(unittest.TestCase):
+
+    def test_stages(self):
+        finished = []
+        report = arctools.TimingReport('operation', callback=lambda report, stage: finished.append(stage['stage']))
+
+        with report.stage('first') as stage:
+            sum(range(10000))
+            stage['count'] = 3
+        try:
+            with report.stage('second'):
+                raise ValueError('Stage failed.')
+        except ValueError:
+            pass
+
+        self.assertEqual(finished, ['first', 'second'])
+        self.assertEqual([s['count'] for s in report.stages], [3, None])
+        self.assertTrue(report.stages[0]['wall'] > 0 and report.stages[0]['cpu'] >= 0)
+        self.assertAlmostEqual(report.wall, sum(s['wall'] for s in report.as_dict()['stages']))
+        self.assertIn('first', str(report))
+
+
+class TestBenchmark(unittest.TestCase):
+
+    def test_quick_run(self):
+        sizes = {'rows': [10], 'update_rows': [10], 'update_keys': [2], 'raster_side': [5]}
+        backend = arctools.arcpy
+        results = benchmark_arctools.run(sizes, 1, {'describe': 0.0, 'cursor': 0.0, 'row': 1e-6, 'tool': 0.0})
+
+        self.assertEqual([(r['benchmark'], r['mode']) for r in results],
+                         [('tableToDict', 'list'), ('tableToDict', 'keyField'), ('tableToDict', 'groupBy'),
+                          ('dictToTable', 'insert'), ('dictToTable', 'update'), ('dictToTable', 'delete'),
+                          ('_zonal_statistics_as_dict', 'mean,sum,max,min')])
+        self.assertTrue(all(r['seconds'] > 0 for r in results))
+        self.assertIs(arctools.arcpy, backend)
+
+        benchmark_arctools.compare(results, {'results': results})
+        self.assertTrue(all(r['ratio'] == 1.0 for r in results))
+
+
 def run():
     suite = unittest.TestLoader().loadTestsFromTestCase(TestArctoolsModule)
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestArctoolsSQLite))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestContourClassification))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestZonalStatistics))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestGeoprocessing))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestTimingReport))
+    suite.addTests(unittest.TestLoader().loadTestsFromTestCase(TestBenchmark))
     unittest.TextTestRunner(verbosity=2).run(suite)
 
 if __name__ == '__main__':
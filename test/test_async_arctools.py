@@ -0,0 +1,131 @@
+#-------------------------------------------------------------------------------
+# Name:        async_arctools test suite
+# Purpose:     Test the asyncio counterparts of the table methods, against
+#              the sqlite_arcpy backend.
+#
+# Created:     18.10.2026
+#-------------------------------------------------------------------------------
+import unittest
+import os
+import time
+import shutil
+import asyncio
+import tempfile
+import threading
+import arctools
+import async_arctools
+import sqlite_arcpy
+
+
+class TestAsyncArctools(unittest.TestCase):
+
+    def setUp(self):
+        self.previous_backend = arctools.use_backend(sqlite_arcpy)
+        self.directory = tempfile.mkdtemp()
+        self.workspace = os.path.join(self.directory, 'test.sqlite')
+        self.table = os.path.join(self.workspace, 'table')
+        self.data = [{'id': i, 'name': 'name_%d' % (i % 3)} for i in range(25)]
+        arctools.dictToTable(self.data, self.table)
+
+    def tearDown(self):
+        async_arctools.configure(max_per_workspace=2, max_writes_per_workspace=1)
+        arctools.use_backend(self.previous_backend)
+        sqlite_arcpy.Delete_management(self.workspace)
+        shutil.rmtree(self.directory)
+
+    def test_table_to_dict_and_dict_to_table(self):
+        async def run():
+            await async_arctools.dict_to_table([{'id': 3, 'name': 'updated'}], self.table, method='update', dictionaryKey='id')
+            return await async_arctools.table_to_dict(self.table, keyField='id')
+
+        data = asyncio.run(run())
+        self.assertEqual(data, arctools.tableToDict(self.table, keyField='id'))
+        self.assertEqual(data[3]['name'], 'updated')
+
+    def test_iter_batches(self):
+        async def run():
+            return [batch async for batch in async_arctools.iter_batches(self.table, fields=['id', 'name'], batch_size=10)]
+
+        batches = asyncio.run(run())
+        self.assertEqual([len(batch) for batch in batches], [10, 10, 5])
+        self.assertEqual(sum(batches, []), self.data)
+
+        async def fail():
+            async for batch in async_arctools.iter_batches(self.table, fields=['missing']):
+                pass
+        self.assertRaises(sqlite_arcpy.ExecuteError, asyncio.run, fail())
+
+    def test_cancel_iter_batches(self):
+        async def run():
+            batches = async_arctools.iter_batches(self.table, fields=['id', 'name'], batch_size=1, prefetch=1)
+            first = await batches.__anext__()
+            await batches.aclose()
+            # The reader releases the workspace when it stops.
+            await asyncio.wait_for(async_arctools.table_to_dict(self.table), 5)
+            await asyncio.wait_for(async_arctools.table_to_dict(self.table), 5)
+            return first
+
+        async_arctools.configure(max_per_workspace=1)
+        self.assertEqual(asyncio.run(run()), [self.data[0]])
+
+    def test_workspace_limit(self):
+        running = []
+        peak = []
+        lock = threading.Lock()
+
+        def work():
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            time.sleep(0.05)
+            with lock:
+                running.pop()
+
+        async def run():
+            other = os.path.join(self.directory, 'other.sqlite', 'table')
+            await asyncio.gather(*[async_arctools._run(table, work) for table in [self.table] * 4 + [other] * 2])
+
+        async_arctools.configure(max_per_workspace=2)
+        asyncio.run(run())
+        self.assertEqual(max(peak), 4)
+
+    def test_concurrent_writes(self):
+        # Writes to a workspace run one at a time, so a failed write can not
+        # roll back the edits of another.
+        running = []
+        peak = []
+        lock = threading.Lock()
+        dict_to_table = arctools.dictToTable
+
+        def counted(*args, **kwargs):
+            with lock:
+                running.append(1)
+                peak.append(len(running))
+            try:
+                time.sleep(0.05)
+                return dict_to_table(*args, **kwargs)
+            finally:
+                with lock:
+                    running.pop()
+
+        async def run():
+            writes = [async_arctools.dict_to_table([{'id': 100 + i, 'name': 'new'}], self.table, makeTable=False) for i in range(3)]
+            failing = async_arctools.dict_to_table([{'OBJECTID': 1, 'id': -1}], self.table, fields=['OBJECTID', 'id'], makeTable=False)
+            reads = [async_arctools.table_to_dict(self.table, keyField='id') for _ in range(2)]
+            return await asyncio.gather(failing, *(writes + reads), return_exceptions=True)
+
+        arctools.dictToTable = counted
+        try:
+            results = asyncio.run(run())
+        finally:
+            arctools.dictToTable = dict_to_table
+
+        self.assertIsInstance(results[0], Exception)
+        self.assertEqual(max(peak), 1)
+        data = arctools.tableToDict(self.table, keyField='id')
+        self.assertEqual(sorted(data)[-3:], [100, 101, 102])
+        self.assertNotIn(-1, data)
+
+
+if __name__ == '__main__':
+    unittest.main()
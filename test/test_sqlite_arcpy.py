@@ -0,0 +1,213 @@
+#-------------------------------------------------------------------------------
+# Name:        sqlite_arcpy test suite
+# Purpose:     Test the SQLite backend for the table methods of arctools.
+#
+# Created:     18.10.2026
+#-------------------------------------------------------------------------------
+import unittest
+import os
+import shutil
+import sqlite3
+import tempfile
+import datetime
+import threading
+import time
+import struct
+import sqlite_arcpy as arcpy
+
+
+class TestSQLiteBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.workspace = os.path.join(self.directory, 'test.sqlite')
+        self.table = str(arcpy.CreateTable_management(self.workspace, 'table'))
+        arcpy.AddField_management(self.table, 'id', 'LONG')
+        arcpy.AddField_management(self.table, 'name', 'TEXT', field_length=20)
+        arcpy.AddField_management(self.table, 'date', 'DATE')
+        self.rows = [(i, 'name_%d' % (i % 4), datetime.datetime(2015, 1, 1 + i % 28)) for i in range(2 * arcpy.batch_size + 10)]
+        with arcpy.da.InsertCursor(self.table, ['id', 'name', 'date']) as cursor:
+            for row in self.rows:
+                cursor.insertRow(row)
+
+    def tearDown(self):
+        arcpy.Delete_management(self.workspace)
+        shutil.rmtree(self.directory)
+
+    def test_describe_and_list_fields(self):
+        desc = arcpy.Describe(self.table)
+        self.assertEqual(desc.datasetType, 'Table')
+        self.assertTrue(desc.hasOID)
+        self.assertEqual(desc.OIDFieldName, 'OBJECTID')
+        self.assertFalse(hasattr(desc, 'shapeFieldName'))
+        self.assertEqual([(f.name, f.type) for f in arcpy.ListFields(self.table)],
+                         [('OBJECTID', 'OID'), ('id', 'Integer'), ('name', 'String'), ('date', 'Date')])
+        self.assertEqual(arcpy.ListFields(self.table, field_type='String')[0].length, 20)
+
+    def test_exists_and_delete(self):
+        self.assertTrue(arcpy.Exists(self.workspace))
+        self.assertTrue(arcpy.Exists(self.table))
+        self.assertTrue(arcpy.Exists(self.table.upper().replace(self.workspace.upper(), self.workspace)))
+        self.assertFalse(arcpy.Exists(os.path.join(self.workspace, 'missing')))
+        self.assertFalse(arcpy.Exists(os.path.join(self.directory, 'missing.sqlite', 'table')))
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'missing.sqlite')))
+
+        self.assertRaises(arcpy.ExecuteError, arcpy.CreateTable_management, self.workspace, 'table')
+        arcpy.Delete_management(self.table)
+        self.assertFalse(arcpy.Exists(self.table))
+
+    def test_search_cursor(self):
+        with arcpy.da.SearchCursor(self.table, ['id', 'name', 'date']) as cursor:
+            self.assertEqual(cursor.fields, ('id', 'name', 'date'))
+            self.assertEqual(list(cursor), self.rows)
+
+        with arcpy.da.SearchCursor(self.table, 'id', where_clause="name = 'name_1' AND id < 10", sql_clause=(None, 'ORDER BY id DESC')) as cursor:
+            self.assertEqual([row[0] for row in cursor], [9, 5, 1])
+
+        with arcpy.da.SearchCursor(self.table, ['OID@', 'id'], where_clause='id = 3') as cursor:
+            self.assertEqual(list(cursor), [(4, 3)])
+
+        with arcpy.da.SearchCursor(self.table, 'id', where_clause="date > date '2015-01-27 00:00:00' AND id < 100") as cursor:
+            self.assertEqual([row[0] for row in cursor], [27, 55, 83])
+
+        # Date literals inside quoted strings are left alone.
+        with arcpy.da.InsertCursor(self.table, ['id', 'name']) as cursor:
+            cursor.insertRow([-1, "date '2015-01-01'"])
+        with arcpy.da.SearchCursor(self.table, 'id', where_clause="name = 'date ''2015-01-01'''") as cursor:
+            self.assertEqual(list(cursor), [(-1,)])
+
+    def test_update_cursor(self):
+        with arcpy.da.UpdateCursor(self.table, ['id', 'name'], where_clause='id >= 1000') as cursor:
+            for row in cursor:
+                if row[0] % 2:
+                    cursor.deleteRow()
+                else:
+                    row[1] = 'updated'
+                    cursor.updateRow(row)
+
+        self.assertEqual(int(arcpy.GetCount_management(self.table)[0]), len(self.rows) - (len(self.rows) - 1000) // 2)
+        with arcpy.da.SearchCursor(self.table, ['id', 'name'], where_clause='id >= 1000') as cursor:
+            self.assertTrue(all(row[1] == 'updated' and not row[0] % 2 for row in cursor))
+
+    def test_editor_rollback(self):
+        try:
+            with arcpy.da.Editor(self.workspace):
+                with arcpy.da.UpdateCursor(self.table, ['name']) as cursor:
+                    for row in cursor:
+                        cursor.deleteRow()
+                raise ValueError('Abort edit session.')
+        except ValueError:
+            pass
+        self.assertEqual(int(arcpy.GetCount_management(self.table)[0]), len(self.rows))
+
+    def test_editor_failed_insert(self):
+        with self.assertRaises(arcpy.ExecuteError) as context:
+            with arcpy.da.Editor(self.workspace):
+                with arcpy.da.InsertCursor(self.table, ['OID@', 'id']) as cursor:
+                    cursor.insertRow([1, -1])
+        self.assertIn('UNIQUE constraint failed', str(context.exception))
+        self.assertEqual(int(arcpy.GetCount_management(self.table)[0]), len(self.rows))
+
+    def test_editor_concurrent_writers(self):
+        # A failed edit session in one thread does not roll back the edits of another.
+        inserted = threading.Event()
+        errors = {}
+
+        def first():
+            with arcpy.da.Editor(self.workspace):
+                with arcpy.da.InsertCursor(self.table, ['id']) as cursor:
+                    cursor.insertRow([-1])
+                inserted.set()
+                time.sleep(0.2)
+
+        def second():
+            inserted.wait()
+            try:
+                with arcpy.da.Editor(self.workspace):
+                    with arcpy.da.InsertCursor(self.table, ['OID@', 'id']) as cursor:
+                        cursor.insertRow([1, -2])
+            except arcpy.ExecuteError as e:
+                errors['second'] = e
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertIn('UNIQUE constraint failed', str(errors['second']))
+        with arcpy.da.SearchCursor(self.table, 'id', where_clause='id < 0') as cursor:
+            self.assertEqual(list(cursor), [(-1,)])
+
+    def test_in_memory_and_copy_rows(self):
+        result = arcpy.CreateTable_management('', 'in_memory\\temporary_dataset')
+        self.assertEqual(str(result), 'in_memory/temporary_dataset')
+        arcpy.AddField_management(result, 'value', 'DOUBLE')
+        with arcpy.da.InsertCursor(result, ['value']) as cursor:
+            cursor.insertRow([1.5])
+
+        copy = os.path.join(self.workspace, 'copy')
+        arcpy.CopyRows_management(result, copy)
+        arcpy.Delete_management(result)
+        self.assertFalse(arcpy.Exists('in_memory\\temporary_dataset'))
+        self.assertEqual(list(arcpy.da.SearchCursor(copy, 'value')), [(1.5,)])
+
+    def test_statistics(self):
+        result = arcpy.Statistics_analysis(self.table, 'in_memory\\statistics', [['id', 'MAX'], ['id', 'MEAN']], 'name')
+        self.assertEqual([(f.name, f.type) for f in arcpy.ListFields(result)][1:],
+                         [('name', 'String'), ('FREQUENCY', 'Integer'), ('MAX_id', 'Integer'), ('MEAN_id', 'Double')])
+        rows = list(arcpy.da.SearchCursor(result, ['name', 'FREQUENCY', 'MAX_id'], sql_clause=(None, 'ORDER BY name')))
+        self.assertEqual(rows[0], ('name_0', 503, 2008))
+        arcpy.Delete_management(result)
+
+        self.assertRaises(arcpy.ExecuteError, arcpy.Statistics_analysis, self.table, 'in_memory\\statistics', 'id MEDIAN')
+
+    def test_geopackage_feature_table(self):
+        workspace = os.path.join(self.directory, 'test.gpkg')
+        connection = sqlite3.connect(workspace)
+        connection.executescript('''
+            CREATE TABLE gpkg_geometry_columns (table_name TEXT, column_name TEXT, geometry_type_name TEXT, srs_id INTEGER, z TINYINT, m TINYINT);
+            CREATE TABLE lakes (fid INTEGER PRIMARY KEY, geom POLYGON, name TEXT);
+            INSERT INTO gpkg_geometry_columns VALUES ('lakes', 'geom', 'POLYGON', 25833, 0, 0);
+            INSERT INTO lakes VALUES (1, x'00', 'lake');''')
+        connection.commit()
+        connection.close()
+
+        table = os.path.join(workspace, 'lakes')
+        desc = arcpy.Describe(table)
+        self.assertEqual(desc.datasetType, 'FeatureClass')
+        self.assertEqual(desc.shapeFieldName, 'geom')
+        self.assertEqual(desc.OIDFieldName, 'fid')
+        self.assertEqual(desc.spatialReference.factoryCode, 25833)
+        self.assertEqual(list(arcpy.da.SearchCursor(table, ['OID@', 'SHAPE@', 'name'])), [(1, b'\x00', 'lake')])
+
+        # Computed tokens decode the blob, and other tokens are not supported.
+        square = b'GP\x00\x01' + struct.pack('<i', 25833) + struct.pack('<BII', 1, 3, 1) + struct.pack('<I10d', 5, 0, 0, 2, 0, 2, 2, 0, 2, 0, 0)
+        with arcpy.da.InsertCursor(table, ['SHAPE@', 'name']) as cursor:
+            cursor.insertRow([square, 'square'])
+        with arcpy.da.SearchCursor(table, ['SHAPE@XY', 'SHAPE@X', 'SHAPE@AREA', 'geom@LENGTH'], where_clause="name = 'square'") as cursor:
+            self.assertEqual(list(cursor), [((1.0, 1.0), 1.0, 4.0, 8.0)])
+        self.assertRaises(arcpy.ExecuteError, arcpy.da.SearchCursor, table, ['SHAPE@JSON'])
+        self.assertRaises(arcpy.ExecuteError, arcpy.da.UpdateCursor, table, ['SHAPE@AREA'])
+        arcpy.Delete_management(workspace)
+
+    def test_from_wkb(self):
+        # A 4 x 3 square with a 1 x 1 hole, and a line in big endian ISO WKB with Z values.
+        square = struct.pack('<BII', 1, 3, 2) + struct.pack('<I10d', 5, 0, 0, 4, 0, 4, 3, 0, 3, 0, 0) + struct.pack('<I10d', 5, 1, 1, 2, 1, 2, 2, 1, 2, 1, 1)
+        polygon = arcpy.FromWKB(square, arcpy.SpatialReference(25833))
+        self.assertEqual((polygon.type, polygon.partCount, polygon.pointCount), ('polygon', 1, 10))
+        self.assertEqual((polygon.area, polygon.length), (11.0, 18.0))
+        self.assertEqual((polygon.extent.XMin, polygon.extent.YMax), (0.0, 3.0))
+        self.assertEqual(polygon.spatialReference.factoryCode, 25833)
+        self.assertEqual(bytes(polygon.WKB), square)
+
+        self.assertEqual((polygon.trueCentroid.X, polygon.trueCentroid.Y), (22.5 / 11, 1.5))
+
+        line = arcpy.FromWKB(struct.pack('>BII', 0, 1002, 2) + struct.pack('>6d', 0, 0, 9, 3, 4, 9))
+        self.assertEqual((line.type, line.length, line.area), ('polyline', 5.0, 0.0))
+        self.assertEqual((line.trueCentroid.X, line.trueCentroid.Y), (1.5, 2.0))
+        self.assertRaises(arcpy.ExecuteError, arcpy.FromWKB, struct.pack('<BII', 1, 7, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()